@@ -1,141 +1,248 @@
+"""
+Canonical student resolver
+
+Finds every student_*_structured*.json under the configured roots, groups the copies
+by student, and picks one canonical file per student.
+
+- roots are walked in parallel, and files are read in parallel; each file is hashed
+  (MD5 of the raw bytes) and parsed from the same read
+- grouping is a single pass, with duplicates counted by hash
+- per-file results are cached by (size, mtime_ns, inode), so a re-run only reads
+  files that changed
+- prints the markdown mapping table and writes a machine-readable canonical map
+
+Usage:
+  python analyze_students.py
+  python analyze_students.py --root data/students --root /mnt/backup/students
+  python analyze_students.py --map canonical_students.json --no-cache
+"""
 import os
+import re
+import sys
 import json
 import hashlib
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-def get_file_info(filepath):
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'scripts'))
+from student_schema import KIND_STRUCTURED, SCHEMA_NAMES, detect_version
+DEFAULT_ROOTS = [os.path.join(REPO_ROOT, 'data')]
+CANONICAL_DIR = 'data/students/jenny_assessments_v1/'
+DUPLICATES_DIR = 'data/archive/legacy_v3/duplicates/'
+CACHE_PATH = os.path.join(REPO_ROOT, 'data', '.student_resolver_cache.json')
+MAP_PATH = os.path.join(REPO_ROOT, 'data', '.student_canonical_map.json')
+CACHE_VERSION = 2
+WORKERS = min(32, (os.cpu_count() or 1) * 4)
+STUDENT_FILE_RE = re.compile(r'^student_(\d+)_([a-z0-9]+)_structured(?:_(\d+))?\.json$', re.IGNORECASE)
+SKIP_DIRS = {'node_modules', '__pycache__'}
+
+def find_student_files(root):
+    """Every student_*_structured*.json below root (dot-dirs and node_modules skipped)"""
+    found = []
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.') and entry.name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                elif STUDENT_FILE_RE.match(entry.name) and entry.is_file():
+                    found.append(entry.path)
+    return found
+
+def discover(roots, pool):
+    """All student files under roots, one walk per root"""
+    paths = set()
+    for found in pool.map(find_student_files, roots):
+        paths.update(os.path.abspath(p) for p in found)
+    return sorted(paths)
+
+def display_path(path):
+    rel = os.path.relpath(path, REPO_ROOT)
+    return path if rel.startswith('..') else rel
+
+def id_from_filename(path):
+    """student_011_beya_structured.json -> beya_011 (the student_id convention inside the files)"""
+    m = STUDENT_FILE_RE.match(os.path.basename(path))
+    return f"{m.group(2).lower()}_{m.group(1)}" if m else None
+
+def get_file_info(path, st):
+    info = {'path': display_path(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
     try:
-        stat = os.stat(filepath)
-        mtime = datetime.fromtimestamp(stat.st_mtime)
-        with open(filepath, 'r') as f:
-            content = f.read()
-            data = json.loads(content)
-            
-        file_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
-        
-        # Check schema
-        has_profile = 'profile' in data
-        has_diagnostics = 'diagnostics' in data
-        has_recommendations = 'recommendations' in data
-        is_v4 = has_profile and has_diagnostics and has_recommendations
-        
-        student_id = data.get('student_id')
-        student_name = data.get('student_name')
-        
-        return {
-            'path': filepath,
-            'mtime': mtime,
-            'hash': file_hash,
-            'is_v4': is_v4,
-            'student_id': student_id,
-            'student_name': student_name,
-            'size': stat.st_size
-        }
-    except Exception as e:
-        return {
-            'path': filepath,
-            'error': str(e)
-        }
+        with open(path, 'rb') as f:
+            raw = f.read()
+    except OSError as e:
+        info['error'] = str(e)
+        return info
+    info['hash'] = hashlib.md5(raw).hexdigest()
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        info['error'] = f"invalid JSON: {e}"
+        data = None
+    if isinstance(data, dict):
+        info['kind'], info['schema_version'] = detect_version(data)
+        info['student_id'] = data.get('student_id')
+        info['student_name'] = data.get('student_name')
+    return info
+
+# ---------------------------------------------------------------- cache
+
+def load_cache(path):
+    try:
+        with open(path, 'r') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache['files']
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_cache(path, files):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'files': files}, f, separators=(',', ':'))
+    os.replace(tmp, path)
 
-files = [
-    "data/students/jenny_assessments_v1/student_011_beya_structured.json",
-    "data/students/jenny_assessments_v1/student_006_arshiya_structured.json",
-    "data/students/jenny_assessments_v1/student_005_srinidhi_structured.json",
-    "data/students/jenny_assessments_v1/student_003_aaryan_structured.json",
-    "data/students/jenny_assessments_v1/student_007_aarnav_structured.json",
-    "data/students/jenny_assessments_v1/student_009_aarav_structured.json",
-    "data/students/jenny_assessments_v1/student_010_zainab_structured.json",
-    "data/students/jenny_assessments_v1/student_002_ananyaa_structured.json",
-    "data/students/jenny_assessments_v1/student_008_iqra_structured.json",
-    "data/students/jenny_assessments_v1/student_004_hiba_structured.json",
-    "data/students/jenny_assessments_v1/student_001_anoushka_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_009_aarav_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_004_hiba_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_011_beya_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_006_arshiya_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_006_arshiya_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_005_srinidhi_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_005_srinidhi_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_000_huda_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_001_anoushka_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_011_beya_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_003_aaryan_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_007_aarnav_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_009_aarav_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_007_aarnav_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_010_zainab_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_010_zainab_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_002_ananyaa_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_008_iqra_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_002_ananyaa_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_003_aaryan_structured_1.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_004_hiba_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_001_anoushka_structured.json",
-    "data/v4_organized/students/jenny_assessments_v1/student_008_iqra_structured_1.json"
-]
-
-info_list = [get_file_info(f) for f in files]
-
-# Group by student_id
-students = {}
-no_id = []
-
-for info in info_list:
-    if 'error' in info:
-        no_id.append(info)
-        continue
-        
-    sid = info.get('student_id')
-    if not sid:
-        # Try to infer from filename
-        basename = os.path.basename(info['path'])
-        if 'student_' in basename:
-            parts = basename.split('_')
-            if len(parts) >= 2:
-                sid = f"{parts[0]}_{parts[1]}" # e.g. student_001
-        
-    if sid:
-        if sid not in students:
-            students[sid] = []
-        students[sid].append(info)
-    else:
-        no_id.append(info)
-
-print("# CANONICAL MAPPING TABLE")
-print(f"Generated at: {datetime.now()}")
-print("")
-
-for sid in sorted(students.keys()):
-    print(f"## Student: {sid}")
-    items = students[sid]
-    
-    # Find newest
-    newest = max(items, key=lambda x: x['mtime'])
-    
-    print("| File Path | Size | V4 Schema | MTime | Duplicate? | Recommendation |")
-    print("|---|---|---|---|---|---|")
-    
-    # Check for duplicates
-    hashes = [x['hash'] for x in items]
-    
-    for item in items:
-        is_newest = item == newest
-        is_dup = hashes.count(item['hash']) > 1
-        
-        rec = ""
-        if "v4_organized" in item['path'] and not "_1.json" in item['path']:
-             rec = "**CANONICAL** (data/students/jenny_assessments_v1/)"
-        elif "_1.json" in item['path']:
-             rec = "ARCHIVE (data/archive/legacy_v3/duplicates/)"
-        elif "data/students" in item['path']:
-             rec = "ARCHIVE (data/archive/legacy_v3/students_backup/)"
+def scan(paths, pool, cache):
+    """File info for every path, reading only files whose stat changed since the cache"""
+    infos, todo, fresh = {}, [], {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            infos[path] = {'path': display_path(path), 'error': str(e)}
+            continue
+        key = [st.st_size, st.st_mtime_ns, st.st_ino]
+        hit = cache.get(path)
+        if hit and hit['key'] == key:
+            infos[path] = hit['info']
         else:
-             rec = "REVIEW"
-             
-        print(f"| `{item['path']}` | {item['size']} | {item['is_v4']} | {item['mtime']} | {is_dup} | {rec} |")
+            todo.append((path, st))
+        fresh[path] = key
+    for (path, _), info in zip(todo, pool.map(lambda t: get_file_info(*t), todo)):
+        infos[path] = info
+    new_cache = {p: {'key': k, 'info': infos[p]} for p, k in fresh.items()}
+    return [infos[p] for p in paths], new_cache, len(todo)
+
+# ---------------------------------------------------------------- resolve
+
+def group_by_student(info_list):
+    students, no_id = {}, []
+    for info in info_list:
+        sid = info.get('student_id') or id_from_filename(info['path'])
+        if sid:
+            students.setdefault(sid, []).append(info)
+        else:
+            no_id.append(info)
+    return students, no_id
+
+def canonical_rank(item):
+    """Higher is better: parses, lives in the canonical dir, not a _N copy, newest schema, newest"""
+    name = os.path.basename(item['path'])
+    m = STUDENT_FILE_RE.match(name)
+    return ('error' not in item, item['path'].startswith(CANONICAL_DIR),
+            not (m and m.group(3)), item.get('schema_version') or 0, item.get('mtime_ns', 0))
+
+def recommend(item, canonical):
+    if item is canonical:
+        return '**CANONICAL**' + ('' if item['path'].startswith(CANONICAL_DIR) else f" (move to {CANONICAL_DIR})")
+    if item['path'].startswith('data/archive/'):
+        return 'ARCHIVED'
+    if item.get('hash') and item['hash'] == canonical.get('hash'):
+        return f"ARCHIVE ({DUPLICATES_DIR})"
+    return 'REVIEW (differs from canonical)'
+
+def resolve(students):
+    """{student_id: {canonical, files: [(info, is_dup, recommendation)]}}"""
+    resolved = {}
+    for sid in sorted(students):
+        items = sorted(students[sid], key=lambda x: x['path'])
+        canonical = max(items, key=canonical_rank)
+        hash_counts = Counter(x.get('hash') for x in items)
+        files = [(item, bool(item.get('hash')) and hash_counts[item['hash']] > 1,
+                  recommend(item, canonical)) for item in items]
+        resolved[sid] = {'canonical': canonical, 'files': files}
+    return resolved
+
+def fmt_schema(item):
+    if item.get('kind', KIND_STRUCTURED) != KIND_STRUCTURED:
+        return item['kind']
+    version = item.get('schema_version')
+    return '' if version is None else f"v{version} {SCHEMA_NAMES[version] or 'unversioned'}"
+
+def fmt_mtime(item):
+    return datetime.fromtimestamp(item['mtime_ns'] / 1e9) if 'mtime_ns' in item else ''
+
+def print_table(resolved, no_id):
+    print("# CANONICAL MAPPING TABLE")
+    print(f"Generated at: {datetime.now()}")
     print("")
+    for sid, entry in resolved.items():
+        print(f"## Student: {sid}")
+        print("| File Path | Size | Schema | MTime | Duplicate? | Recommendation |")
+        print("|---|---|---|---|---|---|")
+        for item, is_dup, rec in entry['files']:
+            if 'error' in item:
+                rec += f" — {item['error']}"
+            print(f"| `{item['path']}` | {item.get('size', '')} | {fmt_schema(item)} | "
+                  f"{fmt_mtime(item)} | {is_dup} | {rec} |")
+        print("")
+    if no_id:
+        print("## Files with NO Student ID")
+        for item in no_id:
+            print(f"- {item['path']} (Error: {item.get('error', 'Missing ID')})")
+
+def canonical_map(resolved, no_id):
+    students = {}
+    for sid, entry in resolved.items():
+        canonical = entry['canonical']
+        students[sid] = {
+            'canonical': canonical['path'],
+            'student_name': canonical.get('student_name'),
+            'hash': canonical.get('hash'),
+            'schema_version': canonical.get('schema_version'),
+            'needs_review': 'error' in canonical,
+            'copies': [{'path': item['path'], 'hash': item.get('hash'), 'duplicate': is_dup,
+                        'recommendation': rec, **({'error': item['error']} if 'error' in item else {})}
+                       for item, is_dup, rec in entry['files'] if item is not canonical],
+        }
+    return {'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'students': students,
+            'unresolved': [{'path': i['path'], 'error': i.get('error', 'Missing ID')} for i in no_id]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Resolve canonical student_*_structured*.json files")
+    parser.add_argument('--root', action='append', help="directory to search (repeatable; default: data/)")
+    parser.add_argument('--map', default=MAP_PATH, help="where to write the canonical map JSON")
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    parser.add_argument('--no-cache', action='store_true', help="re-read every file")
+    args = parser.parse_args()
+
+    roots = [os.path.abspath(r) for r in (args.root or DEFAULT_ROOTS)]
+    cache = {} if args.no_cache else load_cache(CACHE_PATH)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        paths = discover(roots, pool)
+        info_list, new_cache, read = scan(paths, pool, cache)
+    save_cache(CACHE_PATH, new_cache)
+
+    students, no_id = group_by_student(info_list)
+    resolved = resolve(students)
+    print_table(resolved, no_id)
+
+    tmp = args.map + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(canonical_map(resolved, no_id), f, indent=2)
+    os.replace(tmp, args.map)
+    print(f"\n{len(paths)} files ({read} read, {len(paths) - read} cached), {len(resolved)} students -> {args.map}",
+          file=sys.stderr)
 
-if no_id:
-    print("## Files with NO Student ID")
-    for item in no_id:
-        print(f"- {item['path']} (Error: {item.get('error', 'Missing ID')})")
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Path Classification Rules - IvyLevel v4.0
+Compiles the declarative rule table (classification_rules.json) behind PHASE 1
+semantic categories and PHASE 2 canonical buckets into a single-pass classifier.
+
+Each table section is an ordered rule list; the first rule whose "when" holds wins,
+else the section default. "when" is a list of clauses that must all hold, and a
+clause holds if any of its tests does:
+  path       substring of the lower-cased path ("/huda/", "qa_runs")
+  name       substring of the lower-cased filename ("eq_", "w0")
+  filename   exact filename (".DS_Store")
+  suffix     exact, case-sensitive extension (".py")
+  file_type / status / category   exact field value from the inventory entry
+Bucket targets may contain {filename}.
+
+Compilation:
+- whole-segment path tests ("/raw/", "/personas/jenny/") go into a path-segment trie
+- every other substring test goes into one prefix-factored regex searched over
+  "path\\nfilename" (its first-character set lets the search skip ahead in C); the
+  longest hit at each start position implies the tests that are its prefixes
+- each test is one bit of a mask; rules are indexed by the tests of their first
+  clause, so only rules that can match are checked and extra buckets cost nothing
+  for paths they do not touch
+
+Usage:
+  python path_rules.py /abs/path/raw/huda/01-assess-session/file.pdf --status RAW
+  python path_rules.py --bench 1000000
+"""
+
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+from pathlib import Path
+
+RULES_FILE = Path(__file__).with_name('classification_rules.json')
+FIELD_TESTS = ('filename', 'suffix', 'file_type', 'status', 'category')
+SUBSTRING_TESTS = ('path', 'name')
+
+def rules_digest(rules_file=RULES_FILE):
+    """Fingerprint of the rule table (for caches of classification results)"""
+    return hashlib.sha1(Path(rules_file).read_bytes()).hexdigest()[:16]
+
+def trie_regex(strings):
+    """Regex matching exactly the given literals, factored by common prefix so a
+    scan branches on one character at a time; optional tails are greedy, so the
+    longest literal starting at a position wins"""
+    trie = {}
+    for s in strings:
+        node = trie
+        for ch in s:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def emit(node):
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ''
+        body = alts[0] if len(alts) == 1 else '(?:' + '|'.join(alts) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return emit(trie)
+
+def suffix_of(filename):
+    dot = filename.rfind('.')
+    return filename[dot:] if dot >= 0 else ''
+
+class Classifier:
+    """One compiled table section"""
+
+    def __init__(self, rules, default):
+        self.rules = rules
+        self.default = default
+        self.bits = {}          # (test, value) -> bit
+        self.seg_trie = [{}, 0]  # [children by segment, mask of tests ending here]
+        regex_tests = {}        # literal -> set of (test, literal)
+
+        compiled = []
+        for rule in rules:
+            clauses = []
+            for clause in rule['when']:
+                mask = 0
+                for test, values in clause.items():
+                    if test not in FIELD_TESTS + SUBSTRING_TESTS:
+                        raise ValueError(f"unknown test {test!r} in rule {rule}")
+                    for value in values:
+                        mask |= self._bit(test, value, regex_tests)
+                clauses.append(mask)
+            compiled.append(clauses)
+        self.compiled = compiled
+
+        # regex literal -> masks of path / name tests it implies (itself and its prefixes)
+        self.path_mask, self.name_mask = {}, {}
+        for literal in regex_tests:
+            path_mask = name_mask = 0
+            for other, keys in regex_tests.items():
+                if literal.startswith(other):
+                    for key in keys:
+                        if key[0] == 'path':
+                            path_mask |= self.bits[key]
+                        else:
+                            name_mask |= self.bits[key]
+            self.path_mask[literal], self.name_mask[literal] = path_mask, name_mask
+        self.search = re.compile(trie_regex(regex_tests)).search if regex_tests else None
+
+        # rules (as a bitmask over rule indices) by the tests of their first clause;
+        # clause-less rules always apply
+        self.rules_by_bit = {}
+        self.always = 0
+        for i, clauses in enumerate(compiled):
+            if not clauses:
+                self.always |= 1 << i
+                continue
+            mask = clauses[0]
+            while mask:
+                low = mask & -mask
+                self.rules_by_bit[low] = self.rules_by_bit.get(low, 0) | 1 << i
+                mask ^= low
+
+    def _bit(self, test, value, regex_tests):
+        if test in SUBSTRING_TESTS:
+            value = value.lower()
+        key = (test, value)
+        if key in self.bits:
+            return self.bits[key]
+        bit = self.bits[key] = 1 << len(self.bits)
+        segments = value.strip('/').split('/')
+        if test == 'path' and len(value) > 2 and value[0] == value[-1] == '/' and all(segments):
+            node = self.seg_trie
+            for seg in segments:
+                node = node[0].setdefault(seg, [{}, 0])
+            node[1] |= bit
+        elif test in SUBSTRING_TESTS:
+            if not value:
+                raise ValueError(f"empty {test} test")
+            regex_tests.setdefault(value, set()).add(key)
+        return bit
+
+    def test_mask(self, path, filename, file_type=None, status=None, category=None):
+        """Bitmask of every test that holds for this file"""
+        bits = self.bits
+        path_lower = path.lower()
+        mask = 0
+        for key in (('filename', filename), ('suffix', suffix_of(filename)), ('file_type', file_type),
+                    ('status', status), ('category', category)):
+            mask |= bits.get(key, 0)
+
+        # whole segments: "/x/y/" needs a "/" before x and after y (so y is not the filename)
+        segs = path_lower.split('/')
+        last = len(segs) - 1
+        children = self.seg_trie[0]
+        for i in range(1, last):
+            node = children.get(segs[i])
+            j = i
+            while node is not None:
+                mask |= node[1]
+                j += 1
+                if j >= last:
+                    break
+                node = node[0].get(segs[j])
+
+        search = self.search
+        if search:
+            # every start position with a hit; the longest literal there implies its prefixes
+            text = f"{path_lower}\n{filename.lower()}"
+            sep = len(path_lower)
+            path_mask, name_mask = self.path_mask, self.name_mask
+            m = search(text)
+            while m:
+                start = m.start()
+                mask |= (path_mask if start < sep else name_mask)[m.group()]
+                m = search(text, start + 1)
+        return mask
+
+    def classify(self, path, filename, file_type=None, status=None, category=None):
+        """Result dict of the first matching rule (shared; do not mutate)"""
+        mask = self.test_mask(path, filename, file_type, status, category)
+        rules_by_bit = self.rules_by_bit
+        candidates = self.always
+        m = mask
+        while m:
+            low = m & -m
+            candidates |= rules_by_bit.get(low, 0)
+            m ^= low
+        compiled = self.compiled
+        while candidates:  # lowest rule index first
+            low = candidates & -candidates
+            i = low.bit_length() - 1
+            for clause in compiled[i]:
+                if not clause & mask:
+                    break
+            else:
+                return self.rules[i]
+            candidates ^= low
+        return self.default
+
+    def classify_linear(self, path, filename, file_type=None, status=None, category=None):
+        """Reference implementation: every rule in order, plain substring checks"""
+        path_lower, name_lower = path.lower(), filename.lower()
+        fields = {'filename': filename, 'suffix': suffix_of(filename), 'file_type': file_type,
+                  'status': status, 'category': category}
+        for rule in self.rules:
+            if all(any((v.lower() in path_lower) if t == 'path' else
+                       (v.lower() in name_lower) if t == 'name' else fields[t] == v
+                       for t, values in clause.items() for v in values)
+                   for clause in rule['when']):
+                return rule
+        return self.default
+
+def load_rules(rules_file=RULES_FILE):
+    """{section: Classifier} for every section of the rule table"""
+    with open(rules_file, 'r') as f:
+        table = json.load(f)
+    return {name: Classifier(section['rules'], section['default'])
+            for name, section in table.items() if not name.startswith('_')}
+
+# ---------------------------------------------------------------- benchmark
+
+def synthetic_entries(n, classifier, seed=7):
+    """n (path, filename, file_type, status, category) tuples mixing rule vocabulary
+    with noise, so every rule fires somewhere"""
+    rng = random.Random(seed)
+    path_vocab = [k[1].strip('/') for k in classifier.bits if k[0] == 'path'] + \
+                 ['data', 'coaches', 'jenny', 'students', 'curated', 'misc', 'v3', 'backup', 'old']
+    name_vocab = [k[1] for k in classifier.bits if k[0] == 'name'] + \
+                 ['huda', 'week', 'final', 'copy', 'notes', 'w012', '2024-09-06', 'draft', 'report']
+    values = {t: [k[1] for k in classifier.bits if k[0] == t] + [None] for t in ('file_type', 'status', 'category')}
+    exts = ['.pdf', '.docx', '.json', '.jsonl', '.txt', '.vtt', '.md', '.py', '.log', '']
+    for _ in range(n):
+        dirs = '/'.join(rng.choice(path_vocab) for _ in range(rng.randint(2, 7)))
+        stem = '_'.join(rng.choice(name_vocab) for _ in range(rng.randint(1, 4)))
+        filename = '.DS_Store' if rng.random() < 0.01 else stem + rng.choice(exts)
+        yield (f"/Users/snazir/ivylevel/{dirs}/{filename}", filename, rng.choice(values['file_type']),
+               rng.choice(values['status']), rng.choice(values['category']))
+
+def with_extra_rules(section, extra, seed=11):
+    """A copy of a table section with `extra` rules on tokens real paths never contain"""
+    rng = random.Random(seed)
+    rules = list(section.rules)
+    for i in range(extra):
+        token = f"zz{i}{rng.randrange(10 ** 6):06d}"
+        rules.insert(rng.randrange(len(rules) + 1), {
+            'when': [{'path': [f"/{token}/"]}, {'name': [token]}],
+            'bucket': f"extra_{i}", 'target': f"/extra/{token}/{{filename}}", 'reason': "synthetic"})
+    return Classifier(rules, section.default)
+
+def bench(n, section='bucket', extra=(0, 200, 1000)):
+    rules = load_rules()
+    base = rules[section]
+    print(f"🧪 Generating {n:,} synthetic paths...")
+    entries = list(synthetic_entries(n, base))
+    for k in extra:
+        clf = with_extra_rules(base, k) if k else base
+        t0 = time.perf_counter()
+        results = [clf.classify(*e) for e in entries]
+        fast = time.perf_counter() - t0
+        sample = entries[:max(1, n // 10)]
+        t0 = time.perf_counter()
+        linear = [clf.classify_linear(*e) for e in sample]
+        slow = (time.perf_counter() - t0) * n / len(sample)
+        mismatches = sum(a is not b for a, b in zip(results, linear))
+        print(f"  {len(clf.rules):5d} rules: compiled {fast:6.2f}s ({n / fast:,.0f} paths/s), "
+              f"linear ~{slow:6.2f}s, {mismatches} mismatches on {len(sample):,} checked")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', nargs='?', help="classify one path")
+    parser.add_argument('--file-type')
+    parser.add_argument('--status')
+    parser.add_argument('--category')
+    parser.add_argument('--bench', type=int, metavar='N', help="benchmark N synthetic paths")
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.bench)
+        return
+    if not args.path:
+        parser.error("give a path or --bench N")
+    rules = load_rules()
+    filename = Path(args.path).name
+    category = args.category or rules['semantic_category'].classify(args.path, filename)['category']
+    result = rules['bucket'].classify(args.path, filename, args.file_type, args.status, category)
+    print(f"category: {category}")
+    print(f"bucket:   {result['bucket']}")
+    print(f"target:   {result['target'].format(filename=filename)}")
+    print(f"reason:   {result['reason']}")
+
+if __name__ == "__main__":
+    sys.exit(main())
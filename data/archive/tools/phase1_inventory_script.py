@@ -2,15 +2,41 @@
 """
 PHASE 1: Full Directory + File Inventory Scanner
 Recursively scans target directories and creates comprehensive file inventory
+
+Duplicate detection only hashes files that can be duplicates: files are grouped by
+size first, size collisions are compared on a head/tail sample, and only sample
+collisions are hashed in full (xxh3 / BLAKE3 when installed, else blake2b) across
+a thread pool with large reads.
+
+Repeated scans go through a persistent cache (CACHE_PATH) keyed by path plus
+(inode, size, mtime_ns): unchanged files reuse their classification and hashes,
+so only new or modified files are classified or read.
 """
 
 import os
 import json
+import time
 import hashlib
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from path_rules import load_rules, rules_digest
+
+try:
+    import xxhash
+    HASH_ALGO = 'xxh3_128'
+    new_hasher = xxhash.xxh3_128
+except ImportError:
+    try:
+        import blake3
+        HASH_ALGO = 'blake3'
+        new_hasher = blake3.blake3
+    except ImportError:
+        HASH_ALGO = 'blake2b-128'
+        new_hasher = lambda: hashlib.blake2b(digest_size=16)
+
 # Target directories
 TARGET_DIRS = [
     "/Users/snazir/ivylevel-multiagents-v4.0/data/coaches/jenny",
@@ -20,17 +46,123 @@ TARGET_DIRS = [
     "/Users/snazir/ivylevel-multiagents-v4.0/data/personas/jenny"
 ]
 
-def get_file_hash(filepath, chunk_size=8192):
-    """Generate MD5 hash for duplicate detection"""
+CACHE_PATH = '/Users/snazir/ivylevel-multiagents-v4.0/data/.phase1_inventory_cache.json'
+CACHE_VERSION = 1
+
+CATEGORY_RULES = load_rules()['semantic_category']
+
+READ_SIZE = 1024 * 1024      # full-hash read size
+SAMPLE_SIZE = 64 * 1024      # bytes read from each end for the sample hash
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+def get_file_hash(filepath, chunk_size=READ_SIZE):
+    """Hash the whole file for duplicate detection"""
+    try:
+        hasher = new_hasher()
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        with open(filepath, 'rb', buffering=0) as f:
+            while n := f.readinto(buf):
+                hasher.update(view[:n])
+        return hasher.hexdigest()
+    except OSError:
+        return None
+
+def get_sample_hash(filepath, size, sample_size=SAMPLE_SIZE):
+    """Hash the first and last sample_size bytes; small files are hashed whole,
+    so for them the sample hash is the full hash"""
+    if size <= 2 * sample_size:
+        return get_file_hash(filepath)
     try:
-        hasher = hashlib.md5()
-        with open(filepath, 'rb') as f:
-            while chunk := f.read(chunk_size):
-                hasher.update(chunk)
+        hasher = new_hasher()
+        with open(filepath, 'rb', buffering=0) as f:
+            hasher.update(f.read(sample_size))
+            f.seek(-sample_size, os.SEEK_END)
+            hasher.update(f.read(sample_size))
         return hasher.hexdigest()
-    except:
+    except OSError:
         return None
 
+def hash_candidates(candidates, workers=HASH_WORKERS, known=None):
+    """Full hashes for every candidate that could be a duplicate.
+
+    candidates: (filepath, size) pairs. Files with a unique size are never read;
+    size collisions are compared on a head/tail sample, and only sample collisions
+    are read in full. known: {filepath: [sample_hash, file_hash]} for unchanged files
+    (from the inventory cache); it is updated in place with every hash computed here.
+    Returns ({filepath: hash}, counters).
+    """
+    known = {} if known is None else known
+    by_size = defaultdict(list)
+    for filepath, size in candidates:
+        by_size[size].append(filepath)
+    sampled = [(fp, size) for size, fps in by_size.items() if len(fps) > 1 for fp in fps]
+
+    hashes = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        to_sample = [(fp, size) for fp, size in sampled if not known.get(fp, [None])[0]]
+        for (filepath, _), sample in zip(to_sample, pool.map(lambda c: get_sample_hash(*c), to_sample)):
+            known[filepath] = [sample, None]
+        by_sample = defaultdict(list)
+        for filepath, size in sampled:
+            sample = known[filepath][0]
+            if sample:
+                by_sample[(size, sample)].append(filepath)
+
+        full = []
+        for (size, sample), fps in by_sample.items():
+            if len(fps) < 2:
+                continue
+            if size <= 2 * SAMPLE_SIZE:
+                hashes.update((fp, sample) for fp in fps)
+            else:
+                full.extend(fps)
+        to_hash = [fp for fp in full if not known[fp][1]]
+        for filepath, file_hash in zip(to_hash, pool.map(get_file_hash, to_hash)):
+            known[filepath][1] = file_hash
+        hashes.update((fp, known[fp][1]) for fp in full if known[fp][1])
+
+    counters = {'candidates': len(candidates), 'sampled': len(to_sample), 'full_hashed': len(to_hash),
+                'reused': len(sampled) - len(to_sample)}
+    return hashes, counters
+
+def load_cache(cache_path=CACHE_PATH):
+    """{filepath: cached record}; empty when missing, unreadable or written by another
+    hash algorithm / sample size / rule table"""
+    try:
+        with open(cache_path, 'r') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if (cache.get('version'), cache.get('hash_algo'), cache.get('sample_size'), cache.get('rules')) != \
+            (CACHE_VERSION, HASH_ALGO, SAMPLE_SIZE, rules_digest()):
+        return {}
+    return cache.get('files', {})
+
+def save_cache(files, cache_path=CACHE_PATH):
+    tmp = cache_path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump({'version': CACHE_VERSION, 'hash_algo': HASH_ALGO, 'sample_size': SAMPLE_SIZE,
+                   'rules': rules_digest(), 'files': files}, f, separators=(',', ':'))
+    os.replace(tmp, cache_path)
+
+def iter_files(target_dir):
+    """DirEntry for every regular file under target_dir, in os.walk order (a
+    directory's files before its subdirectories); symlinked directories are not followed"""
+    stack = [target_dir]
+    while stack:
+        subdirs = []
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError as e:
+            print(f"❌ Error scanning {e.filename}: {e}")
+        stack.extend(reversed(subdirs))
+
 def get_file_type(filepath):
     """Detect file type from extension"""
     ext = Path(filepath).suffix.lower()
@@ -64,41 +196,8 @@ def classify_file_status(filepath):
         return 'UNKNOWN'
 
 def classify_semantic_category(filepath, filename):
-    """Classify file's semantic category"""
-    path_lower = filepath.lower()
-    filename_lower = filename.lower()
-
-    # Check path patterns
-    if '/01-assess-session' in path_lower or 'assessment' in filename_lower:
-        return 'assessment transcript'
-    elif '/02-gameplan-report' in path_lower or 'gameplan' in filename_lower:
-        return 'game plan report'
-    elif '/03-all-session' in path_lower or 'trans-intel' in filename_lower or 'trans-raw' in filename_lower:
-        return 'full-session coaching transcript'
-    elif '/04-execdoc' in path_lower or 'exec-intel' in filename_lower or 'exec-raw' in filename_lower:
-        return 'weekly execution docs'
-    elif '/05-imessage' in path_lower or 'imsg' in filename_lower or 'imessage' in filename_lower:
-        return 'iMessage history'
-    elif '/06-kb-chips' in path_lower or 'intel_chips' in filename_lower or 'kb_' in filename_lower:
-        return 'intel chip (kb/imsg/exec)'
-    elif '/07-eq-chips' in path_lower or 'eq_' in filename_lower:
-        return 'EQ chip'
-    elif '/06-college-application' in path_lower or 'common app' in filename_lower:
-        return 'college application files'
-    elif 'framework' in filename_lower or '/frameworks/' in path_lower:
-        return 'narrative framework'
-    elif 'strategy' in filename_lower or 'tactics' in filename_lower:
-        return 'strategy/tactics document'
-    elif 'persona' in path_lower or 'archetype' in filename_lower:
-        return 'persona/archetype data'
-    elif filename.endswith('.py') or filename.endswith('.log'):
-        return 'tooling/scripts'
-    elif 'precision_probe' in filename_lower or 'validation' in filename_lower:
-        return 'QA/validation files'
-    elif filename == '.DS_Store':
-        return 'system files'
-    else:
-        return 'miscellaneous'
+    """Classify file's semantic category (rules: classification_rules.json)"""
+    return CATEGORY_RULES.classify(filepath, filename)['category']
 
 def format_size(size_bytes):
     """Format file size in KB/MB"""
@@ -109,13 +208,18 @@ def format_size(size_bytes):
     else:
         return f"{size_bytes / (1024 * 1024):.2f}MB"
 
-def scan_directories():
-    """Main scanning function"""
+def scan_directories(target_dirs=TARGET_DIRS, workers=HASH_WORKERS, cache_path=CACHE_PATH):
+    """Main scanning function (cache_path=None disables the inventory cache)"""
     print("🔍 Starting PHASE 1: Full Directory + File Inventory Scan...")
     print("=" * 80)
 
     inventory = []
+    candidates = []  # (filepath, size) of files eligible for duplicate detection
     hash_map = defaultdict(list)  # For duplicate detection
+    cached = load_cache(cache_path) if cache_path else {}
+    fresh = {}  # cache records for this scan
+    known = {}  # filepath -> [sample_hash, file_hash] of unchanged files
+    reused = 0
     stats = {
         'total_files': 0,
         'total_size': 0,
@@ -125,76 +229,102 @@ def scan_directories():
         'duplicates': 0
     }
 
-    for target_dir in TARGET_DIRS:
+    t0 = time.perf_counter()
+    for target_dir in target_dirs:
         if not os.path.exists(target_dir):
             print(f"⚠️  Directory not found: {target_dir}")
             continue
 
         print(f"\n📂 Scanning: {target_dir}")
 
-        for root, dirs, files in os.walk(target_dir):
-            for filename in files:
-                filepath = os.path.join(root, filename)
-
-                try:
-                    # Get file stats
-                    file_stat = os.stat(filepath)
-                    file_size = file_stat.st_size
-
-                    # Skip empty files
-                    if file_size == 0:
-                        continue
-
-                    # Classify file
-                    file_type = get_file_type(filepath)
-                    file_status = classify_file_status(filepath)
-                    semantic_category = classify_semantic_category(filepath, filename)
-
-                    # Get hash for duplicate detection (only for non-system files)
-                    file_hash = None
-                    is_duplicate = False
-                    duplicate_of = None
-
-                    if file_type not in ['system', 'log'] and file_size > 100:
-                        file_hash = get_file_hash(filepath)
-                        if file_hash:
-                            if file_hash in hash_map:
-                                is_duplicate = True
-                                duplicate_of = hash_map[file_hash][0]['absolute_path']
-                                stats['duplicates'] += 1
-                            hash_map[file_hash].append({'absolute_path': filepath})
-
-                    # Build inventory entry
-                    entry = {
-                        'absolute_path': filepath,
-                        'filename': filename,
-                        'file_type': file_type,
-                        'size_bytes': file_size,
-                        'size_formatted': format_size(file_size),
-                        'status': file_status,
-                        'semantic_category': semantic_category,
-                        'is_duplicate': is_duplicate,
-                        'duplicate_of': duplicate_of,
-                        'file_hash': file_hash
+        for dir_entry in iter_files(target_dir):
+            filepath = dir_entry.path
+            filename = dir_entry.name
+
+            try:
+                # Get file stats
+                file_stat = dir_entry.stat()
+                file_size = file_stat.st_size
+
+                # Skip empty files
+                if file_size == 0:
+                    continue
+
+                # Classify file, or reuse the cached classification when unchanged
+                key = [dir_entry.inode(), file_size, file_stat.st_mtime_ns]
+                record = cached.get(filepath)
+                if record and record['key'] == key:
+                    reused += 1
+                    known[filepath] = [record['sample_hash'], record['file_hash']]
+                else:
+                    record = {
+                        'key': key,
+                        'file_type': get_file_type(filepath),
+                        'status': classify_file_status(filepath),
+                        'semantic_category': classify_semantic_category(filepath, filename),
                     }
-
-                    inventory.append(entry)
-
-                    # Update stats
-                    stats['total_files'] += 1
-                    stats['total_size'] += file_size
-                    stats['by_type'][file_type] += 1
-                    stats['by_status'][file_status] += 1
-                    stats['by_category'][semantic_category] += 1
-
-                except Exception as e:
-                    print(f"❌ Error processing {filepath}: {e}")
+                fresh[filepath] = record
+                file_type = record['file_type']
+                file_status = record['status']
+                semantic_category = record['semantic_category']
+
+                # Hashed after the walk, once sizes are known (only for non-system files)
+                if file_type not in ['system', 'log'] and file_size > 100:
+                    candidates.append((filepath, file_size))
+
+                # Build inventory entry
+                entry = {
+                    'absolute_path': filepath,
+                    'filename': filename,
+                    'file_type': file_type,
+                    'size_bytes': file_size,
+                    'size_formatted': format_size(file_size),
+                    'status': file_status,
+                    'semantic_category': semantic_category,
+                    'is_duplicate': False,
+                    'duplicate_of': None,
+                    'file_hash': None
+                }
+
+                inventory.append(entry)
+
+                # Update stats
+                stats['total_files'] += 1
+                stats['total_size'] += file_size
+                stats['by_type'][file_type] += 1
+                stats['by_status'][file_status] += 1
+                stats['by_category'][semantic_category] += 1
+
+            except Exception as e:
+                print(f"❌ Error processing {filepath}: {e}")
+
+    t1 = time.perf_counter()
+    hashes, counters = hash_candidates(candidates, workers, known)
+    if cache_path:
+        for filepath, record in fresh.items():
+            record['sample_hash'], record['file_hash'] = known.get(filepath, [None, None])
+        save_cache(fresh, cache_path)
+    for entry in inventory:  # walk order, so the first copy seen is the original
+        file_hash = hashes.get(entry['absolute_path'])
+        if not file_hash:
+            continue
+        entry['file_hash'] = file_hash
+        if file_hash in hash_map:
+            entry['is_duplicate'] = True
+            entry['duplicate_of'] = hash_map[file_hash][0]['absolute_path']
+            stats['duplicates'] += 1
+        hash_map[file_hash].append({'absolute_path': entry['absolute_path']})
+    stats['hashing'] = dict(counters, algorithm=HASH_ALGO, cached_files=reused,
+                            walk_seconds=round(t1 - t0, 3), hash_seconds=round(time.perf_counter() - t1, 3))
 
     print("\n" + "=" * 80)
     print("✅ Scan complete!")
     print(f"📊 Total files: {stats['total_files']}")
     print(f"💾 Total size: {format_size(stats['total_size'])}")
     print(f"🔄 Duplicates found: {stats['duplicates']}")
+    print(f"♻️  Reused {reused} unchanged files from the inventory cache")
+    print(f"🔑 Hashed {counters['sampled']} size collisions, {counters['full_hashed']} in full "
+          f"({counters['candidates']} candidates, {HASH_ALGO}, {stats['hashing']['hash_seconds']:.2f}s)")
 
     return inventory, stats, hash_map
 
@@ -211,6 +341,7 @@ def main():
             'total_size_bytes': stats['total_size'],
             'total_size_formatted': format_size(stats['total_size']),
             'duplicates_found': stats['duplicates'],
+            'hashing': stats['hashing'],
             'by_file_type': dict(stats['by_type']),
             'by_status': dict(stats['by_status']),
             'by_semantic_category': dict(stats['by_category'])
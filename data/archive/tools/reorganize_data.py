@@ -2,15 +2,34 @@
 """
 Data Reorganization Script - IvyLevel v4.0
 Safely reorganizes files according to PHASE2_FILE_MAPPING.json
+
+Files are placed with the cheapest method the filesystem supports (--mode auto):
+a reflink (FICLONE, copy-on-write, so edits never leak between copies), else a
+hardlink (shares the inode: treat the tree as read-only), else a real copy.
+A file whose content already sits at its target (or at one of the target's _N
+variants) is skipped instead of being copied again under a new suffix.
+
+Execution is planned, journaled and parallel:
+- the mapping is resolved up front into an exact plan (final target, action and
+  byte cost per file); --dry-run writes it to REORGANIZATION_PLAN.json and stops
+- the plan and per-file intent/done records go to a journal (fsynced per batch
+  before the batch's files are touched); files are placed by a bounded thread pool
+- after a crash, --resume finishes the journaled plan (partially written targets
+  are checked and redone) and --rollback removes every target the journal marks done
 """
 
 import os
+import sys
 import json
 import shutil
+import argparse
 from pathlib import Path
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from phase1_inventory_script import get_file_hash
+
 # Base paths
 BASE_DATA_DIR = Path("/Users/snazir/ivylevel-multiagents-v4.0/data")
 NEW_STRUCTURE_ROOT = BASE_DATA_DIR / "v4_organized"
@@ -18,151 +37,389 @@ NEW_STRUCTURE_ROOT = BASE_DATA_DIR / "v4_organized"
 # Load the mapping
 MAPPING_FILE = BASE_DATA_DIR / "PHASE2_FILE_MAPPING.json"
 
+# How files are placed; 'auto' tries each method in turn
+LINK_MODES = {
+    'auto': ('reflink', 'hardlink', 'copy'),
+    'reflink': ('reflink',),
+    'hardlink': ('hardlink',),
+    'copy': ('copy',),
+}
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+# Journaled execution
+JOURNAL_FILE = BASE_DATA_DIR / ".reorganize_journal.jsonl"
+PLAN_FILE = BASE_DATA_DIR / "REORGANIZATION_PLAN.json"
+WORKERS = 8
+BATCH_SIZE = 256  # files per journal fsync / pool round
+
+# The v4 directory structure (relative to NEW_STRUCTURE_ROOT)
+NEW_DIRS = (
+    # Coaches/Jenny structure
+    "coaches/jenny/raw/huda/01_assess_session",
+    "coaches/jenny/raw/huda/02_gameplan_reports",
+    "coaches/jenny/raw/huda/03_session_transcripts",
+    "coaches/jenny/raw/huda/04_exec_docs",
+    "coaches/jenny/raw/huda/05_imessage",
+    "coaches/jenny/raw/huda/06_college_apps",
+    "coaches/jenny/raw/huda/misc",
+    "coaches/jenny/raw/other_students/assess",
+    "coaches/jenny/raw/other_students/gameplans",
+    "coaches/jenny/raw/other_students/misc",
+    "coaches/jenny/raw/misc",
+
+    # Curated KB chips
+    "coaches/jenny/curated/kb_chips/session",
+    "coaches/jenny/curated/kb_chips/imsg",
+    "coaches/jenny/curated/kb_chips/exec",
+    "coaches/jenny/curated/kb_chips/assess_gameplan",
+    "coaches/jenny/curated/kb_chips/session_extractions",
+    "coaches/jenny/curated/kb_chips/gameplan_extractions",
+    "coaches/jenny/curated/kb_chips/imsg_extractions",
+    "coaches/jenny/curated/kb_chips/exec_extractions",
+    "coaches/jenny/curated/kb_chips/misc",
+
+    # EQ chips
+    "coaches/jenny/curated/eq_chips/sessions",
+    "coaches/jenny/curated/eq_chips/imsg",
+    "coaches/jenny/curated/eq_chips/patterns",
+
+    # Frameworks
+    "coaches/jenny/curated/frameworks/strategic",
+    "coaches/jenny/curated/frameworks/tactical",
+    "coaches/jenny/curated/frameworks/persona",
+
+    # Narrative
+    "coaches/jenny/curated/narrative/archetypes",
+    "coaches/jenny/curated/narrative/templates",
+    "coaches/jenny/curated/narrative/persona",
+
+    # Students
+    "students/jenny_assessments_v1",
+    "students/jenny_assessments_v1/extractions",
+
+    # Reports
+    "reports",
+
+    # Archive
+    "archive/system",
+    "archive/qa_tools",
+    "archive/tools",
+    "archive/college_apps",
+    "archive/misc"
+)
+
+def structure_dirs():
+    """Every directory create_new_structure() makes, including intermediate ones"""
+    dirs = set()
+    for dir_path in NEW_DIRS:
+        path = NEW_STRUCTURE_ROOT / dir_path
+        while path != NEW_STRUCTURE_ROOT:
+            dirs.add(str(path))
+            path = path.parent
+    return dirs
+
 def create_new_structure():
     """Create the new v4 directory structure"""
     print("📁 Creating new v4 directory structure...")
 
-    dirs_to_create = [
-        # Coaches/Jenny structure
-        "coaches/jenny/raw/huda/01_assess_session",
-        "coaches/jenny/raw/huda/02_gameplan_reports",
-        "coaches/jenny/raw/huda/03_session_transcripts",
-        "coaches/jenny/raw/huda/04_exec_docs",
-        "coaches/jenny/raw/huda/05_imessage",
-        "coaches/jenny/raw/huda/06_college_apps",
-        "coaches/jenny/raw/huda/misc",
-        "coaches/jenny/raw/other_students/assess",
-        "coaches/jenny/raw/other_students/gameplans",
-        "coaches/jenny/raw/other_students/misc",
-        "coaches/jenny/raw/misc",
-
-        # Curated KB chips
-        "coaches/jenny/curated/kb_chips/session",
-        "coaches/jenny/curated/kb_chips/imsg",
-        "coaches/jenny/curated/kb_chips/exec",
-        "coaches/jenny/curated/kb_chips/assess_gameplan",
-        "coaches/jenny/curated/kb_chips/session_extractions",
-        "coaches/jenny/curated/kb_chips/gameplan_extractions",
-        "coaches/jenny/curated/kb_chips/imsg_extractions",
-        "coaches/jenny/curated/kb_chips/exec_extractions",
-        "coaches/jenny/curated/kb_chips/misc",
-
-        # EQ chips
-        "coaches/jenny/curated/eq_chips/sessions",
-        "coaches/jenny/curated/eq_chips/imsg",
-        "coaches/jenny/curated/eq_chips/patterns",
-
-        # Frameworks
-        "coaches/jenny/curated/frameworks/strategic",
-        "coaches/jenny/curated/frameworks/tactical",
-        "coaches/jenny/curated/frameworks/persona",
-
-        # Narrative
-        "coaches/jenny/curated/narrative/archetypes",
-        "coaches/jenny/curated/narrative/templates",
-        "coaches/jenny/curated/narrative/persona",
-
-        # Students
-        "students/jenny_assessments_v1",
-        "students/jenny_assessments_v1/extractions",
-
-        # Reports
-        "reports",
-
-        # Archive
-        "archive/system",
-        "archive/qa_tools",
-        "archive/tools",
-        "archive/college_apps",
-        "archive/misc"
-    ]
-
-    for dir_path in dirs_to_create:
+    for dir_path in NEW_DIRS:
         full_path = NEW_STRUCTURE_ROOT / dir_path
         full_path.mkdir(parents=True, exist_ok=True)
 
-    print(f"✅ Created {len(dirs_to_create)} directories")
-
-def copy_file_to_new_location(source_path, recommended_target):
-    """Copy a file to its new location"""
-    source = Path(source_path)
+    print(f"✅ Created {len(NEW_DIRS)} directories")
 
-    # Handle the recommended_target path
+def reflink(source, target):
+    """Copy-on-write clone of source at target (btrfs, XFS, bcachefs, ...)"""
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks need fcntl (POSIX)")
+    try:
+        with open(source, 'rb') as src, open(target, 'xb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        if os.path.exists(target) and os.path.getsize(target) == 0:
+            os.unlink(target)
+        raise
+    shutil.copystat(source, target)
+
+def place_file(source, target, mode='auto'):
+    """Create target from source with the first method that works; returns its name"""
+    error = None
+    for method in LINK_MODES[mode]:
+        try:
+            if method == 'reflink':
+                reflink(source, target)
+            elif method == 'hardlink':
+                os.link(source, target)
+            else:
+                shutil.copy2(source, target)
+            return method
+        except OSError as e:
+            error = e
+    raise error
+
+def same_content(source, target, source_hash):
+    """True if target already holds source's bytes; source_hash() is called lazily"""
+    try:
+        s, t = os.stat(source), os.stat(target)
+    except OSError:
+        return False
+    if (s.st_dev, s.st_ino) == (t.st_dev, t.st_ino):
+        return True
+    return s.st_size == t.st_size and source_hash() == get_file_hash(target)
+
+def lazy_hash(path):
+    """get_file_hash(path), computed at most once"""
+    digest = []
+
+    def source_hash():
+        if not digest:
+            digest.append(get_file_hash(path))
+        return digest[0]
+    return source_hash
+
+def plan_target(source, recommended_target, claimed, dirs=frozenset()):
+    """Final target for source: (target, 'place') for a free path, or (target,
+    'deduplicated') when target or one of its _N variants already holds the content.
+
+    A target ending in "/" names a directory: the source's filename is appended.
+    claimed maps targets planned earlier in the same run to their sources, and dirs
+    holds the directories create_new_structure() will make, so a plan resolves
+    collisions exactly as executing it would.
+    """
     # Remove leading slash if present
-    target_rel = recommended_target.lstrip('/')
-    target = NEW_STRUCTURE_ROOT / target_rel
-
-    # Ensure target directory exists
-    target.parent.mkdir(parents=True, exist_ok=True)
-
-    # Handle duplicate filenames by appending counter
-    if target.exists():
-        counter = 1
-        stem = target.stem
-        suffix = target.suffix
-        while target.exists():
-            target = target.parent / f"{stem}_{counter}{suffix}"
-            counter += 1
-
-    # Copy the file
+    recommended_target = recommended_target.lstrip('/')
+    if not recommended_target or recommended_target.endswith('/'):
+        recommended_target += os.path.basename(source)
+    target = NEW_STRUCTURE_ROOT / recommended_target
+    stem, suffix = target.stem, target.suffix
+    source_hash = lazy_hash(source)
+    counter = 1
+    while True:
+        holder = claimed.get(str(target))
+        is_dir = str(target) in dirs or target.is_dir()
+        if holder is None and not is_dir and not os.path.lexists(target):
+            return target, 'place'
+        if not is_dir and same_content(source, holder or target, source_hash):
+            return target, 'deduplicated'
+        target = target.parent / f"{stem}_{counter}{suffix}"
+        counter += 1
+
+def links_possible(source, mode):
+    """Whether mode can place source without copying data (same filesystem)"""
+    if mode == 'copy':
+        return False
+    probe = NEW_STRUCTURE_ROOT
+    while not probe.exists() and probe != probe.parent:
+        probe = probe.parent
     try:
-        shutil.copy2(source, target)
-        return True, str(target)
-    except Exception as e:
-        return False, str(e)
+        return os.stat(source).st_dev == os.stat(probe).st_dev
+    except OSError:
+        return False
+
+def build_plan(mappings, mode):
+    """Resolve every mapping into an op with its final target and byte cost"""
+    ops = []
+    claimed = {}
+    dirs = structure_dirs()
+    for seq, mapping in enumerate(mappings):
+        source_path = mapping['source_path']
+        op = {
+            'seq': seq,
+            'source': source_path,
+            'bucket': mapping['recommended_bucket'],
+            'filename': mapping['filename'],
+            'recommended_target': mapping['recommended_target'],
+        }
+        try:
+            size = os.stat(source_path).st_size
+        except OSError:
+            op.update(action='missing', target=None, size=0, bytes=0)
+            ops.append(op)
+            continue
+        target, action = plan_target(source_path, mapping['recommended_target'], claimed, dirs)
+        if action == 'place':
+            claimed[str(target)] = source_path
+        cost = size if action == 'place' and not links_possible(source_path, mode) else 0
+        op.update(action=action, target=str(target), size=size, bytes=cost)
+        ops.append(op)
+
+    summary = defaultdict(int)
+    for op in ops:
+        summary[op['action']] += 1
+        summary['bytes_to_write'] += op['bytes']
+        summary['bytes_total'] += op['size'] if op['action'] == 'place' else 0
+    return {
+        'created': datetime.now().isoformat(),
+        'mode': mode,
+        'new_structure_location': str(NEW_STRUCTURE_ROOT),
+        'summary': dict(summary),
+        'ops': ops,
+    }
 
-def reorganize_files():
-    """Main reorganization function"""
+# ---------------------------------------------------------------- journal
+
+def append_journal(journal, records):
+    for record in records:
+        journal.write(json.dumps(record) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+
+def start_journal(plan, journal_path=JOURNAL_FILE):
+    """Write the plan as the journal header (atomically, replacing a finished journal)"""
+    tmp = Path(str(journal_path) + '.tmp')
+    with open(tmp, 'w') as f:
+        append_journal(f, [{'journal': 1, 'plan': plan}])
+    os.replace(tmp, journal_path)
+
+def read_journal(journal_path=JOURNAL_FILE):
+    """(plan, {seq: last state record}, complete); a torn last line is ignored"""
+    plan, states, complete = None, {}, False
+    with open(journal_path, 'r') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if 'plan' in record:
+                plan = record['plan']
+            elif record.get('state') == 'complete':
+                complete = True
+            else:
+                states[record['seq']] = record
+    return plan, states, complete
+
+def execute_op(op, mode):
+    """Place one planned file; returns its journal record"""
+    source, target = op['source'], Path(op['target'])
+    try:
+        if os.path.lexists(target):
+            if not (target.is_symlink() or target.is_file()):
+                raise IsADirectoryError(f"target is not a regular file: {target}")
+            # left behind by an interrupted run: keep it if complete, else redo it
+            if same_content(source, target, lazy_hash(source)):
+                return {'seq': op['seq'], 'state': 'done', 'method': 'resumed'}
+            target.unlink()
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return {'seq': op['seq'], 'state': 'done', 'method': place_file(source, target, mode)}
+    except Exception as e:
+        return {'seq': op['seq'], 'state': 'failed', 'error': str(e)}
+
+def execute_plan(plan, workers=WORKERS, journal_path=JOURNAL_FILE, states=None):
+    """Run the plan's 'place' ops not already done; returns {seq: final record}.
+
+    Each batch's intents are fsynced before any of its files are touched, so the
+    journal always names every target that may exist.
+    """
+    states = dict(states or {})
+    pending = [op for op in plan['ops']
+               if op['action'] == 'place' and states.get(op['seq'], {}).get('state') != 'done']
+    done = len(plan['ops']) - len(pending)
+    with open(journal_path, 'a') as journal, ThreadPoolExecutor(max_workers=workers) as pool:
+        for i in range(0, len(pending), BATCH_SIZE):
+            batch = pending[i:i + BATCH_SIZE]
+            append_journal(journal, ({'seq': op['seq'], 'state': 'intent'} for op in batch))
+            results = list(pool.map(lambda op: execute_op(op, plan['mode']), batch))
+            append_journal(journal, results)
+            states.update((r['seq'], r) for r in results)
+            done += len(batch)
+            print(f"  Progress: {done}/{len(plan['ops'])} files...")
+        if all(states.get(op['seq'], {}).get('state') == 'done' for op in pending):
+            append_journal(journal, [{'state': 'complete'}])
+    return states
+
+def rollback(journal_path=JOURNAL_FILE):
+    """Remove every target the journal marks done, then empty parent dirs.
+
+    Failed or interrupted ops are left alone (their target may not be ours), and only
+    regular files and symlinks are ever unlinked.
+    """
+    plan, states, _ = read_journal(journal_path)
+    ops = {op['seq']: op for op in plan['ops']}
+    root = Path(plan['new_structure_location'])
+    removed = 0
+    parents = set()
+    for seq, record in states.items():
+        if record.get('state') != 'done':
+            continue
+        target = Path(ops[seq]['target'])
+        if target.is_symlink() or target.is_file():
+            target.unlink()
+            removed += 1
+            parents.add(target.parent)
+    for parent in sorted(parents, key=lambda p: -len(p.parts)):
+        while parent != root and root in parent.parents:
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+            parent = parent.parent
+    os.replace(journal_path, str(journal_path) + '.rolledback')
+    return removed
+
+# ---------------------------------------------------------------- run
+
+def reorganize_files(mode='copy', workers=WORKERS, dry_run=False, resume=False):
+    """Main reorganization function; returns (stats, errors, plan)"""
     print("🔄 Starting file reorganization...")
     print("=" * 80)
 
-    # Load mapping
-    with open(MAPPING_FILE, 'r') as f:
-        mapping_data = json.load(f)
-
-    mappings = mapping_data['file_mappings']
+    if resume:
+        plan, states, _ = read_journal(JOURNAL_FILE)
+        print(f"  Resuming journal {JOURNAL_FILE} ({sum(1 for r in states.values() if r['state'] == 'done')} done)")
+    else:
+        # Load mapping
+        with open(MAPPING_FILE, 'r') as f:
+            mapping_data = json.load(f)
+        plan = build_plan(mapping_data['file_mappings'], mode)
+        states = {}
 
     stats = {
-        'total': len(mappings),
+        'total': len(plan['ops']),
         'success': 0,
         'failed': 0,
         'skipped': 0,
+        'deduplicated': 0,
+        'bytes_written': 0,
+        'by_method': defaultdict(int),
         'by_bucket': defaultdict(int)
     }
-
     errors = []
+    if dry_run:
+        return stats, errors, plan
 
-    for i, mapping in enumerate(mappings, 1):
-        source_path = mapping['source_path']
-        recommended_target = mapping['recommended_target']
-        bucket = mapping['recommended_bucket']
-        filename = mapping['filename']
-
-        # Progress indicator
-        if i % 50 == 0:
-            print(f"  Progress: {i}/{stats['total']} files...")
+    if not resume:
+        create_new_structure()
+        start_journal(plan, JOURNAL_FILE)
+    states = execute_plan(plan, workers, JOURNAL_FILE, states)
 
-        # Check if source exists
-        if not Path(source_path).exists():
+    for op in plan['ops']:
+        if op['action'] == 'missing':
             stats['skipped'] += 1
             continue
-
-        # Copy file
-        success, result = copy_file_to_new_location(source_path, recommended_target)
-
-        if success:
-            stats['success'] += 1
-            stats['by_bucket'][bucket] += 1
+        if op['action'] == 'deduplicated':
+            method = 'deduplicated'
+            stats['deduplicated'] += 1
         else:
-            stats['failed'] += 1
-            errors.append({
-                'file': filename,
-                'source': source_path,
-                'target': recommended_target,
-                'error': result
-            })
-
-    return stats, errors
+            record = states.get(op['seq'], {})
+            if record.get('state') != 'done':
+                stats['failed'] += 1
+                errors.append({
+                    'file': op['filename'],
+                    'source': op['source'],
+                    'target': op['target'],
+                    'error': record.get('error', 'not executed')
+                })
+                continue
+            method = record['method']
+            if method == 'copy':
+                stats['bytes_written'] += op['size']
+        stats['success'] += 1
+        stats['by_bucket'][op['bucket']] += 1
+        stats['by_method'][method] += 1
+
+    return stats, errors, plan
 
 def generate_report(stats, errors):
     """Generate final reorganization report"""
@@ -170,11 +427,15 @@ def generate_report(stats, errors):
         'reorganization_timestamp': datetime.now().isoformat(),
         'backup_location': '/Users/snazir/ivylevel-multiagents-v4.0/data_backup_20251119.tar.gz',
         'new_structure_location': str(NEW_STRUCTURE_ROOT),
+        'journal': str(JOURNAL_FILE),
         'statistics': {
             'total_files': stats['total'],
             'successfully_copied': stats['success'],
             'failed': stats['failed'],
             'skipped': stats['skipped'],
+            'deduplicated': stats['deduplicated'],
+            'bytes_written': stats['bytes_written'],
+            'by_method': dict(stats['by_method']),
             'by_bucket': dict(stats['by_bucket'])
         },
         'errors': errors
@@ -189,23 +450,54 @@ def generate_report(stats, errors):
 
 def main():
     """Execute reorganization"""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=sorted(LINK_MODES), default='auto',
+                        help="how files are placed: reflink, hardlink, copy, or auto (first that works)")
+    parser.add_argument('--workers', type=int, default=WORKERS, help="files placed concurrently")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument('--dry-run', action='store_true', help=f"write the exact plan to {PLAN_FILE.name} and stop")
+    action.add_argument('--resume', action='store_true', help="finish the plan in an interrupted journal")
+    action.add_argument('--rollback', action='store_true', help="remove every file the journal created")
+    args = parser.parse_args()
+
+    if (args.resume or args.rollback) and not JOURNAL_FILE.exists():
+        print(f"❌ No journal at {JOURNAL_FILE}: nothing to {'resume' if args.resume else 'roll back'}",
+              file=sys.stderr)
+        sys.exit(1)
+    if args.rollback:
+        removed = rollback(JOURNAL_FILE)
+        print(f"↩️  Rolled back {removed} files from {JOURNAL_FILE}")
+        return
+    if JOURNAL_FILE.exists() and not args.resume and not args.dry_run and not read_journal(JOURNAL_FILE)[2]:
+        print(f"❌ Unfinished journal at {JOURNAL_FILE}: run with --resume or --rollback first", file=sys.stderr)
+        sys.exit(1)
+
     print("🚀 IvyLevel v4.0 Data Reorganization")
     print("=" * 80)
     print(f"Timestamp: {datetime.now().isoformat()}")
     print(f"Backup: data_backup_20251119.tar.gz (36 MB)")
     print(f"New structure: {NEW_STRUCTURE_ROOT}")
+    print(f"Mode: {args.mode}")
     print("=" * 80)
     print()
 
-    # Step 1: Create new structure
-    create_new_structure()
-    print()
-
-    # Step 2: Reorganize files
-    stats, errors = reorganize_files()
+    # Step 1: Plan, create the new structure and place files (journaled)
+    stats, errors, plan = reorganize_files(args.mode, args.workers, args.dry_run, args.resume)
     print()
 
-    # Step 3: Generate report
+    if args.dry_run:
+        with open(PLAN_FILE, 'w') as f:
+            json.dump(plan, f, indent=2)
+        for op in plan['ops']:
+            print(f"  {op['action']:12s} {op['bytes']:>10d}B  {op['source']} -> {op['target']}")
+        summary = plan['summary']
+        print(f"\n📝 Plan: {summary.get('place', 0)} to place, {summary.get('deduplicated', 0)} already in place, "
+              f"{summary.get('missing', 0)} missing sources")
+        print(f"💾 Bytes to write: {summary.get('bytes_to_write', 0)} of {summary.get('bytes_total', 0)}")
+        print(f"📄 Plan written to: {PLAN_FILE}")
+        return
+
+    # Step 2: Generate report
     print("📊 Generating final report...")
     report_path = generate_report(stats, errors)
 
@@ -217,6 +509,10 @@ def main():
     print(f"   ✅ Successfully copied: {stats['success']}")
     print(f"   ❌ Failed: {stats['failed']}")
     print(f"   ⏭️  Skipped: {stats['skipped']}")
+    print(f"   ♻️  Already in place: {stats['deduplicated']}")
+    print(f"   💾 Bytes copied: {stats['bytes_written']}")
+    for method, count in sorted(stats['by_method'].items()):
+        print(f"      {method:13s}: {count:4d} files")
 
     print(f"\n📊 Files by Bucket:")
     for bucket, count in sorted(stats['by_bucket'].items(), key=lambda x: -x[1]):
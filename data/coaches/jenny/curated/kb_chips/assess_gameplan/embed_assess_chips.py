@@ -1,10 +1,15 @@
 #!/usr/bin/env python3
 # Template embed script; wire this into your existing pipeline.
 # env: PINECONE_INDEX, NAMESPACE (e.g., KBv6_Assessment_2025-10-07_v1.0), EMBED_MODEL
-import os, sys, json
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from kbchips import load_chips
 def load_jsonl(p):
-    with open(p,'r',encoding='utf-8') as f:
-        return [json.loads(x) for x in f if x.strip()]
+    chips=load_chips(p)
+    bad=[c for c in chips if c.error]
+    for c in bad:
+        print("  ! %s: %s" % (p, c.error), file=sys.stderr)
+    return [c for c in chips if not c.error]
 def main():
     files=sys.argv[1:]
     if not files:
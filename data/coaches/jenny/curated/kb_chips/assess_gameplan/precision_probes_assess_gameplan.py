@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 import json, sys, os, re
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from kbchips import iter_dicts
 
 def tokens(s):
     return set(re.findall(r"[a-z0-9]+", s.lower()))
@@ -12,13 +14,9 @@ def jaccard(a, b):
 def load_chips(paths):
     chips = []
     for p in paths:
-        with open(p,"r",encoding="utf-8") as f:
-            for line in f:
-                line=line.strip()
-                if not line: continue
-                obj = json.loads(line)
-                obj["_search_blob"] = (obj.get("content","") + " " + obj.get("insight_vector","")).strip()
-                chips.append(obj)
+        for obj in iter_dicts(p):
+            obj["_search_blob"] = (obj.get("content","") + " " + obj.get("insight_vector","")).strip()
+            chips.append(obj)
     return chips
 
 def main():
@@ -1,26 +1,25 @@
 #!/usr/bin/env python3
-import sys, json
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from kbchips import load_chips
 REQ = ["chip_id","type","source_doc","metadata","content"]
 def validate_file(path):
     ok=0; bad=0; errs=[]
-    with open(path,'r',encoding='utf-8') as f:
-        for ln, line in enumerate(f, start=1):
-            line=line.strip()
-            if not line: continue
-            try:
-                obj=json.loads(line)
-            except Exception as e:
-                bad+=1; errs.append(f"Line {ln}: JSON error {e}"); continue
-            miss=[k for k in REQ if k not in obj]
-            if miss:
-                bad+=1; errs.append(f"Line {ln}: Missing {miss}"); continue
-            if not isinstance(obj["chip_id"], str): bad+=1; errs.append(f"Line {ln}: chip_id not str")
-            if not isinstance(obj["type"], str): bad+=1; errs.append(f"Line {ln}: type not str")
-            if not isinstance(obj["source_doc"], dict): bad+=1; errs.append(f"Line {ln}: source_doc not obj")
-            if not isinstance(obj["metadata"], dict): bad+=1; errs.append(f"Line {ln}: metadata not obj")
-            if not isinstance(obj["content"], str) or len(obj["content"].strip())<50:
-                bad+=1; errs.append(f"Line {ln}: content too short"); continue
-            ok+=1
+    for chip in load_chips(path, fmt="jsonl"):
+        ln=chip.line
+        if chip.error:
+            bad+=1; errs.append(chip.error); continue
+        obj=chip.to_dict()
+        miss=[k for k in REQ if k not in obj]
+        if miss:
+            bad+=1; errs.append(f"Line {ln}: Missing {miss}"); continue
+        if not isinstance(obj["chip_id"], str): bad+=1; errs.append(f"Line {ln}: chip_id not str")
+        if not isinstance(obj["type"], str): bad+=1; errs.append(f"Line {ln}: type not str")
+        if not isinstance(obj["source_doc"], dict): bad+=1; errs.append(f"Line {ln}: source_doc not obj")
+        if not isinstance(obj["metadata"], dict): bad+=1; errs.append(f"Line {ln}: metadata not obj")
+        if not isinstance(obj["content"], str) or len(obj["content"].strip())<50:
+            bad+=1; errs.append(f"Line {ln}: content too short"); continue
+        ok+=1
     return ok,bad,errs
 def main():
     files=sys.argv[1:] or []
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+blob_store.py
+
+Content-addressed store for the data tree: every unique file body is kept once,
+under its hash, and each snapshot is just a path -> hash manifest.
+
+- Blobs live in data/.cas/objects/<2 hex>/<rest of the BLAKE2b-256 hex>, read-only;
+  they are written with a reflink when the filesystem supports it, else copied
+  (never hardlinked to the working file, which may still be edited in place)
+- Manifests are sorted, tab-separated "hash size mode path" lines
+  (data/.cas/manifests/<name>.tsv), ~100 bytes per file
+- Snapshots only read files whose (inode, size, mtime_ns) changed since the last
+  one (data/.cas/statcache.json) and only store hashes not already present, so
+  backup and scan cost follow new content, not copies
+- Checkout materializes a manifest (or a sub-tree of it) by hardlinking blobs, so
+  N copies of a file cost one inode
+- gc drops blobs no manifest references; verify re-hashes every blob
+
+Usage:
+  python blob_store.py snapshot                   # data/ -> manifests/<timestamp>.tsv
+  python blob_store.py snapshot --name pre-reorg
+  python blob_store.py stats pre-reorg            # logical vs unique bytes, biggest duplicate groups
+  python blob_store.py checkout pre-reorg /tmp/data_pre_reorg --prefix coaches/jenny
+  python blob_store.py gc
+  python blob_store.py verify
+"""
+import argparse, hashlib, json, os, shutil, stat, sys, time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+KB_ROOT = Path(__file__).resolve().parent
+DATA_ROOT = KB_ROOT.parents[3]
+STORE_DIR = DATA_ROOT / ".cas"
+READ_SIZE = 1 << 20
+WORKERS = min(32, (os.cpu_count() or 1) * 4)
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+Entry = Tuple[str, int, int, str]  # (hash, size, mode, path)
+
+# ---------------------------------------------------------------- hashing / blobs
+
+def hash_file(path: str) -> str:
+    h = hashlib.blake2b(digest_size=32)
+    buf = bytearray(READ_SIZE)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buf):
+            h.update(view[:n])
+    return h.hexdigest()
+
+def clone_or_copy(src: str, dst: str):
+    """Reflink src to dst where supported (btrfs/XFS), else a plain copy."""
+    try:
+        import fcntl
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dst)
+
+class BlobStore:
+    def __init__(self, root: Path = STORE_DIR):
+        self.root = Path(root)
+        self.objects = self.root / "objects"
+        self.manifests = self.root / "manifests"
+
+    def blob_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def has(self, digest: str) -> bool:
+        return self.blob_path(digest).exists()
+
+    def put(self, src: str, digest: str) -> bool:
+        """Store src under digest unless present; returns True if a new blob was written."""
+        dst = self.blob_path(digest)
+        if dst.exists():
+            return False
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f"{dst.name}.{os.getpid()}.tmp")
+        clone_or_copy(src, str(tmp))
+        if hash_file(str(tmp)) != digest:  # src changed while we were copying
+            tmp.unlink()
+            raise OSError(f"{src} changed during snapshot")
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, dst)
+        return True
+
+    def iter_blobs(self) -> Iterator[Tuple[str, Path]]:
+        if not self.objects.exists():
+            return
+        for d in sorted(self.objects.iterdir()):
+            for f in sorted(d.iterdir()):
+                if not f.name.endswith(".tmp"):
+                    yield d.name + f.name, f
+
+    # ------------------------------------------------------------ manifests
+
+    def manifest_path(self, name: str) -> Path:
+        return self.manifests / f"{name}.tsv"
+
+    def write_manifest(self, name: str, entries: List[Entry], root: Path) -> Path:
+        self.manifests.mkdir(parents=True, exist_ok=True)
+        path = self.manifest_path(name)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(f"# cas-manifest v1 root={root} created={datetime.now().isoformat(timespec='seconds')}\n")
+            for digest, size, mode, rel in sorted(entries, key=lambda e: e[3]):
+                f.write(f"{digest}\t{size}\t{mode:o}\t{rel}\n")
+        os.replace(tmp, path)
+        return path
+
+    def read_manifest(self, name: str) -> List[Entry]:
+        out = []
+        with open(self.manifest_path(name), "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("#"):
+                    continue
+                digest, size, mode, rel = line.rstrip("\n").split("\t", 3)
+                out.append((digest, int(size), int(mode, 8), rel))
+        return out
+
+    def manifest_names(self) -> List[str]:
+        if not self.manifests.exists():
+            return []
+        return sorted(p.stem for p in self.manifests.glob("*.tsv"))
+
+# ---------------------------------------------------------------- snapshot
+
+def walk(root: Path, skip: Path) -> Iterator[os.DirEntry]:
+    """Regular files under root; dot-entries (generated outputs, .git, the store) are skipped."""
+    stack = [str(root)]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.name.startswith(".") or entry.name == "__pycache__" or entry.path == str(skip):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+def load_statcache(store: BlobStore) -> Dict[str, list]:
+    try:
+        with open(store.root / "statcache.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_statcache(store: BlobStore, cache: Dict[str, list]):
+    path = store.root / "statcache.json"
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def snapshot(root: Path, store: BlobStore, name: str, workers: int = WORKERS) -> Dict[str, int]:
+    """Record root in a manifest, storing only blobs the store does not have yet."""
+    t0 = time.perf_counter()
+    root = root.resolve()
+    old = load_statcache(store)
+    cache: Dict[str, list] = {}
+    entries: List[Entry] = []
+    todo: List[Tuple[str, str, int, int, list]] = []  # (abs, rel, size, mode, key)
+    for e in walk(root, store.root.resolve()):
+        st = e.stat(follow_symlinks=False)
+        rel = os.path.relpath(e.path, root)
+        key = [e.inode(), st.st_size, st.st_mtime_ns]
+        prev = old.get(rel)
+        if prev and prev[:3] == key and store.has(prev[3]):
+            cache[rel] = prev
+            entries.append((prev[3], st.st_size, stat.S_IMODE(st.st_mode), rel))
+        else:
+            todo.append((e.path, rel, st.st_size, stat.S_IMODE(st.st_mode), key))
+
+    stats = {"files": 0, "hashed": len(todo), "new_blobs": 0, "new_bytes": 0, "errors": 0}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        digests = list(pool.map(lambda t: hash_file(t[0]), todo))
+        # one writer per new digest, so identical copies are stored once
+        first: Dict[str, Tuple[str, int]] = {}
+        for (path, _, size, _, _), digest in zip(todo, digests):
+            if not store.has(digest):
+                first.setdefault(digest, (path, size))
+        written = pool.map(lambda kv: (kv[0], kv[1][1], _try_put(store, kv[1][0], kv[0])), first.items())
+        for digest, size, ok in written:
+            if ok is None:
+                stats["errors"] += 1
+            elif ok:
+                stats["new_blobs"] += 1
+                stats["new_bytes"] += size
+    for (path, rel, size, mode, key), digest in zip(todo, digests):
+        if store.has(digest):
+            cache[rel] = key + [digest]
+            entries.append((digest, size, mode, rel))
+    store.write_manifest(name, entries, root)
+    save_statcache(store, cache)
+    stats["files"] = len(entries)
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    return stats
+
+def _try_put(store: BlobStore, path: str, digest: str) -> Optional[bool]:
+    try:
+        return store.put(path, digest)
+    except OSError as e:
+        print(f"  skip {path}: {e}", file=sys.stderr)
+        return None
+
+# ---------------------------------------------------------------- checkout / gc / verify
+
+def checkout(store: BlobStore, name: str, dest: Path, prefix: str = "") -> Dict[str, int]:
+    """Hardlink every blob of a manifest (optionally only paths under prefix) into dest."""
+    prefix = prefix.strip("/")
+    stats = {"files": 0, "linked": 0, "copied": 0}
+    for digest, size, mode, rel in store.read_manifest(name):
+        if prefix and rel != prefix and not rel.startswith(prefix + "/"):
+            continue
+        target = dest / rel
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if os.path.lexists(target):
+            target.unlink()
+        blob = store.blob_path(digest)
+        try:
+            os.link(blob, target)
+            stats["linked"] += 1
+        except OSError:  # other filesystem: fall back to a private copy
+            shutil.copyfile(blob, target)
+            os.chmod(target, mode)
+            stats["copied"] += 1
+        stats["files"] += 1
+    return stats
+
+def gc(store: BlobStore) -> Dict[str, int]:
+    live = {digest for name in store.manifest_names() for digest, *_ in store.read_manifest(name)}
+    stats = {"kept": 0, "removed": 0, "freed_bytes": 0}
+    for digest, path in list(store.iter_blobs()):
+        if digest in live:
+            stats["kept"] += 1
+            continue
+        stats["freed_bytes"] += path.stat().st_size
+        path.unlink()
+        stats["removed"] += 1
+    return stats
+
+def verify(store: BlobStore, workers: int = WORKERS) -> List[str]:
+    blobs = list(store.iter_blobs())
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        actual = pool.map(lambda b: hash_file(str(b[1])), blobs)
+        return [str(path) for (digest, path), got in zip(blobs, actual) if got != digest]
+
+def manifest_stats(entries: List[Entry], top: int = 10) -> dict:
+    groups: Dict[str, List[Entry]] = defaultdict(list)
+    for e in entries:
+        groups[e[0]].append(e)
+    dupes = sorted((g for g in groups.values() if len(g) > 1), key=lambda g: -g[0][1] * (len(g) - 1))
+    return {
+        "files": len(entries),
+        "unique_blobs": len(groups),
+        "logical_bytes": sum(e[1] for e in entries),
+        "unique_bytes": sum(g[0][1] for g in groups.values()),
+        "top_duplicates": [{"copies": len(g), "size": g[0][1], "paths": [e[3] for e in g]} for g in dupes[:top]],
+    }
+
+def fmt_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f}{unit}" if unit != "B" else f"{n}B"
+        n /= 1024
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--store", default=str(STORE_DIR), help="store directory (default: data/.cas)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("snapshot", help="record a tree as a manifest, storing new blobs")
+    p.add_argument("--root", default=str(DATA_ROOT))
+    p.add_argument("--name", default=None, help="manifest name (default: timestamp)")
+    p.add_argument("-j", "--workers", type=int, default=WORKERS)
+    p = sub.add_parser("checkout", help="materialize a manifest with hardlinks")
+    p.add_argument("name")
+    p.add_argument("dest")
+    p.add_argument("--prefix", default="", help="only paths under this sub-tree")
+    p = sub.add_parser("stats", help="logical vs unique size of a manifest")
+    p.add_argument("name", nargs="?")
+    p.add_argument("--top", type=int, default=10)
+    sub.add_parser("list", help="list manifests")
+    sub.add_parser("gc", help="delete blobs no manifest references")
+    sub.add_parser("verify", help="re-hash every blob")
+    args = ap.parse_args()
+
+    store = BlobStore(Path(args.store))
+    if args.cmd == "snapshot":
+        name = args.name or datetime.now().strftime("%Y%m%d_%H%M%S")
+        s = snapshot(Path(args.root), store, name, args.workers)
+        print(f"Snapshot {name}: {s['files']} files, {s['hashed']} hashed, {s['new_blobs']} new blobs "
+              f"({fmt_bytes(s['new_bytes'])}) in {s['seconds']}s" + (f", {s['errors']} errors" if s["errors"] else ""))
+    elif args.cmd == "checkout":
+        s = checkout(store, args.name, Path(args.dest), args.prefix)
+        print(f"Checked out {s['files']} files into {args.dest} ({s['linked']} hardlinked, {s['copied']} copied)")
+    elif args.cmd == "stats":
+        names = store.manifest_names()
+        name = args.name or (names[-1] if names else None)
+        if not name:
+            sys.exit("no manifests yet; run `snapshot` first")
+        s = manifest_stats(store.read_manifest(name), args.top)
+        print(f"{name}: {s['files']} files, {s['unique_blobs']} unique blobs, "
+              f"{fmt_bytes(s['logical_bytes'])} logical, {fmt_bytes(s['unique_bytes'])} unique")
+        for g in s["top_duplicates"]:
+            print(f"  {g['copies']}x {fmt_bytes(g['size']):>8s}  " + "\n                  ".join(g["paths"]))
+    elif args.cmd == "list":
+        for name in store.manifest_names():
+            print(name)
+    elif args.cmd == "gc":
+        s = gc(store)
+        print(f"gc: kept {s['kept']} blobs, removed {s['removed']} ({fmt_bytes(s['freed_bytes'])})")
+    elif args.cmd == "verify":
+        bad = verify(store)
+        print(f"verify: {len(bad)} corrupt blob(s)")
+        for b in bad:
+            print("  ", b)
+        sys.exit(1 if bad else 0)
+
+if __name__ == "__main__":
+    main()
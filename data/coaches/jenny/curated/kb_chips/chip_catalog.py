@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+chip_catalog.py
+
+Format-sniffing corpus catalog for the kb_chips tree.
+
+- Scans kb_chips/ once and sniffs each file's real format (a `.json` file is often JSONL)
+- Classifies every file: family (session/imsg/exec/assess/gameplan/...), week, role, variant
+- Picks the canonical chip batch per week (`_real`, `_proper`, `_v2`, `_sep`/`_separate`
+  re-runs win over the plain batch; byte-identical copies become aliases)
+- Drops batches that a later transform fully re-IDs (metadata.original_chip_id)
+- Writes the manifest to kb_chips/.chip_catalog.json; loaders read it instead of globbing
+
+Usage:
+  python chip_catalog.py            # (re)build the manifest
+  python chip_catalog.py --summary  # print the canonical batches per family/week
+
+Library:
+  from chip_catalog import load_catalog, iter_chips
+  for path, chip in iter_chips(load_catalog()):
+      ...
+"""
+import argparse, hashlib, json, os, re, sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from kbchips import sniff_format
+
+KB_ROOT = Path(__file__).resolve().parent
+CATALOG_FILE = ".chip_catalog.json"
+CATALOG_VERSION = 1
+
+WEEK_RE = re.compile(r"^w(\d{3})", re.I)
+VARIANT_RE = re.compile(r"_(real|proper|sep|separate|v\d+)$", re.I)
+COLLISION_RE = re.compile(r"_\d+$")
+# corrected re-runs supersede the plain batch for the same week
+CORRECTED_VARIANTS = {"real", "proper", "sep", "separate"}
+
+# ---------------------------------------------------------------- parsing
+
+def parse_records(raw: bytes, fmt: str) -> Tuple[List[dict], List[int]]:
+    """Parse once according to the sniffed format. Returns (records, bad_line_numbers)."""
+    if fmt == "jsonl":
+        records, bad = [], []
+        for ln, line in enumerate(raw.splitlines(), 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                bad.append(ln)
+        return records, bad
+    if fmt in ("json", "json-array"):
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            return [], [1]
+        return (obj if isinstance(obj, list) else [obj]), []
+    return [], []
+
+# ---------------------------------------------------------------- classification
+
+def classify(rel: str, fmt: str, records: List) -> Dict[str, Optional[str]]:
+    parts = rel.split("/")
+    top = parts[0] if len(parts) > 1 else ""
+    name = parts[-1]
+    stem = name.split(".", 1)[0]
+    m = WEEK_RE.match(name)
+    week = m.group(1) if m else None
+
+    if top == "assess_gameplan":
+        family = "gameplan" if name.upper().startswith("GAMEPLAN") else "assess"
+    elif top == "misc":
+        family = "session" if week else "misc"
+    else:
+        family = top or "root"
+
+    is_chip = any(isinstance(r, dict) and "chip_id" in r for r in records)
+    lname = name.lower()
+    if fmt in ("docx", "pdf", "zip"):
+        role = "source"
+    elif fmt in ("python", "shell", "typescript"):
+        role = "tool"
+    elif fmt in ("markdown", "text", "other"):
+        role = "doc"
+    elif is_chip:
+        role = "example" if lname.startswith("example") else "patch" if "_patch" in lname else "chips"
+    elif records and isinstance(records[0], dict) and "$schema" in records[0]:
+        role = "schema"
+    elif "taxonomy" in lname:
+        role = "taxonomy"
+    elif "probe" in lname:
+        role = "probes"
+    elif "report" in lname or "qa_summary" in lname:
+        role = "report"
+    elif any(k in lname for k in ("summary", "processing", "package", "_sum")):
+        role = "summary"
+    else:
+        role = "data"
+
+    vm = VARIANT_RE.search(stem)
+    return {"family": family, "week": week, "role": role, "variant": vm.group(1).lower() if vm else ""}
+
+def variant_rank(variant: str) -> int:
+    if variant in CORRECTED_VARIANTS:
+        return 2
+    if variant.startswith("v") and variant[1:].isdigit() and int(variant[1:]) >= 2:
+        return 2
+    return 1
+
+# ---------------------------------------------------------------- build
+
+def scan(root: Path) -> Iterator[os.DirEntry]:
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                if entry.name.startswith(".") or entry.name == "__pycache__":
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry
+
+def build_catalog(root: Path = KB_ROOT) -> dict:
+    files: Dict[str, dict] = {}
+    chip_ids: Dict[str, set] = {}
+    original_ids: Dict[str, set] = {}
+    for entry in scan(root):
+        rel = Path(entry.path).relative_to(root).as_posix()
+        st = entry.stat()
+        with open(entry.path, "rb") as f:
+            raw = f.read()
+        fmt = sniff_format(raw, entry.name)
+        records, bad = parse_records(raw, fmt)
+        info = classify(rel, fmt, records)
+        files[rel] = {
+            "path": rel, "format": fmt, **info,
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha1": hashlib.sha1(raw).hexdigest(),
+            "records": len(records), "bad_lines": bad,
+            "canonical": False, "reason": "",
+        }
+        if info["role"] in ("chips", "patch"):
+            chip_ids[rel] = {r.get("chip_id") for r in records if isinstance(r, dict)}
+            original_ids[rel] = {(r.get("metadata") or {}).get("original_chip_id")
+                                 for r in records if isinstance(r, dict) and isinstance(r.get("metadata"), dict)}
+    select_canonical(files, chip_ids, original_ids)
+    weeks = {}
+    for e in files.values():
+        if e["canonical"] and e["family"] == "session" and e["role"] == "chips":
+            weeks[e["week"]] = e["path"]
+    return {
+        "version": CATALOG_VERSION,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "weeks": dict(sorted(weeks.items())),
+        "files": sorted(files.values(), key=lambda e: e["path"]),
+    }
+
+def select_canonical(files: Dict[str, dict], chip_ids: Dict[str, set], original_ids: Dict[str, set]):
+    batches = [e for e in files.values() if e["role"] in ("chips", "patch")]
+
+    # 1) byte-identical copies: keep the one without a `_1` collision suffix / shortest name
+    by_hash: Dict[str, List[dict]] = {}
+    for e in batches:
+        by_hash.setdefault(e["sha1"], []).append(e)
+    live = []
+    for group in by_hash.values():
+        group.sort(key=lambda e: (bool(COLLISION_RE.search(e["path"].rsplit(".", 1)[0])), e["path"].startswith("misc/"), len(e["path"]), e["path"]))
+        live.append(group[0])
+        for dup in group[1:]:
+            dup["reason"] = f"duplicate_of:{group[0]['path']}"
+
+    # 2) batches fully re-IDed by a later transform (original_chip_id)
+    for e in live:
+        ids = chip_ids[e["path"]] - {None}
+        for other in live:
+            if other is not e and ids and ids <= original_ids[other["path"]]:
+                e["reason"] = f"superseded_by:{other['path']}"
+                break
+    live = [e for e in live if not e["reason"]]
+
+    # 3) one chip batch per session week; patches ride along with their week
+    by_week: Dict[str, List[dict]] = {}
+    for e in live:
+        if e["family"] == "session" and e["role"] == "chips" and e["week"]:
+            by_week.setdefault(e["week"], []).append(e)
+        else:
+            e["canonical"] = True
+    for group in by_week.values():
+        group.sort(key=lambda e: (-variant_rank(e["variant"]), len(e["bad_lines"]), -e["records"], e["path"].startswith("misc/"), e["path"]))
+        group[0]["canonical"] = True
+        for loser in group[1:]:
+            loser["reason"] = f"superseded_by:{group[0]['path']}"
+
+def write_catalog(catalog: dict, root: Path = KB_ROOT) -> Path:
+    out = root / CATALOG_FILE
+    tmp = root / (CATALOG_FILE + ".tmp")
+    tmp.write_text(json.dumps(catalog, indent=1), encoding="utf-8")
+    os.replace(tmp, out)
+    return out
+
+# ---------------------------------------------------------------- loading
+
+def is_stale(catalog: dict, root: Path) -> bool:
+    """A catalogued file changed or vanished, or a new file appeared (a new week's batch)."""
+    if len(catalog["files"]) != sum(1 for _ in scan(root)):
+        return True
+    for e in catalog["files"]:
+        try:
+            st = os.stat(root / e["path"])
+        except OSError:
+            return True
+        if st.st_size != e["size"] or st.st_mtime_ns != e["mtime_ns"]:
+            return True
+    return False
+
+def load_catalog(root: Path = KB_ROOT, rebuild_stale: bool = True) -> dict:
+    """Read the manifest; rebuild it when missing or when a catalogued file changed."""
+    root = Path(root)
+    try:
+        catalog = json.loads((root / CATALOG_FILE).read_text(encoding="utf-8"))
+        if catalog.get("version") != CATALOG_VERSION or (rebuild_stale and is_stale(catalog, root)):
+            catalog = None
+    except (OSError, ValueError):
+        catalog = None
+    if catalog is None:
+        catalog = build_catalog(root)
+        write_catalog(catalog, root)
+    catalog["root"] = str(root)
+    return catalog
+
+def canonical_files(catalog: dict, families=None, roles=("chips", "patch")) -> List[dict]:
+    return [e for e in catalog["files"]
+            if e["canonical"] and e["role"] in roles and (families is None or e["family"] in families)]
+
+def iter_chips(catalog: dict, families=None) -> Iterator[Tuple[str, dict]]:
+    """Yield (relative_path, chip) for every canonical chip file, parsed exactly once."""
+    root = Path(catalog["root"])
+    for e in canonical_files(catalog, families):
+        with open(root / e["path"], "rb") as f:
+            records, _ = parse_records(f.read(), e["format"])
+        for r in records:
+            if isinstance(r, dict) and "chip_id" in r:
+                yield e["path"], r
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=str(KB_ROOT))
+    ap.add_argument("--summary", action="store_true", help="print canonical batches after building")
+    args = ap.parse_args()
+    root = Path(args.root).resolve()
+
+    catalog = build_catalog(root)
+    out = write_catalog(catalog, root)
+    chips = canonical_files(catalog)
+    print(f"Catalogued {len(catalog['files'])} files ({len(chips)} canonical chip batches, "
+          f"{len(catalog['weeks'])} session weeks) -> {out}")
+    bad = [e for e in chips if e["bad_lines"]]
+    if bad:
+        print(f"\n{len(bad)} canonical batches have unparseable lines:")
+        for e in bad:
+            print(f"  - {e['path']}: lines {e['bad_lines']}")
+    if args.summary:
+        print()
+        for e in chips:
+            print(f"  {e['family']:9s} {e['week'] or '---'}  {e['path']}  ({e['records']} chips, {e['format']})")
+        for e in catalog["files"]:
+            if e["reason"]:
+                print(f"  skip     {e['path']}  [{e['reason']}]")
+
+if __name__ == "__main__":
+    main()
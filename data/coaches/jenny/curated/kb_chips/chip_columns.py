@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+chip_columns.py
+
+Compiles the catalogued chip corpus (see chip_catalog.py) into one columnar file,
+kb_chips/.chip_corpus.kbc, that loaders memory-map and read column by column.
+
+Layout (little-endian, every section 8-byte aligned):
+  header   b"KBC1" | u32 version | u32 n_rows | u32 n_cols | 40s catalog signature
+  dir      per column: u16 name_len | name | u8 kind | u64 offset | u64 length
+  column   kind STR:  u64 offsets[n_rows + 1] | utf-8 blob
+           kind DICT: u32 n_values | u64 pool_offsets[n_values + 1] | pool blob | u32 codes[n_rows]
+
+Low-cardinality columns (type, family, week, phase, file) are dictionary-encoded, so
+reading `chip_id`, `type` and `week` touches three small regions of the file and
+nothing else. `source_doc`, `metadata` and `raw` hold the original JSON text.
+
+Columns are views of the mapping and live as long as the corpus: close() releases every
+column it handed out (using one afterwards raises ValueError), so closing never fails on
+a column a caller still holds. Copy values out (list(col), col[i]) to keep them.
+
+Usage:
+  python chip_columns.py                     # build from the catalog
+  python chip_columns.py --stats             # column sizes + cold open/read timing
+
+Library:
+  from chip_columns import ChipCorpus
+  with ChipCorpus.open() as corpus:
+      for chip_id, ctype, week in corpus.rows("chip_id", "type", "week"):
+          ...
+"""
+import argparse, hashlib, json, mmap, os, struct, sys, time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterator, List, Sequence
+
+from chip_catalog import KB_ROOT, canonical_files, iter_chips, load_catalog
+
+CORPUS_FILE = ".chip_corpus.kbc"
+MAGIC = b"KBC1"
+VERSION = 1
+HEADER = struct.Struct("<4sIII40s")
+COLDIR = struct.Struct("<BQQ")
+KIND_STR, KIND_DICT = 0, 1
+
+# (column name, kind)
+COLUMNS = [
+    ("chip_id", KIND_STR),
+    ("type", KIND_DICT),
+    ("family", KIND_DICT),
+    ("week", KIND_DICT),
+    ("phase", KIND_DICT),
+    ("date", KIND_DICT),
+    ("file", KIND_DICT),
+    ("content", KIND_STR),
+    ("insight_vector", KIND_STR),
+    ("source_doc", KIND_STR),
+    ("metadata", KIND_STR),
+    ("raw", KIND_STR),
+]
+
+if sys.byteorder != "little":
+    raise SystemExit("chip_columns.py assumes a little-endian host")
+
+def catalog_signature(catalog: dict) -> str:
+    h = hashlib.sha1()
+    for e in canonical_files(catalog):
+        h.update(f"{e['path']}:{e['sha1']}\n".encode("utf-8"))
+    return h.hexdigest()
+
+# ---------------------------------------------------------------- build
+
+def _pad(buf: bytearray):
+    buf.extend(b"\0" * (-len(buf) % 8))
+
+def _encode_str(values: List[str]) -> bytes:
+    offsets, blob, pos = array("Q", [0]), bytearray(), 0
+    for v in values:
+        b = v.encode("utf-8")
+        blob += b
+        pos += len(b)
+        offsets.append(pos)
+    return offsets.tobytes() + bytes(blob)
+
+def _encode_dict(values: List[str]) -> bytes:
+    pool: Dict[str, int] = {}
+    codes = array("I", (pool.setdefault(v, len(pool)) for v in values))
+    out = bytearray(struct.pack("<I", len(pool)))
+    _pad(out)
+    out += _encode_str(list(pool))
+    _pad(out)
+    out += codes.tobytes()
+    return bytes(out)
+
+def _row(family: str, path: str, chip: dict) -> Dict[str, str]:
+    sd = chip.get("source_doc") if isinstance(chip.get("source_doc"), dict) else {}
+    md = chip.get("metadata") if isinstance(chip.get("metadata"), dict) else {}
+    return {
+        "chip_id": str(chip.get("chip_id", "")),
+        "type": str(chip.get("type", "")),
+        "family": family,
+        "week": str(sd.get("week", "")),
+        "phase": str(sd.get("phase", "")),
+        "date": str(sd.get("date", "")),
+        "file": path,
+        "content": chip.get("content") if isinstance(chip.get("content"), str) else "",
+        "insight_vector": chip.get("insight_vector") if isinstance(chip.get("insight_vector"), str) else "",
+        "source_doc": json.dumps(sd, ensure_ascii=False),
+        "metadata": json.dumps(md, ensure_ascii=False),
+        "raw": json.dumps(chip, ensure_ascii=False),
+    }
+
+def build_corpus(catalog: dict, out: Path) -> int:
+    family_of = {e["path"]: e["family"] for e in canonical_files(catalog)}
+    cols: Dict[str, List[str]] = {name: [] for name, _ in COLUMNS}
+    n = 0
+    for path, chip in iter_chips(catalog):
+        for k, v in _row(family_of[path], path, chip).items():
+            cols[k].append(v)
+        n += 1
+
+    sections = [(name, kind, _encode_str(cols[name]) if kind == KIND_STR else _encode_dict(cols[name]))
+                for name, kind in COLUMNS]
+    head = bytearray(HEADER.pack(MAGIC, VERSION, n, len(sections), catalog_signature(catalog).encode("ascii")))
+    dir_size = sum(2 + len(name.encode()) + COLDIR.size for name, _, _ in sections)
+    pos = len(head) + dir_size
+    pos += -pos % 8
+    body = bytearray()
+    for name, kind, data in sections:
+        nb = name.encode("utf-8")
+        head += struct.pack("<H", len(nb)) + nb + COLDIR.pack(kind, pos + len(body), len(data))
+        body += data
+        _pad(body)
+    _pad(head)
+
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(head)
+        f.write(body)
+    os.replace(tmp, out)
+    return n
+
+# ---------------------------------------------------------------- load
+
+class StrColumn(Sequence):
+    """utf-8 strings addressed through an offsets array; decoded on access."""
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, view: memoryview, n: int):
+        self._offsets = view[:(n + 1) * 8].cast("Q")
+        self._blob = view[(n + 1) * 8:]
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        o = self._offsets
+        return str(self._blob[o[i]:o[i + 1]], "utf-8")
+
+    def release(self):
+        self._offsets.release()
+        self._blob.release()
+
+class DictColumn(Sequence):
+    """Dictionary-encoded strings: a small value pool plus one u32 code per row."""
+    __slots__ = ("values", "codes")
+
+    def __init__(self, view: memoryview, n: int):
+        n_values = struct.unpack_from("<I", view, 0)[0]
+        pool = StrColumn(view[8:], n_values)
+        self.values = [sys.intern(v) for v in pool]
+        pool_len = (n_values + 1) * 8 + pool._offsets[n_values]
+        pool.release()
+        start = 8 + pool_len + (-pool_len % 8)
+        self.codes = view[start:start + n * 4].cast("I")
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.values[self.codes[i]]
+
+    def where(self, value: str) -> List[int]:
+        """Row numbers whose value equals `value` (compares codes, not strings)."""
+        try:
+            code = self.values.index(value)
+        except ValueError:
+            return []
+        return [i for i, c in enumerate(self.codes) if c == code]
+
+    def release(self):
+        self.codes.release()
+
+class ChipCorpus:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        magic, version, self.n_rows, n_cols, sig = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a v{VERSION} chip corpus file")
+        self.signature = sig.decode("ascii")
+        self._dir: Dict[str, tuple] = {}
+        pos = HEADER.size
+        for _ in range(n_cols):
+            (ln,) = struct.unpack_from("<H", self._mm, pos)
+            name = bytes(self._mm[pos + 2:pos + 2 + ln]).decode("utf-8")
+            pos += 2 + ln
+            self._dir[name] = COLDIR.unpack_from(self._mm, pos)
+            pos += COLDIR.size
+        self._cols: Dict[str, Sequence] = {}
+
+    @classmethod
+    def open(cls, root: Path = KB_ROOT, build_missing: bool = True,
+             rebuild_stale: bool = True) -> "ChipCorpus":
+        """Open the corpus, (re)building it when missing or behind the catalog."""
+        path = Path(root) / CORPUS_FILE
+        if not build_missing:
+            return cls(path)
+        catalog = load_catalog(root)
+        if path.exists():
+            corpus = cls(path)
+            if not rebuild_stale or corpus.is_current(catalog):
+                return corpus
+            corpus.close()
+        build_corpus(catalog, path)
+        return cls(path)
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._dir)
+
+    def column(self, name: str) -> Sequence:
+        col = self._cols.get(name)
+        if col is None:
+            kind, off, length = self._dir[name]
+            with self._view[off:off + length] as view:
+                col = StrColumn(view, self.n_rows) if kind == KIND_STR else DictColumn(view, self.n_rows)
+            self._cols[name] = col
+        return col
+
+    def rows(self, *names: str) -> Iterator[tuple]:
+        cols = [self.column(n) for n in names]
+        for i in range(self.n_rows):
+            yield tuple(c[i] for c in cols)
+
+    def chip(self, i: int) -> dict:
+        return json.loads(self.column("raw")[i])
+
+    def is_current(self, catalog: dict) -> bool:
+        return self.signature == catalog_signature(catalog)
+
+    def close(self):
+        # column views hold exports on the mmap: release them (columns callers still hold
+        # become unusable) before closing it
+        for col in self._cols.values():
+            col.release()
+        self._cols = {}
+        if getattr(self, "_view", None) is not None:
+            self._view.release()
+            self._view = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # a view the caller made of a column is still alive; unmapped once it goes
+        self._file.close()
+
+    def __len__(self):
+        return self.n_rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=str(KB_ROOT))
+    ap.add_argument("--stats", action="store_true", help="print column sizes and cold read timing")
+    args = ap.parse_args()
+    root = Path(args.root).resolve()
+    out = root / CORPUS_FILE
+
+    if not args.stats:
+        t0 = time.perf_counter()
+        n = build_corpus(load_catalog(root), out)
+        print(f"Compiled {n} chips -> {out} ({out.stat().st_size / 1024:.1f} KB) "
+              f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        return
+
+    t0 = time.perf_counter()
+    with ChipCorpus.open(root) as corpus:
+        rows = list(corpus.rows("chip_id", "type", "week"))
+        dt = (time.perf_counter() - t0) * 1000
+        print(f"{out}: {corpus.n_rows} chips, signature {corpus.signature[:12]}")
+        for name in corpus.column_names:
+            kind, _, length = corpus._dir[name]
+            print(f"  {name:15s} {'dict' if kind == KIND_DICT else 'str ':4s} {length / 1024:9.1f} KB")
+        print(f"open + read chip_id/type/week for {len(rows)} rows: {dt:.2f} ms")
+
+if __name__ == "__main__":
+    main()
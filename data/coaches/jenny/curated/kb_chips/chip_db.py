@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+chip_db.py
+
+SQLite corpus database for ops/QA queries and fast local keyword retrieval.
+
+- Imports every canonical chip batch from the catalog (chip_catalog.py), the structured
+  student files and the situation taxonomy into kb_chips/.chip_corpus.db
+- Chip metadata is normalized into indexed columns (type, family, week, phase, situation_tag, ...)
+- FTS5 index over content, insight_vector and themes, kept in sync by triggers; it is keyed
+  by the explicit chips.id (a VACUUM cannot renumber it under the index)
+- Students are loaded through scripts/student_schema.load_current (current shape) and
+  flattened with scripts/student_store.flatten, so field aliases resolve the same way
+- Incremental: files whose sha1 is unchanged are skipped; the transform and validation
+  stages upsert through upsert_chips() / record_validation()
+
+Usage:
+  python chip_db.py import
+  python chip_db.py search recommender --type Crisis_Intervention_Chip --phase P3-JUNIOR
+  python chip_db.py sql "SELECT type, COUNT(*) FROM chips GROUP BY type"
+"""
+import argparse, json, math, re, sqlite3, sys, time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chip_catalog import KB_ROOT, canonical_files, load_catalog, parse_records
+
+sys.path.insert(0, str(KB_ROOT.parents[4] / "scripts"))
+from student_schema import STUDENT_GLOB, STUDENTS_DIR, load_current  # noqa: E402
+from student_store import flatten  # noqa: E402
+
+DB_FILE = KB_ROOT / ".chip_corpus.db"
+SCHEMA_VERSION = 2  # PRAGMA user_version; older chip tables are dropped and re-imported
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, family TEXT, sha1 TEXT, imported_at REAL
+);
+CREATE TABLE IF NOT EXISTS chips (
+    id INTEGER PRIMARY KEY,
+    chip_id TEXT NOT NULL UNIQUE,
+    family TEXT, type TEXT, week TEXT, phase TEXT, phase_enum TEXT, date TEXT, file TEXT,
+    quality_score REAL, confidence_score REAL, situation_tag TEXT, silver_bullet INTEGER,
+    content TEXT, insight_vector TEXT, themes TEXT, raw TEXT,
+    valid INTEGER, validation_errors TEXT, updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS chips_type ON chips(type);
+CREATE INDEX IF NOT EXISTS chips_family ON chips(family);
+CREATE INDEX IF NOT EXISTS chips_week ON chips(week);
+CREATE INDEX IF NOT EXISTS chips_phase ON chips(phase);
+CREATE INDEX IF NOT EXISTS chips_situation ON chips(situation_tag);
+CREATE INDEX IF NOT EXISTS chips_file ON chips(file);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS chips_fts USING fts5(
+    content, insight_vector, themes, content='chips', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS chips_ai AFTER INSERT ON chips BEGIN
+    INSERT INTO chips_fts(rowid, content, insight_vector, themes)
+    VALUES (new.id, new.content, new.insight_vector, new.themes);
+END;
+CREATE TRIGGER IF NOT EXISTS chips_ad AFTER DELETE ON chips BEGIN
+    INSERT INTO chips_fts(chips_fts, rowid, content, insight_vector, themes)
+    VALUES ('delete', old.id, old.content, old.insight_vector, old.themes);
+END;
+CREATE TRIGGER IF NOT EXISTS chips_au AFTER UPDATE OF content, insight_vector, themes ON chips BEGIN
+    INSERT INTO chips_fts(chips_fts, rowid, content, insight_vector, themes)
+    VALUES ('delete', old.id, old.content, old.insight_vector, old.themes);
+    INSERT INTO chips_fts(rowid, content, insight_vector, themes)
+    VALUES (new.id, new.content, new.insight_vector, new.themes);
+END;
+
+CREATE TABLE IF NOT EXISTS students (
+    student_id TEXT PRIMARY KEY, file TEXT, archetype TEXT, grade_level INTEGER,
+    school_type TEXT, intended_major TEXT, parent_involvement TEXT,
+    readiness_score REAL, gpa REAL, schema_version TEXT, raw TEXT
+);
+CREATE INDEX IF NOT EXISTS students_grade ON students(grade_level);
+
+CREATE TABLE IF NOT EXISTS taxonomy (
+    kind TEXT, value TEXT, source TEXT, PRIMARY KEY (kind, value)
+);
+"""
+
+# chips keyed by the implicit rowid (SCHEMA_VERSION 1); files goes too so import re-reads everything
+DROP_OLD = """
+DROP TRIGGER IF EXISTS chips_ai;
+DROP TRIGGER IF EXISTS chips_ad;
+DROP TRIGGER IF EXISTS chips_au;
+DROP TABLE IF EXISTS chips_fts;
+DROP TABLE IF EXISTS chips;
+DROP TABLE IF EXISTS files;
+"""
+
+CHIP_COLS = ("chip_id", "family", "type", "week", "phase", "phase_enum", "date", "file",
+             "quality_score", "confidence_score", "situation_tag", "silver_bullet",
+             "content", "insight_vector", "themes", "raw", "updated_at")
+UPSERT_SQL = (
+    f"INSERT INTO chips ({', '.join(CHIP_COLS)}) VALUES ({', '.join('?' * len(CHIP_COLS))}) "
+    f"ON CONFLICT(chip_id) DO UPDATE SET "
+    + ", ".join(f"{c}=excluded.{c}" for c in CHIP_COLS[1:])
+)
+
+def connect(path: Path = DB_FILE) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        conn.executescript(DROP_OLD)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+def _num(v) -> Optional[float]:
+    return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+def chip_row(chip: dict, family: str, file: str, now: float) -> Tuple:
+    sd = chip.get("source_doc") if isinstance(chip.get("source_doc"), dict) else {}
+    md = chip.get("metadata") if isinstance(chip.get("metadata"), dict) else {}
+    themes = chip.get("themes") or md.get("themes") or []
+    if isinstance(themes, list):
+        themes = " ".join(str(t).replace("_", " ") for t in themes)
+    silver = chip.get("silver_bullet", md.get("silver_bullet"))
+    return (
+        str(chip.get("chip_id")), family, chip.get("type"),
+        str(sd.get("week", "")), sd.get("phase") or md.get("phase"), md.get("phase_enum") or sd.get("phase_enum"),
+        sd.get("date"), file,
+        _num(md.get("quality_score")), _num(md.get("confidence_score")),
+        md.get("situation_tag") or (chip.get("cross_links") or {}).get("situation_tag"),
+        None if silver is None else int(bool(silver)),
+        chip.get("content") if isinstance(chip.get("content"), str) else "",
+        chip.get("insight_vector") if isinstance(chip.get("insight_vector"), str) else "",
+        str(themes), json.dumps(chip, ensure_ascii=False), now,
+    )
+
+def upsert_chips(conn: sqlite3.Connection, chips: Iterable[dict], family: str, file: str) -> int:
+    """Insert or update chips by chip_id (used by import and by the transform stage)."""
+    now = time.time()
+    rows = [chip_row(c, family, file, now) for c in chips if isinstance(c, dict) and c.get("chip_id")]
+    with conn:
+        conn.executemany(UPSERT_SQL, rows)
+    return len(rows)
+
+def record_validation(conn: sqlite3.Connection, results: Iterable[Tuple[str, List[str]]]) -> int:
+    """Store validator output per chip_id: valid flag + error list (used by the validation stage)."""
+    rows = [(0 if errs else 1, json.dumps(errs), cid) for cid, errs in results if cid]
+    with conn:
+        cur = conn.executemany("UPDATE chips SET valid=?, validation_errors=? WHERE chip_id=?", rows)
+    return cur.rowcount
+
+# ---------------------------------------------------------------- import
+
+def import_chips(conn: sqlite3.Connection, catalog: dict, force: bool = False) -> Dict[str, int]:
+    root = Path(catalog["root"])
+    known = {r["path"]: r["sha1"] for r in conn.execute("SELECT path, sha1 FROM files")}
+    live = canonical_files(catalog)
+    stats = {"files": 0, "skipped": 0, "chips": 0, "removed": 0}
+    for e in live:
+        if not force and known.get(e["path"]) == e["sha1"]:
+            stats["skipped"] += 1
+            continue
+        with open(root / e["path"], "rb") as f:
+            records, _ = parse_records(f.read(), e["format"])
+        with conn:
+            conn.execute("DELETE FROM chips WHERE file=?", (e["path"],))
+        stats["chips"] += upsert_chips(conn, records, e["family"], e["path"])
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?)", (e["path"], e["family"], e["sha1"], time.time()))
+        stats["files"] += 1
+    gone = set(known) - {e["path"] for e in live}
+    with conn:
+        for path in gone:
+            stats["removed"] += conn.execute("DELETE FROM chips WHERE file=?", (path,)).rowcount
+            conn.execute("DELETE FROM files WHERE path=?", (path,))
+    return stats
+
+def import_taxonomy(conn: sqlite3.Connection, catalog: dict) -> int:
+    root = Path(catalog["root"])
+    rows = []
+    for e in catalog["files"]:
+        if e["role"] != "taxonomy":
+            continue
+        data = json.loads((root / e["path"]).read_text(encoding="utf-8"))
+        for kind, values in data.items():
+            if isinstance(values, list):
+                rows += [(kind.rstrip("s"), str(v), e["path"]) for v in values]
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO taxonomy VALUES (?,?,?)", rows)
+    return len(rows)
+
+def _col(v):
+    """flatten() marks missing values "" / NaN; the students table stores NULL."""
+    return None if v == "" or (isinstance(v, float) and math.isnan(v)) else v
+
+def import_students(conn: sqlite3.Connection, students_dir: Path = STUDENTS_DIR) -> int:
+    rows = []
+    for p in sorted(Path(students_dir).glob(STUDENT_GLOB)):
+        try:
+            doc = load_current(p)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not load {p}: {e}", file=sys.stderr)
+            continue
+        f = {k: _col(v) for k, v in flatten(doc, p.name).items()}
+        grade = f["grade_level"]
+        rows.append((
+            f["student_id"] or p.stem, p.name, f["archetype"], None if grade is None else int(grade),
+            f["school_type"], f["intended_major"], f["parent_involvement"],
+            f["readiness"], f["gpa"],
+            (doc.get("meta") or {}).get("schema_version"), json.dumps(doc, ensure_ascii=False),
+        ))
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO students VALUES (?,?,?,?,?,?,?,?,?,?,?)", rows)
+    return len(rows)
+
+# ---------------------------------------------------------------- query
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def fts_query(text: str, any_term: bool = False) -> str:
+    terms = [f'"{t}"' for t in TOKEN_RE.findall(text)]
+    return (" OR " if any_term else " ").join(terms)
+
+def search(conn: sqlite3.Connection, text: str, k: int = 10, any_term: bool = False, **filters) -> List[sqlite3.Row]:
+    """BM25-ranked keyword retrieval with optional column filters (type=, family=, phase=, week=, ...).
+    Text without any word characters matches nothing (an empty MATCH is an FTS5 syntax error)."""
+    query = fts_query(text, any_term)
+    if not query:
+        return []
+    where, args = ["chips_fts MATCH ?"], [query]
+    for col, val in filters.items():
+        if val is not None:
+            if col not in CHIP_COLS:
+                raise ValueError(f"unknown filter column: {col}")
+            where.append(f"c.{col} = ?")
+            args.append(val)
+    sql = ("SELECT c.chip_id, c.type, c.family, c.week, c.phase, bm25(chips_fts) AS score, "
+           "snippet(chips_fts, 0, '[', ']', '…', 12) AS snippet "
+           "FROM chips_fts JOIN chips c ON c.id = chips_fts.rowid "
+           f"WHERE {' AND '.join(where)} ORDER BY score LIMIT ?")
+    return conn.execute(sql, (*args, k)).fetchall()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--db", default=str(DB_FILE))
+    sub = ap.add_subparsers(dest="cmd")
+    imp = sub.add_parser("import", help="incrementally import chips, students and taxonomy")
+    imp.add_argument("--force", action="store_true", help="re-import files even if unchanged")
+    s = sub.add_parser("search", help="FTS5 keyword search over chips")
+    s.add_argument("text")
+    s.add_argument("-k", type=int, default=10)
+    s.add_argument("--any", action="store_true", help="OR the terms instead of AND")
+    for col in ("type", "family", "week", "phase", "situation_tag"):
+        s.add_argument(f"--{col}")
+    q = sub.add_parser("sql", help="run an ad-hoc SQL query")
+    q.add_argument("query")
+    args = ap.parse_args()
+
+    conn = connect(Path(args.db))
+    t0 = time.perf_counter()
+    if args.cmd in (None, "import"):
+        catalog = load_catalog()
+        stats = import_chips(conn, catalog, force=getattr(args, "force", False))
+        n_tax = import_taxonomy(conn, catalog)
+        n_students = import_students(conn)
+        total = conn.execute("SELECT COUNT(*) FROM chips").fetchone()[0]
+        print(f"Imported {stats['chips']} chips from {stats['files']} files "
+              f"({stats['skipped']} unchanged, {stats['removed']} removed); "
+              f"{total} chips, {n_students} students, {n_tax} taxonomy values in {args.db}")
+    elif args.cmd == "search":
+        filters = {c: getattr(args, c) for c in ("type", "family", "week", "phase", "situation_tag")}
+        for r in search(conn, args.text, args.k, args.any, **filters):
+            print(f"{r['score']:7.2f}  {r['chip_id']:38s} {r['type']:26s} {r['phase'] or '':14s} {r['snippet']}")
+    elif args.cmd == "sql":
+        cur = conn.execute(args.query)
+        if cur.description:
+            print("\t".join(d[0] for d in cur.description))
+            for r in cur:
+                print("\t".join("" if v is None else str(v) for v in r))
+    print(f"[{(time.perf_counter() - t0) * 1000:.1f} ms]", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+chip_index.py
+
+On-disk chip_id -> (file, byte offset, length) hash map over the catalogued corpus
+(see chip_catalog.py), kb_chips/.chip_index.kci, so chips are fetched by id without
+scanning or parsing the batch files. It is merged from the per-file sidecars of
+chip_sidecar.py, so a rebuild after one batch changes re-reads only that batch.
+
+Layout (little-endian):
+  header  b"KCI1" | u32 version | u32 n_chips | u32 n_slots | u32 n_files | 40s catalog signature
+  files   per file: u16 len | path relative to kb_chips, padded to 8 bytes
+  slots   n_slots x (u64 key | u64 offset | u32 length | u32 file_no)
+The key is the first 8 bytes of blake2b(chip_id) (0 marks an empty slot). The table is
+open-addressed with linear probing, and n_slots is a power of two >= 2 * n_chips, so a
+lookup reads one or two 24-byte slots of the mmap.
+
+resolve_many() looks every id up first. It then reads each file once, in ascending
+offset order (seek forward, read the record), and checks that each record carries the
+chip_id that was asked for. The index is rebuilt when the catalog signature changes, so
+a stale offset would show up as a mismatch, not wrong data.
+
+Usage:
+  python chip_index.py                        # build
+  python chip_index.py W024-INSIGHT-001 ...   # resolve ids, print the records
+  python chip_index.py --stats                # slots, probe lengths, batched lookup timing
+
+Library:
+  from chip_index import ChipIndex
+  with ChipIndex.open() as index:
+      chips, missing = index.resolve_many(["W024-INSIGHT-001", "w045_kb_jcamp_decision"])
+"""
+import argparse, json, mmap, os, struct, sys, time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chip_catalog import KB_ROOT, canonical_files, load_catalog
+from chip_columns import catalog_signature
+from chip_sidecar import Sidecar, key_of
+
+INDEX_FILE = ".chip_index.kci"
+MAGIC = b"KCI1"
+VERSION = 1
+HEADER = struct.Struct("<4sIIII40s")
+SLOT = struct.Struct("<QQII")
+
+# ---------------------------------------------------------------- build
+
+def build_index(catalog: dict, out: Path) -> Tuple[int, int, int]:
+    """Write the index from the per-file sidecars (chip_sidecar.py), refreshing stale ones;
+    returns (chips indexed, duplicate ids skipped, unparseable records)."""
+    root = Path(catalog["root"])
+    files: List[str] = []
+    entries: List[Tuple[int, int, int, int]] = []
+    seen = set()
+    dups = bad = 0
+    for e in canonical_files(catalog):
+        file_no = len(files)
+        files.append(e["path"])
+        sc = Sidecar.open(root / e["path"])
+        if sc is None:
+            raise OSError(f"cannot write the sidecar of {e['path']}")
+        with sc:
+            bad += sc.n_bad
+            for key, off, _, length in sorted(sc.entries(), key=lambda s: s[1]):
+                if key in seen:
+                    dups += 1
+                    continue
+                seen.add(key)
+                entries.append((key, off, length, file_no))
+
+    n_slots = 1 << max(4, (2 * len(entries) - 1).bit_length())
+    slots = bytearray(n_slots * SLOT.size)
+    mask = n_slots - 1
+    for key, off, length, file_no in entries:
+        i = key & mask
+        while SLOT.unpack_from(slots, i * SLOT.size)[0]:
+            i = (i + 1) & mask
+        SLOT.pack_into(slots, i * SLOT.size, key, off, length, file_no)
+
+    head = bytearray(HEADER.pack(MAGIC, VERSION, len(entries), n_slots, len(files),
+                                 catalog_signature(catalog).encode("ascii")))
+    for path in files:
+        b = path.encode("utf-8")
+        head += struct.pack("<H", len(b)) + b
+    head += b"\0" * (-len(head) % 8)
+
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(head)
+        f.write(slots)
+    os.replace(tmp, out)
+    return len(entries), dups, bad
+
+# ---------------------------------------------------------------- load
+
+class ChipIndex:
+    def __init__(self, path: Path, root: Path = KB_ROOT):
+        self.path = Path(path)
+        self.root = Path(root)
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n_chips, self.n_slots, n_files, sig = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a v{VERSION} chip index file")
+        self.signature = sig.decode("ascii")
+        self.files: List[str] = []
+        pos = HEADER.size
+        for _ in range(n_files):
+            (ln,) = struct.unpack_from("<H", self._mm, pos)
+            self.files.append(bytes(self._mm[pos + 2:pos + 2 + ln]).decode("utf-8"))
+            pos += 2 + ln
+        self._slots = pos + (-pos % 8)
+        self._mask = self.n_slots - 1
+
+    @classmethod
+    def open(cls, root: Path = KB_ROOT, rebuild_stale: bool = True) -> "ChipIndex":
+        """Open the index, (re)building it when missing or behind the catalog."""
+        root = Path(root)
+        path = root / INDEX_FILE
+        catalog = load_catalog(root)
+        if path.exists():
+            index = cls(path, root)
+            if not rebuild_stale or index.signature == catalog_signature(catalog):
+                return index
+            index.close()
+        build_index(catalog, path)
+        return cls(path, root)
+
+    def locate(self, chip_id: str) -> Optional[Tuple[str, int, int]]:
+        """(file relative to kb_chips, byte offset, length), or None."""
+        key = key_of(chip_id)
+        i = key & self._mask
+        while True:
+            k, off, length, file_no = SLOT.unpack_from(self._mm, self._slots + i * SLOT.size)
+            if k == key:
+                return self.files[file_no], off, length
+            if k == 0:
+                return None
+            i = (i + 1) & self._mask
+
+    def resolve_many(self, chip_ids: Iterable[str]) -> Tuple[Dict[str, dict], List[str]]:
+        """({chip_id: record}, [ids not in the corpus]); one sorted-offset pass per file."""
+        by_file: Dict[str, List[Tuple[int, int, str]]] = {}
+        missing = []
+        for chip_id in dict.fromkeys(chip_ids):
+            hit = self.locate(chip_id)
+            if hit is None:
+                missing.append(chip_id)
+            else:
+                by_file.setdefault(hit[0], []).append((hit[1], hit[2], chip_id))
+        found: Dict[str, dict] = {}
+        for rel, spans in by_file.items():
+            spans.sort()
+            with open(self.root / rel, "rb") as f:
+                for off, length, chip_id in spans:
+                    f.seek(off)
+                    try:
+                        chip = json.loads(f.read(length))
+                    except ValueError:
+                        chip = None
+                    if isinstance(chip, dict) and chip.get("chip_id") == chip_id:
+                        found[chip_id] = chip
+                    else:
+                        missing.append(chip_id)
+        return found, missing
+
+    def probe_lengths(self) -> List[int]:
+        """Slots touched per stored key (1 = found in its home slot)."""
+        lengths = []
+        for i in range(self.n_slots):
+            key = SLOT.unpack_from(self._mm, self._slots + i * SLOT.size)[0]
+            if key:
+                lengths.append((i - (key & self._mask)) % self.n_slots + 1)
+        return lengths
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.n_chips
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("chip_ids", nargs="*", help="ids to resolve (prints the records as JSONL)")
+    ap.add_argument("--root", default=str(KB_ROOT))
+    ap.add_argument("--stats", action="store_true", help="print table stats and lookup timing")
+    args = ap.parse_args()
+    root = Path(args.root).resolve()
+    out = root / INDEX_FILE
+
+    if args.chip_ids:
+        with ChipIndex.open(root) as index:
+            found, missing = index.resolve_many(args.chip_ids)
+        for chip_id in args.chip_ids:
+            if chip_id in found:
+                print(json.dumps(found[chip_id], ensure_ascii=False))
+        for chip_id in missing:
+            print(f"not found: {chip_id}", file=sys.stderr)
+        sys.exit(1 if missing else 0)
+
+    if not args.stats:
+        t0 = time.perf_counter()
+        n, dups, bad = build_index(load_catalog(root), out)
+        print(f"Indexed {n} chips -> {out} ({out.stat().st_size / 1024:.1f} KB) "
+              f"in {(time.perf_counter() - t0) * 1000:.0f} ms")
+        if dups or bad:
+            print(f"  skipped {dups} duplicate ids, {bad} unparseable records")
+        return
+
+    with ChipIndex.open(root) as index:
+        probes = index.probe_lengths()
+        print(f"{out}: {index.n_chips} chips in {index.n_slots} slots over {len(index.files)} files, "
+              f"signature {index.signature[:12]}")
+        print(f"  probe length: mean {sum(probes) / max(len(probes), 1):.2f}, max {max(probes, default=0)}")
+        from kbchips import load_corpus
+        ids = [c.chip_id for c in load_corpus(root=root) if c.error is None]
+        t0 = time.perf_counter()
+        found, missing = index.resolve_many(ids)
+        dt = (time.perf_counter() - t0) * 1000
+        print(f"  resolve_many({len(ids)} ids): {dt:.1f} ms, {len(found)} found, {len(missing)} missing")
+        sample = ids[::max(1, len(ids) // 12)][:12]
+        t0 = time.perf_counter()
+        index.resolve_many(sample)
+        print(f"  resolve_many({len(sample)} ids): {(time.perf_counter() - t0) * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
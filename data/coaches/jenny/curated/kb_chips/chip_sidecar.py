@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+chip_sidecar.py
+
+Optional per-file byte-offset index for chip batches, stored next to each file:
+session/w024_chips.jsonl gets session/.w024_chips.jsonl.kcx. Catalog, watch and blob-store
+scans skip dotfiles, so the sidecars are invisible to them. A reader seeks to, or
+mmap-slices, exactly one record instead of parsing the file from the start, so a point
+lookup costs the same for a 10-chip and a 1000-chip batch.
+
+Layout (little-endian):
+  header  b"KCX1" | u32 version | u64 file size | u64 file mtime_ns | u32 n_records | u32 n_slots | u32 n_bad | pad
+  slots   n_slots x (u64 key | u64 offset | u64 record hash | u32 length | pad)
+key is the first 8 bytes of blake2b(chip_id) (0 marks an empty slot). The record hash is
+blake2b-8 of the record bytes. The table is open-addressed with linear probing, and
+n_slots is a power of two >= 2 * n_records.
+
+A sidecar is valid only while the file's size and mtime_ns match its header. A stale or
+missing sidecar is rebuilt on open (build=True), else open() returns None and callers
+fall back to a scan. Reads check the record hash, so a record changed in place without
+an mtime change is reported, not returned.
+
+Built by transform_imsg_chips_v3.py / validate_kbv6_chips.py with --sidecar, by
+chip_index.py (which builds its corpus-wide table from them), or here.
+
+Usage:
+  python chip_sidecar.py                                   # refresh sidecars of every catalogued batch
+  python chip_sidecar.py session/w024_intel_chips.json --get W024-INSIGHT-001
+  python chip_sidecar.py --stats                           # point lookup vs full parse timing
+  python chip_sidecar.py --clean
+
+Library:
+  from chip_sidecar import Sidecar, read_chip
+  chip = read_chip(path, "W024-INSIGHT-001")        # one seek + one read
+  with Sidecar.open(path) as sc:                      # repeated lookups: mmap slices
+      raw = sc.read_raw("W024-INSIGHT-001")
+"""
+import argparse, hashlib, json, mmap, os, struct, sys, time
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from kbchips.loader import sniff_format
+
+KB_ROOT = Path(__file__).resolve().parent
+SUFFIX = ".kcx"
+MAGIC = b"KCX1"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQIII4x")
+SLOT = struct.Struct("<QQQI4x")
+SPAN_FORMATS = ("jsonl", "json", "json-array")
+
+def key_of(chip_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(chip_id.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+def record_hash(raw: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(raw, digest_size=8).digest(), "little")
+
+def sidecar_path(path) -> Path:
+    path = Path(path)
+    return path.with_name(f".{path.name}{SUFFIX}")
+
+# ---------------------------------------------------------------- build
+
+def record_spans(raw: bytes, fmt: str) -> Iterator[Tuple[int, int]]:
+    """(offset, length) of every record in a chip file, whitespace trimmed."""
+    if fmt == "jsonl":
+        pos = 0
+        for line in raw.split(b"\n"):
+            stripped = line.strip()
+            if stripped:
+                yield pos + line.index(stripped[:1]), len(stripped)
+            pos += len(line) + 1
+    elif fmt == "json":
+        stripped = raw.strip()
+        if stripped:
+            yield raw.index(stripped[:1]), len(stripped)
+    elif fmt == "json-array":
+        text = raw.decode("utf-8")
+        decoder = json.JSONDecoder()
+        i = text.index("[") + 1
+        char_pos, byte_pos = 0, 0
+        while True:
+            while i < len(text) and text[i] in " \t\r\n,":
+                i += 1
+            if i >= len(text) or text[i] == "]":
+                return
+            _, end = decoder.raw_decode(text, i)
+            byte_pos += len(text[char_pos:i].encode("utf-8"))
+            length = len(text[i:end].encode("utf-8"))
+            yield byte_pos, length
+            byte_pos += length
+            char_pos = i = end
+
+def build_sidecar(path, raw: Optional[bytes] = None, st: Optional[os.stat_result] = None) -> Path:
+    """Write path's sidecar. Pass raw (and the stat taken after writing it) when the
+    caller already holds the bytes, as the transform does."""
+    path = Path(path)
+    if raw is None:
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            raw = f.read()
+    st = st or os.stat(path)
+    entries: List[Tuple[int, int, int, int]] = []
+    seen = set()
+    bad = 0
+    for off, length in record_spans(raw, sniff_format(raw, path.name)):
+        rec = raw[off:off + length]
+        try:
+            chip = json.loads(rec)
+        except ValueError:
+            bad += 1
+            continue
+        chip_id = chip.get("chip_id") if isinstance(chip, dict) else None
+        if not isinstance(chip_id, str) or not chip_id:
+            bad += 1
+            continue
+        key = key_of(chip_id)
+        if key in seen:  # first record wins, as in every loader
+            continue
+        seen.add(key)
+        entries.append((key, off, record_hash(rec), length))
+
+    n_slots = 1 << max(3, (2 * len(entries) - 1).bit_length())
+    mask = n_slots - 1
+    slots = bytearray(n_slots * SLOT.size)
+    for key, off, h, length in entries:
+        i = key & mask
+        while SLOT.unpack_from(slots, i * SLOT.size)[0]:
+            i = (i + 1) & mask
+        SLOT.pack_into(slots, i * SLOT.size, key, off, h, length)
+
+    out = sidecar_path(path)
+    tmp = out.with_name(f"{out.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, st.st_size, st.st_mtime_ns, len(entries), n_slots, bad))
+        f.write(slots)
+    os.replace(tmp, out)
+    return out
+
+# ---------------------------------------------------------------- read
+
+class Sidecar:
+    """A fresh sidecar plus a lazily mapped view of its chip file."""
+
+    def __init__(self, path, side: Path):
+        self.path = Path(path)
+        self._file = open(side, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, self.mtime_ns, self.n_records, self.n_slots, self.n_bad = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{side}: not a v{VERSION} chip sidecar")
+        self._mask = self.n_slots - 1
+        self._data = None
+
+    @classmethod
+    def open(cls, path, build: bool = True) -> Optional["Sidecar"]:
+        """The sidecar of path if it matches the file's size and mtime, rebuilding it when
+        stale or missing (build=True); None when there is none and it can't be written."""
+        path = Path(path)
+        side = sidecar_path(path)
+        st = os.stat(path)
+        try:
+            sc = cls(path, side)
+            if sc.size == st.st_size and sc.mtime_ns == st.st_mtime_ns:
+                return sc
+            sc.close()
+        except (OSError, ValueError):
+            pass
+        if not build:
+            return None
+        try:
+            build_sidecar(path)
+        except OSError:
+            return None
+        return cls(path, side)
+
+    def entries(self) -> Iterator[Tuple[int, int, int, int]]:
+        """(key, offset, hash, length) of every record, in slot order."""
+        for i in range(self.n_slots):
+            slot = SLOT.unpack_from(self._mm, HEADER.size + i * SLOT.size)
+            if slot[0]:
+                yield slot
+
+    def locate(self, chip_id: str) -> Optional[Tuple[int, int, int]]:
+        """(offset, length, record hash), or None."""
+        key = key_of(chip_id)
+        i = key & self._mask
+        while True:
+            k, off, h, length = SLOT.unpack_from(self._mm, HEADER.size + i * SLOT.size)
+            if k == key:
+                return off, length, h
+            if k == 0:
+                return None
+            i = (i + 1) & self._mask
+
+    def read_raw(self, chip_id: str) -> Optional[bytes]:
+        """The record's bytes, sliced from an mmap of the chip file."""
+        hit = self.locate(chip_id)
+        if hit is None:
+            return None
+        if self._data is None:
+            with open(self.path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        off, length, h = hit
+        return _checked(self.path, chip_id, self._data[off:off + length], h)
+
+    def get(self, chip_id: str) -> Optional[dict]:
+        raw = self.read_raw(chip_id)
+        return None if raw is None else json.loads(raw)
+
+    def __contains__(self, chip_id: str) -> bool:
+        return self.locate(chip_id) is not None
+
+    def __len__(self):
+        return self.n_records
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _checked(path: Path, chip_id: str, raw: bytes, h: int) -> bytes:
+    if record_hash(raw) != h:
+        raise ValueError(f"{path}: record {chip_id} does not match its sidecar hash (file rewritten in place?)")
+    return raw
+
+def _probe(f, key: int, n_slots: int) -> Optional[Tuple[int, int, int]]:
+    """Linear probe of an open sidecar file with plain seeks (no mmap setup)."""
+    mask = n_slots - 1
+    i = key & mask
+    while True:
+        f.seek(HEADER.size + i * SLOT.size)
+        k, off, h, length = SLOT.unpack(f.read(SLOT.size))
+        if k == key:
+            return off, length, h
+        if k == 0:
+            return None
+        i = (i + 1) & mask
+
+def read_chip(path, chip_id: str, build: bool = True) -> Optional[dict]:
+    """One chip by id: a probe of the sidecar, then one seek and one read of the chip file.
+    A stale or missing sidecar is rebuilt (build=True); without one the file is scanned."""
+    path = Path(path)
+    st = os.stat(path)
+    try:
+        with open(sidecar_path(path), "rb") as f:
+            magic, version, size, mtime_ns, _, n_slots, _ = HEADER.unpack(f.read(HEADER.size))
+            fresh = (magic, version, size, mtime_ns) == (MAGIC, VERSION, st.st_size, st.st_mtime_ns)
+            hit = _probe(f, key_of(chip_id), n_slots) if fresh else None
+    except (OSError, struct.error):
+        fresh = False
+    if not fresh:
+        sc = Sidecar.open(path, build=build)
+        if sc is None:
+            from kbchips import load_chips
+            for chip in load_chips(path):
+                if chip.chip_id == chip_id and chip.error is None:
+                    return chip.to_dict()
+            return None
+        with sc:
+            hit = sc.locate(chip_id)
+    if hit is None:
+        return None
+    off, length, h = hit
+    with open(path, "rb") as f:
+        f.seek(off)
+        raw = f.read(length)
+    return json.loads(_checked(path, chip_id, raw, h))
+
+# ---------------------------------------------------------------- cli
+
+def chip_batches(root: Path = KB_ROOT) -> List[Path]:
+    """Every catalogued chip/patch batch whose format has record spans."""
+    from chip_catalog import load_catalog
+    catalog = load_catalog(root)
+    base = Path(catalog["root"])
+    return [base / e["path"] for e in catalog["files"]
+            if e["role"] in ("chips", "patch") and e["format"] in SPAN_FORMATS]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("files", nargs="*", help="chip files (default: every catalogued batch)")
+    ap.add_argument("--root", default=str(KB_ROOT))
+    ap.add_argument("--get", metavar="CHIP_ID", help="print one record from the given file(s)")
+    ap.add_argument("--stats", action="store_true", help="point lookup vs full parse timing")
+    ap.add_argument("--clean", action="store_true", help="delete sidecars")
+    args = ap.parse_args()
+    files = [Path(f) for f in args.files] or chip_batches(Path(args.root))
+
+    if args.get:
+        for p in files:
+            chip = read_chip(p, args.get)
+            if chip is not None:
+                print(json.dumps(chip, ensure_ascii=False))
+                return
+        sys.exit(f"not found: {args.get}")
+
+    if args.clean:
+        n = 0
+        for p in files:
+            side = sidecar_path(p)
+            if side.exists():
+                side.unlink()
+                n += 1
+        print(f"Removed {n} sidecars")
+        return
+
+    if args.stats:
+        from kbchips import load_chips
+        for p in sorted(files, key=lambda p: p.stat().st_size)[::max(1, len(files) // 4)] + [max(files, key=lambda p: p.stat().st_size)]:
+            with Sidecar.open(p) as sc:
+                ids = [c.chip_id for c in load_chips(p) if c.error is None]
+                if not ids:
+                    continue
+                target = ids[-1]
+                t0 = time.perf_counter()
+                for _ in range(200):
+                    read_chip(p, target)
+                seek_us = (time.perf_counter() - t0) / 200 * 1e6
+                t0 = time.perf_counter()
+                for _ in range(200):
+                    sc.read_raw(target)
+                mm_us = (time.perf_counter() - t0) / 200 * 1e6
+            t0 = time.perf_counter()
+            for _ in range(20):
+                with open(p, "rb") as f:
+                    raw = f.read()
+                next(c for c in (json.loads(raw[o:o + n]) for o, n in record_spans(raw, sniff_format(raw, p.name)))
+                     if c.get("chip_id") == target)
+            scan_us = (time.perf_counter() - t0) / 20 * 1e6
+            print(f"{p.stat().st_size / 1024:8.1f} KB {len(ids):4d} chips  read_chip {seek_us:6.1f} us  "
+                  f"mmap {mm_us:5.1f} us  parse-to-last {scan_us:8.1f} us  {p.name}")
+        return
+
+    t0 = time.perf_counter()
+    built = fresh = 0
+    for p in files:
+        sc = Sidecar.open(p, build=False)
+        if sc is not None:
+            sc.close()
+            fresh += 1
+            continue
+        build_sidecar(p)
+        built += 1
+    print(f"{built} sidecars built, {fresh} fresh, in {(time.perf_counter() - t0) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+docx_extract.py
+
+Recovers the TRANS-INTEL / EXEC-INTEL / IMSG-INTEL JSON that the *.json.docx
+extraction corpus wraps in Word documents.
+
+- Opens each DOCX as a plain zip and streams word/document.xml through
+  ElementTree.iterparse (one paragraph = one line; no document library)
+- Recovers the embedded payload as JSON, falling back to JSONL, and validates it
+  (parse position for malformed documents, record / chip counts for good ones)
+- Writes the recovered text under kb_chips/.extracted/ mirroring the path below data/
+  (.json / .jsonl, or .invalid.txt when it does not parse) plus extract_report.json
+- Runs across a process pool
+- Caches by the CRC32 + size of word/document.xml from each zip's central directory
+  (.extracted/.extract_cache.json): unchanged documents and byte-identical copies
+  (archive vs curated) reuse the earlier output instead of being re-extracted.
+  Each extraction is stored once under .extracted/.by_key/ named by that key, and the
+  mirrored outputs are hardlinks to it, so re-extracting an edited document never
+  changes what another key's cache entry points at
+- Exits 1 only for documents that cannot be read; payloads that do not parse are
+  reported as invalid sources (--strict makes those fail too)
+
+Usage:
+  python docx_extract.py                        # kb_chips/*_extractions + archive/legacy_v3
+  python docx_extract.py exec_extractions -j 4  # specific files / directories
+  python docx_extract.py --list-invalid
+  python docx_extract.py --force                # ignore the cache
+  python docx_extract.py --strict               # exit 1 on invalid sources too
+"""
+import argparse, json, os, re, shutil, sys, time, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.etree.ElementTree import ParseError, iterparse
+
+KB_ROOT = Path(__file__).resolve().parent
+DATA_ROOT = KB_ROOT.parents[3]
+OUT_DIR = KB_ROOT / ".extracted"
+REPORT_FILE = "extract_report.json"
+CACHE_FILE = ".extract_cache.json"
+CACHE_VERSION = 2
+STORE_DIR = ".by_key"
+DEFAULT_SOURCES = sorted(KB_ROOT.glob("*_extractions")) + [DATA_ROOT / "archive" / "legacy_v3"]
+DOCX_RE = re.compile(r"\.(jsonl?)_?\.docx$", re.I)
+FENCE_RE = re.compile(r"^```[a-z]*\s*\n(.*?)\n```\s*$", re.S)
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_P, W_T, W_TAB, W_BR, W_CR = W + "p", W + "t", W + "tab", W + "br", W + "cr"
+
+# ---------------------------------------------------------------- docx -> text
+
+def iter_paragraphs(fileobj) -> Iterator[str]:
+    """Stream paragraphs out of a word/document.xml file object; each paragraph's
+    subtree is cleared once emitted, so memory stays at one paragraph."""
+    parts: List[str] = []
+    for _, elem in iterparse(fileobj, events=("end",)):
+        tag = elem.tag
+        if tag == W_T:
+            if elem.text:
+                parts.append(elem.text)
+        elif tag == W_TAB:
+            parts.append("\t")
+        elif tag in (W_BR, W_CR):
+            parts.append("\n")
+        elif tag == W_P:
+            yield "".join(parts)
+            parts.clear()
+            elem.clear()
+
+def docx_text(path: Path) -> str:
+    with zipfile.ZipFile(path) as zf, zf.open("word/document.xml") as f:
+        return "\n".join(iter_paragraphs(f))
+
+# ---------------------------------------------------------------- text -> payload
+
+def recover(text: str, expect: str = "json") -> Tuple[str, object, Optional[str]]:
+    """Return (format, payload, error). format is "json", "jsonl" or "invalid"."""
+    text = text.lstrip("﻿").strip()
+    m = FENCE_RE.match(text)
+    if m:
+        text = m.group(1).strip()
+    if not text:
+        return "invalid", None, "document is empty"
+
+    json_err = None
+    if expect != "jsonl" or "\n" not in text:
+        try:
+            return "json", json.loads(text), None
+        except ValueError as e:
+            json_err = e
+
+    records, bad = [], []
+    for ln, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            bad.append(ln)
+    if records and not bad:
+        return "jsonl", records, None
+    if json_err is None:
+        try:
+            return "json", json.loads(text), None
+        except ValueError as e:
+            json_err = e
+    if expect == "jsonl" and records:
+        return "invalid", None, f"JSONL lines {bad[:10]} do not parse"
+    return "invalid", None, f"line {json_err.lineno} col {json_err.colno}: {json_err.msg}"
+
+def validate(fmt: str, payload) -> List[str]:
+    errs = []
+    if fmt == "json" and not isinstance(payload, (dict, list)):
+        errs.append(f"top level is {type(payload).__name__}, expected object or array")
+    elif fmt == "json" and not payload:
+        errs.append("top level is empty")
+    elif fmt == "jsonl":
+        n = sum(1 for r in payload if not isinstance(r, dict))
+        if n:
+            errs.append(f"{n} JSONL lines are not objects")
+    return errs
+
+def count_records(fmt: str, payload) -> Tuple[int, int]:
+    """(records, chips): top-level items and how many of them carry a chip_id."""
+    items = payload if isinstance(payload, list) else [payload]
+    return len(items), sum(1 for r in items if isinstance(r, dict) and "chip_id" in r)
+
+# ---------------------------------------------------------------- files
+
+def data_rel(p: Path) -> Path:
+    try:
+        return p.resolve().relative_to(DATA_ROOT)
+    except ValueError:
+        return Path(p.name)
+
+def out_suffix(fmt: str) -> str:
+    return ".invalid.txt" if fmt == "invalid" else "." + fmt
+
+def out_path(src: Path, fmt: str, out_dir: Path) -> Path:
+    rel = data_rel(src)
+    return out_dir / rel.parent / (DOCX_RE.sub("", rel.name) + out_suffix(fmt))
+
+def store_path(key: str, fmt: str, out_dir: Path) -> Path:
+    """Where the extraction of one word/document.xml (CRC32, size) key lives."""
+    return out_dir / STORE_DIR / (key.replace(":", "_") + out_suffix(fmt))
+
+def write_atomic(path: Path, text: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+def extract_one(src: str, out_dir: str, key: str) -> Dict:
+    """Worker: extract, validate and write one document to its key's store file.
+    Returns its report entry ("output" is relative to out_dir)."""
+    p = Path(src)
+    m = DOCX_RE.search(p.name)
+    entry = {"source": data_rel(p).as_posix(), "format": "invalid", "output": None, "records": 0, "chips": 0, "errors": []}
+    try:
+        text = docx_text(p)
+    except (zipfile.BadZipFile, KeyError, ParseError, OSError) as e:
+        entry["format"] = "unreadable"
+        entry["errors"].append(f"cannot read document: {e}")
+        return entry
+    fmt, payload, err = recover(text, m.group(1).lower() if m else "json")
+    entry["format"] = fmt
+    if err:
+        entry["errors"].append(err)
+    else:
+        entry["errors"] += validate(fmt, payload)
+        entry["records"], entry["chips"] = count_records(fmt, payload)
+    dest = store_path(key, fmt, Path(out_dir))
+    write_atomic(dest, text.lstrip("﻿").strip() + "\n")
+    entry["output"] = os.path.relpath(dest, out_dir)
+    return entry
+
+def find_docx(sources) -> List[Path]:
+    found: List[Path] = []
+    for s in sources:
+        s = Path(s)
+        if s.is_file():
+            found.append(s)
+            continue
+        stack = [s]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif DOCX_RE.search(entry.name):
+                        found.append(Path(entry.path))
+    return sorted(set(found))
+
+# ---------------------------------------------------------------- cache
+
+def member_key(path: Path) -> Optional[str]:
+    """CRC32 + size of word/document.xml, read from the zip's central directory
+    (nothing is decompressed). Identical documents share a key wherever they live."""
+    try:
+        with zipfile.ZipFile(path) as zf:
+            info = zf.getinfo("word/document.xml")
+    except (zipfile.BadZipFile, KeyError, OSError):
+        return None
+    return f"{info.CRC:08x}:{info.file_size}"
+
+def load_cache(out_dir: Path) -> Dict[str, dict]:
+    try:
+        data = json.loads((out_dir / CACHE_FILE).read_text(encoding="utf-8"))
+        if data.get("version") == CACHE_VERSION:
+            return data
+    except (OSError, ValueError):
+        pass
+    return {"version": CACHE_VERSION, "docs": {}, "files": {}}
+
+def save_cache(out_dir: Path, cache: dict):
+    write_atomic(out_dir / CACHE_FILE, json.dumps(cache, separators=(",", ":"), ensure_ascii=False))
+
+def reuse_output(src: Path, doc: dict, out_dir: Path) -> str:
+    """Materialise a stored extraction at src's output path (hardlink, else copy); a file
+    already there is replaced unless it is that store file."""
+    dest = out_path(src, doc["format"], out_dir)
+    cached = out_dir / doc["output"]
+    if dest.exists() and not os.path.samefile(dest, cached):
+        dest.unlink()
+    if not dest.exists():
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(cached, dest)
+        except OSError:
+            shutil.copyfile(cached, dest)
+    return os.path.relpath(dest, out_dir)
+
+# ---------------------------------------------------------------- run
+
+def extract_all(paths: List[Path], out_dir: Path = OUT_DIR, workers: Optional[int] = None,
+                force: bool = False) -> Tuple[List[Dict], Dict[str, int]]:
+    """Extract every document whose word/document.xml (CRC32, size) is not cached yet;
+    unchanged and duplicate documents reuse the stored output. Returns (results, stats).
+
+    cache["files"] maps each source to its key and mirrored output; an output left behind
+    by a format change is removed, and store files no source refers to are dropped."""
+    cache = {"version": CACHE_VERSION, "docs": {}, "files": {}} if force else load_cache(out_dir)
+    docs, files = cache["docs"], cache["files"]
+    keys = {p: member_key(p) for p in paths}
+
+    todo: Dict[str, Path] = {}  # key -> one representative document
+    for p, key in keys.items():
+        doc = docs.get(key)
+        if key is None or doc is None or not doc["output"] or not (out_dir / doc["output"]).exists():
+            todo.setdefault(key or f"unreadable:{p}", p)
+
+    args = [str(p) for p in todo.values()]
+    n = len(args)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or n < 2:
+        fresh = [extract_one(a, str(out_dir), k) for a, k in zip(args, todo)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fresh = list(pool.map(extract_one, args, [str(out_dir)] * n, list(todo),
+                                  chunksize=max(1, n // (workers * 4))))
+    for key, entry in zip(todo, fresh):
+        if not key.startswith("unreadable:"):
+            docs[key] = {k: entry[k] for k in ("format", "output", "records", "chips", "errors")}
+
+    results, stats = [], {"extracted": len(fresh), "unchanged": 0, "duplicate": 0}
+    fresh_by_src = {e["source"]: e for e in fresh}
+    for p, key in keys.items():
+        rel = data_rel(p).as_posix()
+        prev = files.get(rel) or {}
+        if key is None or key not in docs or not docs[key]["output"]:
+            results.append(fresh_by_src.get(rel) or {"source": rel, "format": "unreadable", "output": None,
+                                                     "records": 0, "chips": 0, "errors": ["cannot read document"]})
+            output = None
+        else:
+            doc = docs[key]
+            if rel not in fresh_by_src:
+                stats["unchanged" if prev.get("key") == key else "duplicate"] += 1
+            output = reuse_output(p, doc, out_dir)
+            results.append(dict(doc, source=rel, output=output))
+        if prev.get("output") and prev["output"] != output:
+            try:
+                (out_dir / prev["output"]).unlink()
+            except FileNotFoundError:
+                pass
+        if key:
+            files[rel] = {"key": key, "output": output}
+        else:
+            files.pop(rel, None)
+
+    live = {f["key"] for f in files.values()}
+    for key in [k for k in docs if k not in live]:
+        if docs[key]["output"]:
+            try:
+                (out_dir / docs.pop(key)["output"]).unlink()
+            except FileNotFoundError:
+                pass
+        else:
+            del docs[key]
+    save_cache(out_dir, cache)
+    return results, stats
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sources", nargs="*", help="files or directories (default: *_extractions + archive/legacy_v3)")
+    ap.add_argument("--out", default=str(OUT_DIR), help="directory for recovered JSON/JSONL")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: cpu count)")
+    ap.add_argument("--force", action="store_true", help="ignore the extraction cache and re-extract everything")
+    ap.add_argument("--list-invalid", action="store_true", help="print every document that failed validation")
+    ap.add_argument("--strict", action="store_true", help="exit 1 on invalid sources, not only unreadable documents")
+    args = ap.parse_args()
+    out_dir = Path(args.out).resolve()
+
+    t0 = time.perf_counter()
+    paths = find_docx(args.sources or DEFAULT_SOURCES)
+    results, stats = extract_all(paths, out_dir, args.jobs, args.force)
+    dt = time.perf_counter() - t0
+
+    write_atomic(out_dir / REPORT_FILE, json.dumps({
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "documents": len(results),
+        "results": results,
+    }, indent=2, ensure_ascii=False))
+
+    bad = [r for r in results if r["errors"]]
+    failed = [r for r in bad if r["format"] == "unreadable"]
+    by_fmt: Dict[str, int] = {}
+    for r in results:
+        by_fmt[r["format"]] = by_fmt.get(r["format"], 0) + 1
+    print(f"Processed {len(results)} documents in {dt:.2f}s -> {out_dir}")
+    print(f"  extracted={stats['extracted']}, cached unchanged={stats['unchanged']}, cached duplicate={stats['duplicate']}")
+    print("  " + ", ".join(f"{k}={v}" for k, v in sorted(by_fmt.items())) + f", invalid sources={len(bad) - len(failed)}, unreadable={len(failed)}")
+    for r in (bad if args.list_invalid else bad[:10]):
+        print(f"  - {r['source']}: {'; '.join(r['errors'])}")
+    if len(bad) > 10 and not args.list_invalid:
+        print(f"  ... {len(bad) - 10} more (--list-invalid)")
+    return 1 if failed or (bad and args.strict) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
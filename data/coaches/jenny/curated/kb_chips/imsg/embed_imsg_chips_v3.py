@@ -10,7 +10,7 @@ embed_imsg_chips_v3.py
 Usage:
   python embed_imsg_chips_v3.py --input iMessage_Intel_Chips_Batch_v3.jsonl --namespace KBv6_iMessage_2025-10-07_v1.0 --overwrite
 """
-import argparse, json, os, sys, time
+import argparse, os, sys
 from typing import List
 try:
     from openai import OpenAI
@@ -23,16 +23,23 @@ except Exception:
     print("Please install pinecone-client>=3.0.0", file=sys.stderr)
     sys.exit(1)
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from kbchips import load_chips
+
 MODEL = "text-embedding-3-large"
 DIM = 3072
 
 def load_jsonl(path: str):
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line: 
-                continue
-            yield json.loads(line)
+    """Valid chips of path; malformed records are reported on stderr and skipped."""
+    skipped = 0
+    for chip in load_chips(path):
+        if chip.error:
+            skipped += 1
+            print(f"Skipping {path}: {chip.error}", file=sys.stderr)
+            continue
+        yield chip.to_dict()
+    if skipped:
+        print(f"Skipped {skipped} malformed chip(s) in {path}", file=sys.stderr)
 
 def embed_texts(client, texts: List[str]) -> List[List[float]]:
     # Batching for speed; simple split in chunks of 100
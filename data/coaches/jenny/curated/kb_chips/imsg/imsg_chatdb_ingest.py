@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+imsg_chatdb_ingest.py
+
+Ingests a macOS Messages database (chat.db, read locally as a file) into conversation
+windows that transform_imsg_chips_v3.py can turn into chips. Replaces the PDF export
+route (imsg_pdf_ingest.py) for new students.
+
+- Opens chat.db read-only (immutable URI, so a copied file is never locked or modified)
+- Per handle, reads only the timestamp column first (message(handle_id, date) index)
+  and finds session boundaries with one vectorised NumPy pass over the time gaps
+- Then streams the message rows in date order (fetchmany) and cuts them at those
+  boundaries; text comes from message.text, or from attributedBody on newer macOS
+- Emits the same window records as imsg_pdf_ingest.py (window_record), so the
+  transform stage needs no changes
+
+Handles are phone numbers / emails; they are replaced by --contact names so no
+identifiers reach the chip content.
+
+Usage:
+  python imsg_chatdb_ingest.py ~/Library/Messages/chat.db --contact "+15551234567=Huda" \\
+      --me Jenny --phase P3-JUNIOR --output imsg_windows_chatdb.jsonl
+  python imsg_chatdb_ingest.py chat.db --list-handles
+"""
+import argparse, sqlite3, sys, time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import numpy as np
+except Exception:
+    print("Please install numpy>=1.20", file=sys.stderr)
+    sys.exit(1)
+
+from imsg_pdf_ingest import GAP_HOURS, MAX_MESSAGES, Message, window_record, write_windows
+
+APPLE_EPOCH = 978307200  # 2001-01-01 UTC in unix seconds
+FETCH_ROWS = 2000
+
+def connect(path: Path) -> sqlite3.Connection:
+    return sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro&immutable=1", uri=True)
+
+def to_unix(dates: np.ndarray) -> np.ndarray:
+    """message.date is seconds since 2001 on old macOS and nanoseconds since 2001 on
+    High Sierra and later; normalise both to unix seconds."""
+    dates = dates.astype(np.float64)
+    return np.where(dates > 1e11, dates / 1e9, dates) + APPLE_EPOCH
+
+def decode_attributed_body(blob: Optional[bytes]) -> Optional[str]:
+    """Pull the plain string out of an NSAttributedString typedstream blob."""
+    if not blob:
+        return None
+    i = blob.find(b"NSString")
+    if i < 0:
+        return None
+    p = i + len(b"NSString") + 5
+    if p >= len(blob):
+        return None
+    n = blob[p]
+    p += 1
+    if n == 0x81:
+        n = int.from_bytes(blob[p:p + 2], "little")
+        p += 2
+    elif n == 0x82:
+        n = int.from_bytes(blob[p:p + 3], "little")
+        p += 3
+    return blob[p:p + n].decode("utf-8", "replace") or None
+
+def list_handles(conn: sqlite3.Connection, min_messages: int = 1) -> List[Tuple[int, str, int]]:
+    """(handle rowid, handle id, message count), busiest first."""
+    return conn.execute(
+        "SELECT h.ROWID, h.id, COUNT(m.ROWID) AS n FROM handle h JOIN message m ON m.handle_id = h.ROWID "
+        "GROUP BY h.ROWID HAVING n >= ? ORDER BY n DESC", (min_messages,)).fetchall()
+
+def session_bounds(unix_ts: np.ndarray, gap_hours: float = GAP_HOURS, max_messages: int = MAX_MESSAGES) -> np.ndarray:
+    """Start offsets of each session: a new session begins after a gap longer than
+    gap_hours, and long sessions are split every max_messages."""
+    if unix_ts.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.diff(unix_ts) > gap_hours * 3600) + 1
+    starts = np.concatenate(([0], starts))
+    lengths = np.diff(np.concatenate((starts, [unix_ts.size])))
+    if (lengths > max_messages).any():
+        # split oversized sessions into max_messages-sized chunks
+        starts = np.concatenate([np.arange(s, s + n, max_messages) for s, n in zip(starts, lengths)])
+    return starts
+
+def iter_handle_windows(conn: sqlite3.Connection, handle_rowid: int, me: str, them: str,
+                        gap_hours: float = GAP_HOURS, max_messages: int = MAX_MESSAGES) -> Iterator[List[Message]]:
+    dates = np.fromiter((d for (d,) in conn.execute(
+        "SELECT date FROM message WHERE handle_id = ? ORDER BY date, ROWID", (handle_rowid,))), dtype=np.int64)
+    if dates.size == 0:
+        return
+    unix_ts = to_unix(dates)
+    bounds = set(session_bounds(unix_ts, gap_hours, max_messages)[1:].tolist())
+
+    cur = conn.execute(
+        "SELECT date, is_from_me, text, attributedBody FROM message WHERE handle_id = ? ORDER BY date, ROWID",
+        (handle_rowid,))
+    window: List[Message] = []
+    i = 0
+    while True:
+        rows = cur.fetchmany(FETCH_ROWS)
+        if not rows:
+            break
+        for _, from_me, text, body in rows:
+            if i in bounds and window:
+                yield window
+                window = []
+            text = text or decode_attributed_body(body)
+            if text:
+                text = text.replace("￼", "").strip()
+            if text:
+                window.append(Message(me if from_me else them, datetime.fromtimestamp(unix_ts[i]), text, None))
+            i += 1
+    if window:
+        yield window
+
+def parse_contacts(pairs: List[str]) -> Dict[str, str]:
+    out = {}
+    for pair in pairs or []:
+        handle, _, name = pair.partition("=")
+        if not name:
+            raise SystemExit(f"--contact expects HANDLE=Name, got {pair!r}")
+        out[handle.strip()] = name.strip()
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("db", help="path to a chat.db copy")
+    ap.add_argument("--output", help="JSONL output path (default: stdout)")
+    ap.add_argument("--contact", nargs="*", default=[], help="HANDLE=Name; only these handles are ingested when given")
+    ap.add_argument("--me", default="Jenny", help="name for is_from_me messages")
+    ap.add_argument("--phase", help="phase label for source_doc (e.g. P3-JUNIOR)")
+    ap.add_argument("--week", help="week label for source_doc (default: IMSG)")
+    ap.add_argument("--gap-hours", type=float, default=GAP_HOURS, help="silence that starts a new session")
+    ap.add_argument("--max-messages", type=int, default=MAX_MESSAGES, help="cap on messages per window")
+    ap.add_argument("--min-messages", type=int, default=20, help="skip handles with fewer messages")
+    ap.add_argument("--list-handles", action="store_true", help="print handle ids with message counts and exit")
+    args = ap.parse_args()
+
+    conn = connect(Path(args.db))
+    handles = list_handles(conn, args.min_messages)
+    if args.list_handles:
+        for rowid, hid, n in handles:
+            print(f"{n:8d}  {hid}")
+        return
+
+    contacts = parse_contacts(args.contact)
+    if contacts:
+        handles = [h for h in handles if h[1] in contacts]
+    t0 = time.perf_counter()
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    total = 0
+    try:
+        for n_handle, (rowid, hid, n) in enumerate(handles, 1):
+            them = contacts.get(hid) or f"Contact{n_handle}"
+            records = (window_record(w, Path(args.db).name, args.phase, args.week, {"ingest": "chat.db"})
+                       for w in iter_handle_windows(conn, rowid, args.me, them, args.gap_hours, args.max_messages))
+            k = write_windows(records, out)
+            total += k
+            print(f"{them}: {n} messages -> {k} windows", file=sys.stderr)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Wrote {total} conversation windows from {len(handles)} handles in {time.perf_counter() - t0:.2f}s"
+          + (f" → {args.output}" if args.output else ""), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+imsg_pdf_ingest.py
+
+Streams iMessage PDF exports (e.g. "Jenny-Huda Private iMessage Texts-Part-2_ImportedDoc.pdf")
+into conversation windows that transform_imsg_chips_v3.py can turn into chips.
+
+- Extracts text one page at a time with pypdf; extracted text is never accumulated
+- Parses sender / timestamp lines into message records; lines without a header
+  continue the previous message, including across page breaks
+- Cuts windows at time gaps (--gap-hours) or at --max-messages, holding only the
+  current window in memory
+- Emits one JSONL record per window: content = "Sender: text" lines, source_doc
+  points back at the PDF and page range
+
+Recognised line shapes:
+  [3/1/24, 9:14:03 PM] Jenny: text       bracketed export
+  Mar 1, 2024 at 9:14 PM                 timestamp header (applies to following messages)
+  Jenny: text                            sender line
+  Jenny                                  sender alone; text on following lines
+
+Usage:
+  python imsg_pdf_ingest.py "Jenny-Huda Private iMessage Texts-Part-2_ImportedDoc.pdf" \\
+      --participants Jenny Huda --phase P3-JUNIOR --output imsg_windows_part2.jsonl
+  python transform_imsg_chips_v3.py --input imsg_windows_part2.jsonl --output iMessage_Intel_Chips_Batch_v4.jsonl
+"""
+import argparse, hashlib, json, re, sys
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_PARTICIPANTS = ["Jenny", "Huda", "Me"]
+GAP_HOURS = 6.0
+MAX_MESSAGES = 40
+
+BRACKET_RE = re.compile(r"^\[(\d{1,2}/\d{1,2}/\d{2,4}),?\s+(\d{1,2}:\d{2}(?::\d{2})?\s*[AP]M)\]\s*([^:]{1,40}):\s?(.*)$", re.I)
+STAMP_RE = re.compile(
+    r"^(?:(?:Mon|Tue|Wed|Thu|Fri|Sat|Sun)[a-z]*,?\s+)?([A-Z][a-z]{2,8}\.? \d{1,2},? \d{4})(?:,?\s+(?:at\s+)?(\d{1,2}:\d{2}(?::\d{2})?\s*[AP]M))?$")
+DATE_FORMATS = ("%m/%d/%y %I:%M:%S %p", "%m/%d/%y %I:%M %p", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %I:%M %p",
+                "%b %d %Y %I:%M %p", "%b %d %Y %I:%M:%S %p", "%B %d %Y %I:%M %p", "%B %d %Y %I:%M:%S %p",
+                "%b %d %Y", "%B %d %Y")
+
+class Message:
+    __slots__ = ("sender", "ts", "text", "page")
+
+    def __init__(self, sender: str, ts: Optional[datetime], text: str, page: int):
+        self.sender = sender
+        self.ts = ts
+        self.text = text
+        self.page = page
+
+    def __repr__(self):
+        return f"Message({self.sender!r}, {self.ts!r}, {self.text[:30]!r})"
+
+def parse_time(date_s: str, time_s: Optional[str] = None) -> Optional[datetime]:
+    s = re.sub(r"[,.]", "", f"{date_s} {time_s or ''}").strip().upper().replace("AM", " AM").replace("PM", " PM")
+    s = re.sub(r"\s+", " ", s)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    return None
+
+# ---------------------------------------------------------------- pdf -> lines
+
+def iter_pages(path: Path) -> Iterator[Tuple[int, str]]:
+    """(page_no, text) for each page; only one page is extracted at a time."""
+    try:
+        from pypdf import PdfReader
+    except Exception:
+        print("Please install pypdf>=3.0.0", file=sys.stderr)
+        sys.exit(1)
+    with open(path, "rb") as f:
+        reader = PdfReader(f)
+        for i in range(len(reader.pages)):
+            yield i + 1, reader.pages[i].extract_text() or ""
+
+def iter_messages(pages: Iterable[Tuple[int, str]], participants: List[str]) -> Iterator[Message]:
+    """Turn page text into messages; a message is only yielded once the next one starts."""
+    names = {p.lower(): p for p in participants}
+    sender_re = re.compile(r"^(%s)\s*:\s?(.*)$" % "|".join(re.escape(p) for p in participants), re.I)
+    cur: Optional[Message] = None
+    ts: Optional[datetime] = None
+    for page_no, text in pages:
+        for line in text.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            m = BRACKET_RE.match(line)
+            if m:
+                if cur:
+                    yield cur
+                ts = parse_time(m.group(1), m.group(2)) or ts
+                cur = Message(names.get(m.group(3).strip().lower(), m.group(3).strip()), ts, m.group(4), page_no)
+                continue
+            m = STAMP_RE.match(line)
+            if m and parse_time(m.group(1), m.group(2)):
+                ts = parse_time(m.group(1), m.group(2))
+                continue
+            m = sender_re.match(line)
+            if m or line.lower() in names:
+                if cur:
+                    yield cur
+                sender = names[(m.group(1) if m else line).lower()]
+                cur = Message(sender, ts, m.group(2) if m else "", page_no)
+                continue
+            if cur:
+                cur.text = f"{cur.text}\n{line}" if cur.text else line
+    if cur:
+        yield cur
+
+# ---------------------------------------------------------------- windows
+
+def iter_windows(messages: Iterable[Message], gap_hours: float = GAP_HOURS,
+                 max_messages: int = MAX_MESSAGES) -> Iterator[List[Message]]:
+    """Group consecutive messages into conversation windows; a new window starts
+    after a gap of more than gap_hours or once max_messages is reached."""
+    window: List[Message] = []
+    last: Optional[datetime] = None
+    for msg in messages:
+        gap = msg.ts is not None and last is not None and (msg.ts - last).total_seconds() > gap_hours * 3600
+        if window and (gap or len(window) >= max_messages):
+            yield window
+            window = []
+        window.append(msg)
+        last = msg.ts or last
+    if window:
+        yield window
+
+def window_record(window: List[Message], filename: str, phase: Optional[str] = None,
+                  week: Optional[str] = None, extra: Optional[dict] = None) -> dict:
+    """A candidate chip record in the shape transform_imsg_chips_v3.normalize_chip reads."""
+    content = "\n".join(f"{m.sender}: {m.text}" for m in window if m.text)
+    times = [m.ts for m in window if m.ts]
+    start, end = (min(times), max(times)) if times else (None, None)
+    digest = hashlib.sha1(f"{filename}\n{content}".encode("utf-8")).hexdigest()[:10]
+    source_doc = {
+        "week": week or "IMSG",
+        "phase": phase or "IMSG",
+        "filename": filename,
+        "date": start.date().isoformat() if start else "",
+    }
+    if start and end and end.date() != start.date():
+        source_doc["date_range"] = f"{start.date().isoformat()}..{end.date().isoformat()}"
+    metadata = {
+        "participants": sorted({m.sender for m in window}),
+        "message_count": len(window),
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+    }
+    metadata.update(extra or {})
+    return {
+        "chip_id": f"IMSG-WIN-{digest}",
+        "type": "Micro_Tactic_Chip",
+        "source_doc": source_doc,
+        "metadata": metadata,
+        "content": content,
+    }
+
+def write_windows(records: Iterable[dict], out) -> int:
+    n = 0
+    for rec in records:
+        out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        n += 1
+    return n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf", nargs="+", help="iMessage PDF export(s)")
+    ap.add_argument("--output", help="JSONL output path (default: stdout)")
+    ap.add_argument("--participants", nargs="+", default=DEFAULT_PARTICIPANTS, help="sender names as they appear in the export")
+    ap.add_argument("--phase", help="phase label for source_doc (e.g. P3-JUNIOR)")
+    ap.add_argument("--week", help="week label for source_doc (default: IMSG)")
+    ap.add_argument("--gap-hours", type=float, default=GAP_HOURS, help="silence that starts a new window")
+    ap.add_argument("--max-messages", type=int, default=MAX_MESSAGES, help="cap on messages per window")
+    args = ap.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    total = 0
+    try:
+        for pdf in args.pdf:
+            path = Path(pdf)
+
+            def records():
+                for window in iter_windows(iter_messages(iter_pages(path), args.participants),
+                                           args.gap_hours, args.max_messages):
+                    yield window_record(window, path.name, args.phase, args.week,
+                                        {"pages": [window[0].page, window[-1].page]})
+
+            n = write_windows(records(), out)
+            total += n
+            print(f"{path.name}: {n} windows", file=sys.stderr)
+    finally:
+        if args.output:
+            out.close()
+    print(f"Wrote {total} conversation windows" + (f" → {args.output}" if args.output else ""), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,10 @@ Usage:
   python transform_imsg_chips_v3.py --input iMessage_Intel_Chips_Batch_v1.jsonl iMessage_Intel_Chips_Batch_v2.jsonl --output iMessage_Intel_Chips_Batch_v3.jsonl
 """
 import argparse, json, re, sys, hashlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from kbchips import sniff_format
 
 NEW_TYPES = {
     "Micro_Tactic_Chip",
@@ -137,39 +141,45 @@ def normalize_chip(obj: dict, idx: int) -> dict:
     return out
 
 def load_any(path):
-    chips = []
-    with open(path, "r", encoding="utf-8") as f:
-        raw = f.read().strip()
-        # try JSON array first
+    # sniff the real format first so every file is parsed exactly once
+    with open(path, "rb") as f:
+        raw = f.read()
+    if sniff_format(raw, str(path)) in ("json", "json-array"):
         try:
             arr = json.loads(raw)
-            if isinstance(arr, list):
-                for i, x in enumerate(arr):
-                    if isinstance(x, str):
-                        try:
-                            x = json.loads(x)
-                        except Exception:
-                            x = {"content": x}
-                    chips.append(x)
-                return chips
         except Exception:
-            pass
-        # fall back JSONL
-        for line in raw.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                chips.append(json.loads(line))
-            except Exception:
-                # minimal salvage
-                chips.append({"content": line})
+            arr = None
+        if isinstance(arr, dict):
+            arr = [arr]
+        if isinstance(arr, list):
+            chips = []
+            for x in arr:
+                if isinstance(x, str):
+                    try:
+                        x = json.loads(x)
+                    except Exception:
+                        x = {"content": x}
+                chips.append(x)
+            return chips
+    # JSONL
+    chips = []
+    for line in raw.decode("utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            chips.append(json.loads(line))
+        except Exception:
+            # minimal salvage
+            chips.append({"content": line})
     return chips
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--input", nargs="+", required=True, help="iMessage chip files (JSON or JSONL)")
     ap.add_argument("--output", required=True, help="Output JSONL path")
+    ap.add_argument("--db", help="Optional chip_db.py SQLite path to upsert the transformed chips into")
+    ap.add_argument("--sidecar", action="store_true", help="Also write the output's chip_id offset sidecar (chip_sidecar.py)")
     args = ap.parse_args()
 
     acc = []
@@ -185,5 +195,17 @@ def main():
             w.write(json.dumps(obj, ensure_ascii=False) + "\n")
     print(f"Wrote {len(acc)} chips → {args.output}")
 
+    if args.sidecar:
+        from chip_sidecar import build_sidecar
+        print(f"Indexed {len(acc)} chips → {build_sidecar(args.output)}")
+
+    if args.db:
+        from chip_db import connect, upsert_chips
+        out = Path(args.output).resolve()
+        kb_root = Path(__file__).resolve().parent.parent
+        rel = out.relative_to(kb_root).as_posix() if kb_root in out.parents else str(out)
+        n = upsert_chips(connect(Path(args.db)), acc, "imsg", rel)
+        print(f"Upserted {n} chips → {args.db}")
+
 if __name__ == "__main__":
     main()
@@ -3,6 +3,9 @@ import argparse, json, glob, os, re, sys
 from pathlib import Path
 from typing import Dict, Any, List, Tuple
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from kbchips import load_chips
+
 ALLOWED_TYPES = {
     "Insight_Chip","Strategy_Chip","Tactic_Chip","Trust_Chip","Adaptation_Chip",
     "Framework_Chip","Result_Chip","Channel_Chip","Relatability_Chip","Silver_Bullet_Chip",
@@ -16,16 +19,11 @@ REQUIRED_METADATA = {"participants","duration"}
 
 def read_jsonl(path: Path):
     records = []
-    with path.open("r", encoding="utf-8") as f:
-        for i, line in enumerate(f, 1):
-            line = line.strip()
-            if not line: 
-                continue
-            try:
-                obj = json.loads(line)
-                records.append(obj)
-            except Exception as e:
-                records.append({"_error": f"JSON parse error on line {i}: {e}", "_raw": line})
+    for chip in load_chips(path, fmt="jsonl"):
+        if chip.error:
+            records.append({"_error": chip.error, "_raw": chip.raw.decode("utf-8", "replace")})
+        else:
+            records.append(chip.to_dict())
     return records
 
 def validate_chip(chip: Dict[str, Any]):
@@ -75,6 +73,8 @@ def main():
     ap.add_argument("--sessions_glob", default="sessions/*.jsonl")
     ap.add_argument("--imessage_glob", default="iMessage/*.jsonl")
     ap.add_argument("--out", default="report_kbv6.json")
+    ap.add_argument("--db", help="Optional chip_db.py SQLite path to record per-chip validation results in")
+    ap.add_argument("--sidecar", action="store_true", help="Refresh the chip_id offset sidecar (chip_sidecar.py) of every scanned file")
     args = ap.parse_args()
     root = Path(args.root)
 
@@ -107,6 +107,18 @@ def main():
     out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
     print(f"KBv6 Validator Report -> {out_path}")
     print(json.dumps(stats, indent=2))
+    if args.db:
+        from chip_db import connect, record_validation
+        n = record_validation(connect(Path(args.db)), [(d["chip_id"], d["errors"]) for d in details])
+        print(f"Recorded validation for {n} chips -> {args.db}")
+    if args.sidecar:
+        from chip_sidecar import Sidecar
+        files = sorted({file_path for items in batches.values() for file_path, _ in items})
+        for file_path in files:
+            sc = Sidecar.open(file_path)
+            if sc is not None:
+                sc.close()
+        print(f"Refreshed sidecars for {len(files)} files")
     invalid = [d for d in details if d["errors"]]
     if invalid:
         print("\nFirst 10 issues:")
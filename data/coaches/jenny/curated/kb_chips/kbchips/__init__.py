@@ -0,0 +1,16 @@
+"""
+kbchips — shared chip model and loaders for the kb_chips tooling.
+
+    from kbchips import load_chips, load_corpus
+    for chip in load_chips("session/w045_chips.json", family="session"):
+        print(chip.chip_id, chip.type, chip.week)
+
+Scripts in the family directories add kb_chips/ to sys.path to import it.
+"""
+from .model import CHIP_TYPES, FAMILIES, PHASE_ENUMS, PHASES, Chip, SourceDoc, intern
+from .loader import clear_cache, iter_dicts, load_chips, load_corpus, read_records, sniff_format
+
+__all__ = [
+    "Chip", "SourceDoc", "CHIP_TYPES", "PHASES", "PHASE_ENUMS", "FAMILIES", "intern",
+    "load_chips", "load_corpus", "iter_dicts", "read_records", "sniff_format", "clear_cache",
+]
@@ -0,0 +1,79 @@
+"""Chip file loading: format sniffing, raw record splitting and an mtime-validated cache."""
+import json, os
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .model import Chip
+
+TEXT_FORMATS = {".md": "markdown", ".txt": "text", ".py": "python", ".sh": "shell", ".ts": "typescript"}
+
+def sniff_format(raw: bytes, name: str) -> str:
+    """Detect the real container format from the bytes, not the extension."""
+    if raw.startswith(b"PK\x03\x04"):
+        return "docx" if name.lower().endswith(".docx") else "zip"
+    if raw.startswith(b"%PDF"):
+        return "pdf"
+    s = raw.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if s[:1] == b"[":
+        return "json-array"
+    if s[:1] == b"{":
+        first, _, rest = s.partition(b"\n")
+        first = first.strip()
+        if not rest.strip():
+            return "json"
+        # a pretty-printed object opens with a bare "{"; one object per line is JSONL
+        return "jsonl" if first.endswith(b"}") and len(first) > 2 else "json"
+    return TEXT_FORMATS.get(Path(name).suffix.lower(), "other")
+
+def read_records(raw: bytes, fmt: str) -> Iterator[Tuple[int, bytes]]:
+    """Split a chip file into (line_no, record_bytes) without parsing JSONL records."""
+    if fmt == "jsonl":
+        for ln, line in enumerate(raw.splitlines(), 1):
+            line = line.strip()
+            if line:
+                yield ln, line
+    elif fmt in ("json", "json-array"):
+        try:
+            obj = json.loads(raw)
+        except ValueError:
+            yield 1, raw.strip()
+            return
+        for item in (obj if isinstance(obj, list) else [obj]):
+            yield 1, json.dumps(item, ensure_ascii=False).encode("utf-8")
+
+# path -> (mtime_ns, size, family, chips)
+_CACHE: Dict[str, Tuple[int, int, Optional[str], List[Chip]]] = {}
+
+def load_chips(path, family: Optional[str] = None, fmt: Optional[str] = None) -> List[Chip]:
+    """Load one chip file. Repeat calls are served from an in-process cache
+    until the file's (mtime_ns, size) changes."""
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    hit = _CACHE.get(key)
+    if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size and hit[2] == family:
+        return list(hit[3])
+    with open(key, "rb") as f:
+        raw = f.read()
+    fmt = fmt or sniff_format(raw, key)
+    chips = [Chip(rec, family, str(path), ln) for ln, rec in read_records(raw, fmt)]
+    _CACHE[key] = (st.st_mtime_ns, st.st_size, family, chips)
+    return list(chips)
+
+def iter_dicts(path) -> Iterator[dict]:
+    """Plain-dict view for callers that mutate records; unparseable records are skipped."""
+    for chip in load_chips(path):
+        if chip.error is None:
+            yield chip.to_dict()
+
+def load_corpus(families=None, root=None) -> List[Chip]:
+    """Every canonical chip listed in the kb_chips catalog (see chip_catalog.py)."""
+    from chip_catalog import KB_ROOT, canonical_files, load_catalog
+    catalog = load_catalog(Path(root) if root else KB_ROOT)
+    base = Path(catalog["root"])
+    chips: List[Chip] = []
+    for e in canonical_files(catalog, families):
+        chips += load_chips(base / e["path"], e["family"], e["format"])
+    return chips
+
+def clear_cache():
+    _CACHE.clear()
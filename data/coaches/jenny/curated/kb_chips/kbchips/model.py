@@ -0,0 +1,157 @@
+"""Compact chip model: __slots__ classes, interned enum values, lazy nested parsing."""
+import json, re, sys
+from typing import Any, Dict, Optional
+
+# Known enum values; anything else found in the data is still interned, just not "known".
+CHIP_TYPES = frozenset({
+    "Insight_Chip", "Strategy_Chip", "Tactic_Chip", "Trust_Chip", "Adaptation_Chip",
+    "Framework_Chip", "Result_Chip", "Channel_Chip", "Relatability_Chip", "Silver_Bullet_Chip",
+    "Tone_Style_Chip", "Microtactic_Chip", "Boundary_Chip", "Crisis_Intervention_Chip",
+    "Decision_Framework_Chip", "Accountability_Chip", "Diagnostic_Chip",
+    "Micro_Tactic_Chip", "Tone_Cue_Chip", "Escalation_Pattern_Chip", "Message_Template_Chip",
+    "Turnaround_Case_Chip",
+})
+PHASES = frozenset({"P1-FOUNDATION", "P2-BUILDING", "P3-JUNIOR", "P4-SUMMER", "P5-SENIOR", "EXEC", "IMSG"})
+PHASE_ENUMS = frozenset({"FOUNDATION", "BUILDING", "JUNIOR", "SUMMER", "SENIOR"})
+FAMILIES = frozenset({"session", "imsg", "exec", "assess", "gameplan", "misc"})
+
+for _v in CHIP_TYPES | PHASES | PHASE_ENUMS | FAMILIES:
+    sys.intern(_v)
+
+def intern(value: Optional[str]) -> Optional[str]:
+    """Share one str instance per enum value across every loaded chip."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+# chip_id is the first key and type the second in every batch the transform emits,
+# so both can be read without parsing the record.
+_HEAD_RE = re.compile(rb'^\s*\{\s*"chip_id"\s*:\s*"([^"\\]*)"\s*,\s*"type"\s*:\s*"([^"\\]*)"')
+
+class SourceDoc:
+    __slots__ = ("week", "phase", "filename", "date", "extra")
+
+    def __init__(self, week=None, phase=None, filename=None, date=None, extra=None):
+        self.week = week
+        self.phase = phase
+        self.filename = filename
+        self.date = date
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, d: Optional[dict]) -> "SourceDoc":
+        if not isinstance(d, dict):
+            return cls()
+        extra = {k: v for k, v in d.items() if k not in ("week", "phase", "filename", "date")}
+        week = d.get("week")
+        return cls(intern(str(week)) if week is not None else None, intern(d.get("phase")),
+                   d.get("filename"), d.get("date"), extra or None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = {k: getattr(self, k) for k in ("week", "filename", "date", "phase") if getattr(self, k) is not None}
+        if self.extra:
+            d.update(self.extra)
+        return d
+
+    def __repr__(self):
+        return f"SourceDoc(week={self.week!r}, phase={self.phase!r}, filename={self.filename!r})"
+
+class Chip:
+    """One chip record backed by its raw JSON bytes.
+
+    `chip_id`, `type` and `family` are available immediately; everything else
+    (content, source_doc, metadata, ...) is parsed from `raw` on first access.
+    """
+    __slots__ = ("chip_id", "type", "family", "path", "line", "raw", "_data", "_source_doc", "_error")
+
+    def __init__(self, raw: bytes, family: Optional[str] = None, path: Optional[str] = None, line: int = 0):
+        self.raw = raw
+        self.family = intern(family)
+        self.path = path
+        self.line = line
+        self._data = None
+        self._source_doc = None
+        self._error = None
+        m = _HEAD_RE.match(raw)
+        if m:
+            self.chip_id = m.group(1).decode("utf-8")
+            self.type = intern(m.group(2).decode("utf-8"))
+        else:
+            data = self._parse()
+            self.chip_id = data.get("chip_id")
+            self.type = intern(data.get("type"))
+
+    @classmethod
+    def from_dict(cls, obj: dict, family: Optional[str] = None, path: Optional[str] = None, line: int = 0) -> "Chip":
+        return cls(json.dumps(obj, ensure_ascii=False).encode("utf-8"), family, path, line)
+
+    def _parse(self) -> dict:
+        if self._data is None:
+            try:
+                data = json.loads(self.raw)
+            except ValueError as e:
+                self._error = f"JSON parse error on line {self.line}: {e}"
+                data = {}
+            if not isinstance(data, dict):
+                self._error = f"line {self.line}: record is not a JSON object"
+                data = {}
+            self._data = data
+        return self._data
+
+    # ---- lazily parsed fields
+
+    @property
+    def error(self) -> Optional[str]:
+        self._parse()
+        return self._error
+
+    @property
+    def content(self) -> str:
+        v = self._parse().get("content")
+        return v if isinstance(v, str) else ""
+
+    @property
+    def insight_vector(self) -> str:
+        v = self._parse().get("insight_vector")
+        return v if isinstance(v, str) else ""
+
+    @property
+    def metadata(self) -> dict:
+        v = self._parse().get("metadata")
+        return v if isinstance(v, dict) else {}
+
+    @property
+    def source_doc(self) -> SourceDoc:
+        if self._source_doc is None:
+            self._source_doc = SourceDoc.from_dict(self._parse().get("source_doc"))
+        return self._source_doc
+
+    @property
+    def week(self) -> Optional[str]:
+        return self.source_doc.week
+
+    @property
+    def phase(self) -> Optional[str]:
+        return self.source_doc.phase
+
+    def get(self, key: str, default=None):
+        return self._parse().get(key, default)
+
+    def __getitem__(self, key: str):
+        return self._parse()[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._parse()
+
+    def to_dict(self) -> dict:
+        """The parsed record, handed over to callers that mutate it: the chip drops its
+        reference (and re-reads `raw` if accessed again), so no second json.loads."""
+        d = self._parse()
+        self._data = None
+        return d
+
+    def release(self):
+        """Drop the parsed form; it is re-read from `raw` on next access."""
+        self._data = None
+        self._source_doc = None
+
+    def __repr__(self):
+        return f"Chip({self.chip_id!r}, {self.type!r}, family={self.family!r})"
@@ -2,18 +2,21 @@
 import json, os, sys
 from jsonschema import validate, ValidationError
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from kbchips import load_chips
+
 def load_schema(filename):
     with open(filename) as f:
         return json.load(f)
 
-def validate_file(schema, filepath):
-    with open(filepath) as f:
-        data = json.load(f)
+def validate_chip(schema, where, chip):
+    if chip.error:
+        return (where, f"ERROR: {chip.error}")
     try:
-        validate(instance=data, schema=schema)
-        return (filepath, "PASS")
+        validate(instance=chip.to_dict(), schema=schema)
+        return (where, "PASS")
     except ValidationError as e:
-        return (filepath, f"FAIL: {e.message}")
+        return (where, f"FAIL: {e.message}")
 
 if __name__ == "__main__":
     base_dir = sys.argv[1] if len(sys.argv) > 1 else "."
@@ -21,15 +24,13 @@ if __name__ == "__main__":
     results = []
     for root, _, files in os.walk(base_dir):
         for file in files:
-            if file.endswith(".jsonl") or file.endswith(".json"):
+            if (file.endswith(".jsonl") or file.endswith(".json")) and not file.endswith(".schema.json"):
+                path = os.path.join(root, file)
                 try:
-                    with open(os.path.join(root, file)) as f:
-                        for line in f:
-                            if line.strip():
-                                chip = json.loads(line)
-                                results.append(validate_file(schema, os.path.join(root, file)))
+                    for chip in load_chips(path):
+                        results.append(validate_chip(schema, f"{path}:{chip.line}", chip))
                 except Exception as e:
-                    results.append((file, f"ERROR: {e}"))
+                    results.append((path, f"ERROR: {e}"))
     with open("validation_report.json", "w") as out:
         json.dump(results, out, indent=2)
     print("Validation complete. Report saved to validation_report.json")
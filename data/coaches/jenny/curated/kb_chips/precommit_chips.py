@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+precommit_chips.py
+
+Fast changed-files-only chip validation for the git pre-commit hook.
+
+- Asks git for the staged files under the kb_chips tree and keeps the chip batches, judged
+  from their content the way chip_catalog.py classifies files (role chips/patch), not
+  from their names (misc/w045_ch.json is a batch)
+- Validates only the staged records (parse errors, intel_chip.schema.json required keys)
+- Checks only their chip_ids against a persisted chip_id index over the catalog's
+  canonical batches (.chip_id_index.json, refreshed by stat, never a full re-parse).
+  Alias copies (duplicate_of) and superseded batches are not owners, and staging one
+  only validates it: their ids are expected to repeat the canonical batch's
+- Exits non-zero if any staged chip fails, so the commit is blocked
+
+Usage:
+  python precommit_chips.py                 # pre-commit mode (staged files only)
+  python precommit_chips.py --rebuild-index # re-parse every chip file into the index
+"""
+import argparse, json, os, subprocess, sys, time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from chip_catalog import canonical_files, classify, load_catalog
+from kbchips import Chip, read_records, sniff_format
+
+KB_ROOT = Path(__file__).resolve().parent
+INDEX_FILE = ".chip_id_index.json"
+INDEX_VERSION = 2
+CHIP_ROLES = ("chips", "patch")
+# mirrors misc/intel_chip.schema.json
+REQUIRED = {"chip_id": str, "type": str, "source_doc": dict, "metadata": dict, "content": str}
+
+def parse_chips(raw: bytes, name: str) -> List[Chip]:
+    return [Chip(rec, line=ln) for ln, rec in read_records(raw, sniff_format(raw, name))]
+
+def validate_chip(chip: Chip) -> List[str]:
+    if chip.error:
+        return [chip.error]
+    errs = []
+    for key, typ in REQUIRED.items():
+        if key not in chip:
+            errs.append(f"missing '{key}'")
+        elif not isinstance(chip[key], typ):
+            errs.append(f"'{key}' must be {typ.__name__}")
+    if isinstance(chip.chip_id, str) and not chip.chip_id.strip():
+        errs.append("chip_id is empty")
+    if isinstance(chip.get("content"), str) and not chip.content.strip():
+        errs.append("content is empty")
+    return errs
+
+def check_batch(rel: str, raw: bytes) -> Tuple[Optional[dict], List[Tuple[Chip, List[str]]], List[dict]]:
+    """Parse and validate one file once: (catalog classification, or None when it is not a
+    chip batch; [(chip, errors)]; the parsed records of the valid ones)."""
+    chips = parse_chips(raw, rel)
+    checked = [(chip, validate_chip(chip)) for chip in chips]
+    # validate_chip parsed every record; to_dict hands those dicts over, no second parse
+    records = [chip.to_dict() for chip in chips if not chip.error]
+    info = classify(rel, sniff_format(raw, rel), records)
+    return (info if info["role"] in CHIP_ROLES else None), checked, records
+
+def chip_ids(raw: bytes, name: str) -> List[str]:
+    # chip_id comes off the record head; no record is fully parsed here
+    return [c.chip_id for c in parse_chips(raw, name) if isinstance(c.chip_id, str)]
+
+# ---------------------------------------------------------------- id index
+
+def load_index(root: Path) -> Dict[str, dict]:
+    try:
+        data = json.loads((root / INDEX_FILE).read_text(encoding="utf-8"))
+        if data.get("version") == INDEX_VERSION:
+            return data["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_index(root: Path, files: Dict[str, dict]):
+    tmp = root / (INDEX_FILE + ".tmp")
+    tmp.write_text(json.dumps({"version": INDEX_VERSION, "files": files}, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, root / INDEX_FILE)
+
+def refresh_index(root: Path, rebuild: bool = False) -> Tuple[Dict[str, dict], int]:
+    """Bring the index in line with the catalog's canonical batches; only files whose
+    (mtime_ns, size) changed are re-parsed. Returns (files, n_reparsed)."""
+    old = {} if rebuild else load_index(root)
+    files, reparsed = {}, 0
+    for e in canonical_files(load_catalog(root)):
+        rel = e["path"]
+        prev = old.get(rel)
+        if prev and prev["mtime_ns"] == e["mtime_ns"] and prev["size"] == e["size"]:
+            files[rel] = prev
+            continue
+        with open(root / rel, "rb") as f:
+            ids = chip_ids(f.read(), rel)
+        files[rel] = {"mtime_ns": e["mtime_ns"], "size": e["size"], "chip_ids": ids}
+        reparsed += 1
+    if reparsed or files.keys() != old.keys():
+        save_index(root, files)
+    return files, reparsed
+
+# ---------------------------------------------------------------- git
+
+def git(*args, input_bytes=None) -> bytes:
+    return subprocess.run(["git", *args], input=input_bytes, stdout=subprocess.PIPE, check=True).stdout
+
+def staged_files(root: Path) -> Tuple[Path, List[str]]:
+    """Return (repo_top, staged paths relative to repo_top) limited to files under root;
+    which of them are chip batches is decided from their content."""
+    top = Path(git("rev-parse", "--show-toplevel").decode().strip())
+    out = git("diff", "--cached", "--name-only", "--diff-filter=ACMR", "-z")
+    prefix = root.relative_to(top).as_posix().rstrip("/") + "/"
+    paths = [p for p in out.decode("utf-8").split("\0") if p]
+    return top, [p for p in paths if p.startswith(prefix) and not any(
+        part.startswith(".") for part in p[len(prefix):].split("/"))]
+
+def read_staged_blobs(paths: List[str]) -> Dict[str, bytes]:
+    """Read all staged blobs through one `git cat-file --batch` process."""
+    if not paths:
+        return {}
+    out = git("cat-file", "--batch", input_bytes="".join(f":{p}\n" for p in paths).encode("utf-8"))
+    blobs, pos = {}, 0
+    for p in paths:
+        nl = out.index(b"\n", pos)
+        header = out[pos:nl].split()
+        size = int(header[2])
+        blobs[p] = out[nl + 1:nl + 1 + size]
+        pos = nl + 1 + size + 1
+    return blobs
+
+# ---------------------------------------------------------------- main
+
+def run_precommit(root: Path) -> int:
+    t0 = time.perf_counter()
+    top, staged = staged_files(root)
+    if not staged:
+        return 0
+    blobs = read_staged_blobs(staged)
+    staged_rel = {(top / p).relative_to(root).as_posix(): p for p in staged}
+    batches = {}
+    for rel, p in staged_rel.items():
+        info, checked, _ = check_batch(rel, blobs[p])
+        if info is not None:
+            batches[rel] = checked
+    if not batches:
+        return 0
+
+    files, _ = refresh_index(root)
+    entries = {e["path"]: e for e in load_catalog(root)["files"]}
+    owner = {}
+    for rel, entry in files.items():
+        if rel in staged_rel:
+            continue
+        for cid in entry["chip_ids"]:
+            owner.setdefault(cid, rel)
+
+    problems, checked = [], 0
+    for rel, results in batches.items():
+        p = staged_rel[rel]
+        # an alias copy or superseded batch repeats the canonical batch's ids by design
+        canonical = entries.get(rel, {}).get("canonical", True)
+        for chip, errs in results:
+            ln = chip.line
+            checked += 1
+            cid = chip.chip_id
+            if canonical and isinstance(cid, str) and cid:
+                if cid in owner:
+                    errs.append(f"duplicate chip_id (also in {owner[cid]})")
+                else:
+                    owner[cid] = f"{rel}:{ln}"
+            for e in errs:
+                problems.append(f"{p}:{ln}: {cid or '?'}: {e}")
+
+    dt = (time.perf_counter() - t0) * 1000
+    print(f"chip pre-commit: {len(batches)} file(s), {checked} chip(s), {len(problems)} problem(s) [{dt:.0f} ms]")
+    for msg in problems[:50]:
+        print("  -", msg)
+    if len(problems) > 50:
+        print(f"  ... {len(problems) - 50} more")
+    return 1 if problems else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=str(KB_ROOT), help="kb_chips tree holding the chip corpus")
+    ap.add_argument("--rebuild-index", action="store_true", help="re-parse every chip file into the id index")
+    args = ap.parse_args()
+    root = Path(args.root).resolve()
+
+    if args.rebuild_index:
+        files, n = refresh_index(root, rebuild=True)
+        total = sum(len(e["chip_ids"]) for e in files.values())
+        print(f"Indexed {total} chip_ids from {n} files -> {root / INDEX_FILE}")
+        return 0
+    return run_precommit(root)
+
+if __name__ == "__main__":
+    sys.exit(main())
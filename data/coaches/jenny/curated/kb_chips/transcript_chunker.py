@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+transcript_chunker.py
+
+Chunks raw session transcripts into overlapping, speaker-aware windows for chip
+writing (RAW -> CLEAN stage of the data spec).
+
+Inputs, sniffed from content rather than extension:
+- WEBVTT cues (Zoom exports, whatever the extension: .vtt, .txt, none)
+- speaker-labelled TXT ("JENNY: ..." lines, header lines such as "Date: 2024-01-15") and Zoom chat logs
+- DOCX holding either of the above (paragraphs streamed via docx_extract.iter_paragraphs)
+- normalize-v1 raw JSON wrappers (coaches/jenny/raw/*: "segments" or flattened VTT "text")
+
+- Consecutive cues from one speaker merge into a turn; turns never straddle windows
+  unless a single turn is longer than a window, in which case it is split
+- Windows hold ~--words words and overlap the previous one by ~--overlap words
+- week / phase / date / student come from the filename convention
+  (2023-10-15_W016_P2-BUILDING_TRANS-RAW_..., Coaching_Jenny_Huda_Wk10_2023-10-05_...),
+  falling back to the transcript's own title / header lines
+- VTT/TXT are read line by line and only the current window is held, so memory
+  stays constant per transcript; transcripts run across a process pool
+- One JSONL file per transcript under kb_chips/.chunks/ (git-ignored), named
+  <stem>.<hash of the source path>.jsonl so same-named transcripts never collide
+
+Usage:
+  python transcript_chunker.py ../../raw/other_students ../../../../archive/legacy_v3/coach_legacy/raw
+  python transcript_chunker.py session.vtt --words 250 --overlap 50 -j 4
+"""
+import argparse, hashlib, json, os, re, sys, time, zipfile
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import chain, islice
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from docx_extract import iter_paragraphs
+
+KB_ROOT = Path(__file__).resolve().parent
+OUT_DIR = KB_ROOT / ".chunks"
+WINDOW_WORDS = 300
+OVERLAP_WORDS = 60
+
+CUE_TIME_RE = re.compile(r"^(\d{1,2}:\d{2}:\d{2}[.,]\d{3}|\d{2}:\d{2}[.,]\d{3})\s+-->\s+(\d{1,2}:\d{2}:\d{2}[.,]\d{3}|\d{2}:\d{2}[.,]\d{3})")
+FLAT_CUE_RE = re.compile(r"(?:^|\s)\d+\s+(\d{2}:\d{2}:\d{2}\.\d{3})\s+-->\s+(\d{2}:\d{2}:\d{2}\.\d{3})\s+(.*?)(?=\s\d+\s\d{2}:\d{2}:\d{2}\.\d{3}\s+-->|$)", re.S)
+CHAT_RE = re.compile(r"^(\d{1,2}:\d{2}:\d{2})\t+([^\t:]{1,60}):\t*\s*(.*)$")  # Zoom "(Chat)" export
+SPEAKER_RE = re.compile(r"^([A-Za-z][\w .'\-]{0,39}?)\s*:\s+(.*)$")
+HEADER_KEYS = {"date", "coach", "student", "week", "phase", "session", "duration", "participants"}
+
+DATE_RE = re.compile(r"(20\d{2}-\d{2}-\d{2})")
+WEEK_RE = re.compile(r"(?:^|[_\-\s])W(\d{3})(?:[_\-.]|$)|[_\-\s]Wk(\d{1,3})[A-Z]?(?:[_\-.]|$)|\bWeek\s+(\d{1,3})\b", re.I)
+PHASE_RE = re.compile(r"(P[1-5](?:P[1-5])?-[A-Z]+(?:-[A-Z]+)?)")
+STUDENT_RE = re.compile(r"(?:Coaching_Jenny|JennyDuan|Coaching_GamePlan|Coaching)_([A-Z][a-z]+)_", re.I)
+
+# ---------------------------------------------------------------- provenance
+
+def provenance(name: str) -> Dict[str, str]:
+    """week / phase / date / student from the filename convention; absent keys are omitted."""
+    out = {"filename": name}
+    m = DATE_RE.search(name)
+    if m:
+        out["date"] = m.group(1)
+    m = WEEK_RE.search(name)
+    if m:
+        out["week"] = f"{int(next(g for g in m.groups() if g)):03d}"
+    m = PHASE_RE.search(name)
+    if m:
+        out["phase"] = m.group(1)
+    m = STUDENT_RE.search(name)
+    if m and m.group(1).lower() not in ("jenny", "prep"):
+        out["student"] = m.group(1)
+    return out
+
+# ---------------------------------------------------------------- cue parsers
+# every parser yields (speaker, start, end, text); start/end may be None
+
+Cue = Tuple[Optional[str], Optional[str], Optional[str], str]
+
+def split_speaker(text: str) -> Tuple[Optional[str], str]:
+    m = SPEAKER_RE.match(text)
+    if m and m.group(1).lower() not in HEADER_KEYS:
+        return m.group(1).strip(), m.group(2)
+    return None, text
+
+def iter_vtt_cues(lines: Iterable[str], header: Dict[str, str]) -> Iterator[Cue]:
+    """WEBVTT cues. A cue ends at a blank line or the next timing line, so paragraph
+    streams without blank lines (VTT pasted into DOCX) parse too; lines before
+    "WEBVTT" (e.g. "Week 3 - Coaching_Jenny_Huda_Wk03_2023-08-02_...") go to header["title"]."""
+    start = end = None
+    buf: List[str] = []
+    seen_header = False
+    for line in lines:
+        line = line.strip()
+        m = CUE_TIME_RE.match(line)
+        if m:
+            if buf and start:
+                speaker, text = split_speaker(" ".join(buf))
+                yield speaker, start, end, text
+            start, end = m.group(1), m.group(2)
+            buf = []
+            seen_header = True
+            continue
+        if line == "WEBVTT":
+            seen_header = True
+            continue
+        if not seen_header:
+            if line:
+                header.setdefault("title", line)
+            continue
+        if not line or (line.isdigit() and not buf):
+            if not line and buf and start:
+                speaker, text = split_speaker(" ".join(buf))
+                yield speaker, start, end, text
+                buf, start = [], None
+            continue
+        if start:
+            buf.append(line)
+    if buf and start:
+        speaker, text = split_speaker(" ".join(buf))
+        yield speaker, start, end, text
+
+def iter_txt_cues(lines: Iterable[str], header: Dict[str, str]) -> Iterator[Cue]:
+    """Speaker-labelled plain text or a Zoom chat log ("00:26:44<TAB>Name:<TAB>text").
+    Header lines (Date:, Coach:, ...) and a title line naming the week fill `header`
+    instead of becoming cues."""
+    speaker, buf = None, []
+    for line in lines:
+        m = CHAT_RE.match(line.strip())
+        if m:
+            if buf:
+                yield speaker, None, None, " ".join(buf)
+            speaker, buf = m.group(2).strip(), []
+            yield speaker, m.group(1), m.group(1), m.group(3)
+            continue
+        line = line.strip()
+        if not line or set(line) <= {"-", "=", "*"}:
+            continue
+        m = SPEAKER_RE.match(line)
+        if m and m.group(1).lower() in HEADER_KEYS and speaker is None:
+            key, value = m.group(1).lower(), m.group(2).strip()
+            if key == "week":
+                digits = re.sub(r"\D", "", value)
+                value = f"{int(digits):03d}" if digits else value
+            header.setdefault(key, value)
+            continue
+        if m:
+            if buf:
+                yield speaker, None, None, " ".join(buf)
+            speaker, buf = m.group(1).strip(), [m.group(2)]
+            continue
+        if speaker is None:
+            header.setdefault("title", line)
+            w = WEEK_RE.search(line)
+            if w:
+                header.setdefault("week", f"{int(next(g for g in w.groups() if g)):03d}")
+            continue
+        buf.append(line)
+    if buf:
+        yield speaker, None, None, " ".join(buf)
+
+def fmt_seconds(s) -> Optional[str]:
+    if s is None:
+        return None
+    s = float(s)
+    return f"{int(s // 3600):02d}:{int(s % 3600 // 60):02d}:{s % 60:06.3f}"
+
+def iter_json_cues(obj: dict) -> Iterator[Cue]:
+    """normalize-v1 raw wrappers: structured segments when present, else flattened VTT text."""
+    segs = obj.get("segments") or []
+    if segs and all(isinstance(s, dict) for s in segs):
+        for s in segs:
+            speaker, text = split_speaker(s.get("text") or "")
+            yield speaker or s.get("speaker"), fmt_seconds(s.get("start")), fmt_seconds(s.get("end")), text
+        return
+    text = obj.get("text") or " ".join(s for s in segs if isinstance(s, str))
+    for m in FLAT_CUE_RE.finditer(text):
+        speaker, body = split_speaker(m.group(3).strip())
+        yield speaker, m.group(1), m.group(2), body
+
+# ---------------------------------------------------------------- windows
+
+def iter_turns(cues: Iterable[Cue], max_words: int) -> Iterator[Tuple[Optional[str], Optional[str], Optional[str], List[str]]]:
+    """Merge consecutive same-speaker cues; a turn is cut once it reaches max_words."""
+    cur = None
+    for speaker, start, end, text in cues:
+        words = text.split()
+        if not words:
+            continue
+        if cur and cur[0] == speaker and len(cur[3]) + len(words) <= max_words:
+            cur[2] = end or cur[2]
+            cur[3].extend(words)
+            continue
+        if cur:
+            yield tuple(cur)
+        while len(words) > max_words:
+            yield speaker, start, end, words[:max_words]
+            words = words[max_words:]
+        cur = [speaker, start, end, words]
+    if cur:
+        yield tuple(cur)
+
+def iter_windows(turns, window_words: int = WINDOW_WORDS, overlap_words: int = OVERLAP_WORDS) -> Iterator[list]:
+    """Sliding windows over whole turns. After a window is emitted, turns are dropped
+    from the front until at most overlap_words remain, which open the next window."""
+    win: Deque = deque()
+    n = 0
+    fresh = False  # window holds turns not yet emitted
+    for turn in turns:
+        win.append(turn)
+        n += len(turn[3])
+        fresh = True
+        if n >= window_words:
+            yield list(win)
+            fresh = False
+            while win and n > overlap_words:
+                n -= len(win.popleft()[3])
+    if fresh and win:
+        yield list(win)
+
+def chunk_record(window: list, prov: Dict[str, str], slug: str, idx: int) -> dict:
+    text = "\n".join(f"{spk or 'Unknown'}: {' '.join(words)}" for spk, _, _, words in window)
+    starts = [t[1] for t in window if t[1]]
+    ends = [t[2] for t in window if t[2]]
+    return {
+        "chunk_id": f"{slug}-c{idx:04d}",
+        "source_doc": prov,
+        "start": starts[0] if starts else None,
+        "end": ends[-1] if ends else None,
+        "speakers": sorted({t[0] for t in window if t[0]}),
+        "turns": len(window),
+        "words": sum(len(t[3]) for t in window),
+        "text": text,
+    }
+
+# ---------------------------------------------------------------- files
+
+def sniff(path: Path) -> str:
+    with open(path, "rb") as f:
+        head = f.read(512).lstrip(b"\xef\xbb\xbf \t\r\n")
+    if head.startswith(b"PK\x03\x04"):
+        return "docx"
+    if head.startswith(b"%PDF") or b"\0" in head:
+        return "binary"
+    if head.startswith(b"{"):
+        return "json"
+    first = head.split(b"\n", 3)
+    if any(l.strip() == b"WEBVTT" for l in first):
+        return "vtt"
+    return "txt"
+
+def looks_like_vtt(lines: List[str]) -> bool:
+    return any(l.strip() == "WEBVTT" or CUE_TIME_RE.match(l.strip()) for l in lines)
+
+def output_name(p: Path, name: str) -> str:
+    """<stem>.<sha1(resolved source path)[:8]>.jsonl: same-named transcripts from different
+    directories (raw/huda/misc_1, raw/misc_1) must not share one output file."""
+    tag = hashlib.sha1(str(p.resolve()).encode("utf-8")).hexdigest()[:8]
+    stem = re.sub(r"[^\w.\-]+", "_", Path(name).stem)
+    return f"{stem}.{tag}.jsonl"
+
+def chunk_file(src: str, out_dir: str, window_words: int = WINDOW_WORDS, overlap_words: int = OVERLAP_WORDS) -> Dict:
+    """Worker: chunk one transcript into <out_dir>/<name>.<path hash>.jsonl. Returns a summary."""
+    p = Path(src)
+    kind = sniff(p)
+    summary = {"source": src, "format": kind, "chunks": 0, "output": None}
+    if kind == "binary":
+        summary["error"] = "binary file (PDF); extract text first"
+        return summary
+
+    header: Dict[str, str] = {}
+    name = p.name
+    with ExitStack() as stack:
+        if kind == "json":
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    obj = json.load(f)
+            except ValueError as e:
+                summary["error"] = f"bad JSON: {e}"
+                return summary
+            name = obj.get("name") or p.name
+            cues = iter_json_cues(obj)
+        else:
+            if kind == "docx":
+                try:
+                    zf = stack.enter_context(zipfile.ZipFile(p))
+                    lines = iter_paragraphs(stack.enter_context(zf.open("word/document.xml")))
+                except (zipfile.BadZipFile, KeyError) as e:
+                    summary["error"] = f"unreadable DOCX: {e}"
+                    return summary
+                head = list(islice(lines, 10))
+                lines = chain(head, lines)
+                kind = summary["format"] = "docx-vtt" if looks_like_vtt(head) else "docx-txt"
+            else:
+                lines = stack.enter_context(open(p, "r", encoding="utf-8", errors="replace"))
+            cues = iter_vtt_cues(lines, header) if kind.endswith("vtt") else iter_txt_cues(lines, header)
+
+        prov = provenance(name)
+        slug = hashlib.sha1(str(p).encode("utf-8")).hexdigest()[:8]
+        dest = Path(out_dir) / output_name(p, name)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f"{dest.name}.{os.getpid()}.tmp")
+        n = 0
+        with open(tmp, "w", encoding="utf-8") as out:
+            for n, window in enumerate(iter_windows(iter_turns(cues, window_words), window_words, overlap_words), 1):
+                if n == 1:
+                    # header / title lines are only known once the preamble has been read
+                    title = provenance(header.get("title", ""))
+                    for k in ("date", "week", "phase", "student"):
+                        if k not in prov and (k in header or k in title):
+                            prov[k] = header.get(k) or title[k]
+                out.write(json.dumps(chunk_record(window, prov, slug, n), ensure_ascii=False) + "\n")
+        if n:
+            os.replace(tmp, dest)
+        else:
+            tmp.unlink()
+    summary.update(chunks=n, output=str(dest) if n else None, source_doc=prov)
+    return summary
+
+def find_transcripts(sources) -> List[Path]:
+    found: List[Path] = []
+    for s in sources:
+        s = Path(s)
+        if s.is_file():
+            found.append(s)
+            continue
+        for dirpath, dirnames, filenames in os.walk(s):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            found += [Path(dirpath) / fn for fn in filenames
+                      if not fn.startswith(".") and Path(fn).suffix.lower() in ("", ".vtt", ".txt", ".json", ".docx")]
+    return sorted({p.resolve() for p in found})
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("sources", nargs="+", help="transcript files or directories")
+    ap.add_argument("--out", default=str(OUT_DIR), help="directory for per-transcript chunk JSONL")
+    ap.add_argument("--words", type=int, default=WINDOW_WORDS, help="target words per window")
+    ap.add_argument("--overlap", type=int, default=OVERLAP_WORDS, help="words carried into the next window")
+    ap.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: cpu count)")
+    args = ap.parse_args()
+    if args.overlap >= args.words:
+        ap.error("--overlap must be smaller than --words")
+
+    t0 = time.perf_counter()
+    paths = [str(p) for p in find_transcripts(args.sources)]
+    out_dir = str(Path(args.out).resolve())
+    n = len(paths)
+    workers = args.jobs or os.cpu_count() or 1
+    if workers == 1 or n < 2:
+        results = [chunk_file(p, out_dir, args.words, args.overlap) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(chunk_file, paths, [out_dir] * n, [args.words] * n, [args.overlap] * n,
+                                    chunksize=max(1, n // (workers * 4))))
+
+    done = [r for r in results if r["chunks"]]
+    outputs = Counter(r["output"] for r in done)
+    clashes = [o for o, c in outputs.items() if c > 1]
+    if clashes:
+        sys.exit(f"{len(clashes)} output file(s) written by more than one transcript: {', '.join(clashes)}")
+    print(f"Chunked {len(done)}/{n} transcripts into {sum(r['chunks'] for r in done)} windows "
+          f"in {time.perf_counter() - t0:.2f}s -> {out_dir}")
+    for r in results:
+        if not r["chunks"]:
+            print(f"  skip {r['source']}: {r.get('error', 'no speaker turns found')}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+watch_data.py
+
+Watches data/ with Linux inotify and runs only the pipeline stage a changed file
+needs, on only the changed files, so new coaching data reaches the retrieval
+index (.chip_corpus.db, optionally Pinecone) within seconds of landing.
+
+- inotify through ctypes (no dependency): one watch per directory, new directories
+  are added as they appear; dot-directories (generated outputs) are ignored
+- events are debounced (--debounce seconds of quiet, at most --max-delay after the
+  first event) and de-duplicated per path before anything runs
+- each path is classified the way the inventory does it (phase1 type / status /
+  semantic category, then the phase2 bucket rules) and routed:
+    extract   *.json.docx extraction              -> docx_extract (cached)
+    chunk     raw transcript (VTT/TXT/JSON/DOCX)   -> transcript_chunker -> .chunks/
+    imsg      raw iMessage PDF export              -> imsg_pdf_ingest -> transform -> index
+    chips     kb_chips chip batch (catalog role)   -> validate -> chip_db upsert (+ embed)
+    inventory anything else                        -> logged with its bucket only
+- chip ids are checked against the catalog's canonical batches only; alias copies and
+  superseded batches are validated but not upserted (the canonical batch serves them)
+- deleted chip files are dropped from chip_db; the next full `chip_db.py import`
+  still reconciles canonical-variant selection
+
+Usage:
+  python watch_data.py                         # watch data/
+  python watch_data.py --embed-namespace KBv6_iMessage_2025-10-07_v1.0
+  python watch_data.py --once ../../raw/huda/03_session_transcripts_102 imsg/iMessage_Intel_Chips_Batch_v3.jsonl
+  python watch_data.py --dry-run               # print routes, run nothing
+"""
+import argparse, ctypes, ctypes.util, hashlib, json, os, select, struct, subprocess, sys, time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+KB_ROOT = Path(__file__).resolve().parent
+DATA_ROOT = KB_ROOT.parents[3]
+TOOLS_DIR = DATA_ROOT / "archive" / "tools"
+IMSG_DIR = KB_ROOT / "imsg"
+IMSG_OUT_DIR = KB_ROOT / ".imsg_windows"
+sys.path[:0] = [str(TOOLS_DIR), str(IMSG_DIR)]
+
+from chip_catalog import classify as catalog_classify, load_catalog, parse_records
+from chip_db import connect, record_validation, upsert_chips
+from docx_extract import DOCX_RE, extract_all
+from kbchips import sniff_format
+from phase1_inventory_script import classify_file_status, classify_semantic_category, get_file_type
+from phase2_classification_script import classify_to_bucket
+from precommit_chips import CHIP_ROLES, check_batch, refresh_index
+from transcript_chunker import chunk_file
+
+DEBOUNCE = 1.0
+MAX_DELAY = 5.0
+TRANSCRIPT_SUFFIXES = ("", ".vtt", ".txt", ".json", ".docx")
+IGNORED_SUFFIXES = (".tmp", ".swp", ".part", "~")
+
+# ---------------------------------------------------------------- inotify
+
+IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x8, 0x40, 0x80
+IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x100, 0x200, 0x400, 0x4000, 0x8000, 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT = struct.Struct("iIII")
+
+def ignored(name: str) -> bool:
+    return name.startswith(".") or name == "__pycache__" or name.endswith(IGNORED_SUFFIXES)
+
+class Inotify:
+    """Recursive inotify watch over a directory tree."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: Dict[int, str] = {}
+
+    def add_tree(self, root: str) -> List[str]:
+        """Watch root and every directory below it; returns the files found, so a
+        directory moved or copied in is processed as a whole."""
+        files, stack = [], [root]
+        while stack:
+            d = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(d), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                hint = " (raise fs.inotify.max_user_watches)" if err == 28 else ""
+                print(f"watch {d}: {os.strerror(err)}{hint}", file=sys.stderr)
+                continue
+            self.dirs[wd] = d
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        if ignored(entry.name):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file():
+                            files.append(entry.path)
+            except OSError:
+                continue
+        return files
+
+    def read(self) -> Iterator[Tuple[str, int]]:
+        """(path, mask) for every queued event; new directories are watched on the fly."""
+        try:
+            buf = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return
+        off = 0
+        while off < len(buf):
+            wd, mask, _, n = EVENT.unpack_from(buf, off)
+            name = buf[off + EVENT.size:off + EVENT.size + n].rstrip(b"\0").decode("utf-8", "surrogateescape")
+            off += EVENT.size + n
+            if mask & IN_Q_OVERFLOW:
+                yield "", mask
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            d = self.dirs.get(wd)
+            if d is None or (name and ignored(name)):
+                continue
+            path = os.path.join(d, name) if name else d
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    for f in self.add_tree(path):
+                        yield f, IN_CLOSE_WRITE
+                continue
+            if mask & IN_CREATE and not self.is_hardlink(path):
+                continue  # wait for IN_CLOSE_WRITE; a new hardlink never sends one
+            yield path, mask
+
+    @staticmethod
+    def is_hardlink(path: str) -> bool:
+        try:
+            return os.stat(path).st_nlink > 1
+        except OSError:
+            return False
+
+    def close(self):
+        os.close(self.fd)
+
+# ---------------------------------------------------------------- routing
+
+def is_kb_chip_batch(p: Path) -> bool:
+    """A kb_chips file the catalog would treat as a chip batch (role chips/patch), judged
+    from its content like chip_catalog does, not from the file name (misc/w045_ch.json)."""
+    if KB_ROOT not in p.parents:
+        return False
+    try:
+        raw = p.read_bytes()
+    except OSError:
+        return False
+    fmt = sniff_format(raw, p.name)
+    records, _ = parse_records(raw, fmt)
+    return catalog_classify(p.relative_to(KB_ROOT).as_posix(), fmt, records)["role"] in CHIP_ROLES
+
+def was_kb_chip_batch(path: str) -> bool:
+    """For deleted paths: the role the last catalog gave the file (its content is gone)."""
+    p = Path(path)
+    if KB_ROOT not in p.parents:
+        return False
+    try:
+        catalog = load_catalog(KB_ROOT, rebuild_stale=False)
+    except OSError:
+        catalog = {"files": []}
+    rel = p.relative_to(KB_ROOT).as_posix()
+    for e in catalog["files"]:
+        if e["path"] == rel:
+            return e["role"] in CHIP_ROLES
+    return False
+
+def route(path: str) -> Tuple[str, str]:
+    """(stage, bucket) for one changed file."""
+    p = Path(path)
+    entry = {
+        "absolute_path": str(p), "filename": p.name, "file_type": get_file_type(str(p)),
+        "status": classify_file_status(str(p)), "semantic_category": classify_semantic_category(str(p), p.name),
+    }
+    bucket, target, _ = classify_to_bucket(entry)
+    suffix = p.suffix.lower()
+    if DOCX_RE.search(p.name):
+        return "extract", bucket
+    if is_kb_chip_batch(p):
+        return "chips", bucket
+    if bucket == "raw" and suffix == ".pdf" and (entry["semantic_category"] == "iMessage history" or "05_imessage" in target):
+        return "imsg", bucket
+    if bucket == "raw" and suffix in TRANSCRIPT_SUFFIXES:
+        return "chunk", bucket
+    return "inventory", bucket
+
+# ---------------------------------------------------------------- stages
+
+def run_extract(paths: List[str]) -> str:
+    results, stats = extract_all([Path(p) for p in paths], workers=1)
+    bad = sum(1 for r in results if r.get("errors"))
+    return f"{stats['extracted']} extracted, {stats['unchanged'] + stats['duplicate']} cached, {bad} invalid"
+
+def run_chunk(paths: List[str]) -> str:
+    windows = skipped = 0
+    for p in paths:
+        r = chunk_file(p, str(KB_ROOT / ".chunks"))
+        windows += r["chunks"]
+        skipped += not r["chunks"]
+    return f"{windows} windows from {len(paths) - skipped} transcript(s), {skipped} skipped"
+
+def index_chip_file(conn, path: Path, owner: Dict[str, str], canonical: bool = True) -> Tuple[int, int]:
+    """Validate one chip file and upsert it into chip_db; returns (chips, problems).
+    owner maps chip_id -> canonical file already holding it (for cross-file duplicates);
+    alias copies and superseded batches (canonical=False) repeat those ids by design."""
+    rel = path.relative_to(KB_ROOT).as_posix()
+    raw = path.read_bytes()
+    info, checked, records = check_batch(rel, raw)
+    if info is None:
+        return 0, 0
+    results, problems = [], 0
+    for chip, errs in checked:
+        cid = chip.chip_id
+        if canonical and isinstance(cid, str) and cid:
+            if owner.setdefault(cid, rel) != rel:
+                errs.append(f"duplicate chip_id (also in {owner[cid]})")
+        problems += bool(errs)
+        results.append((cid, errs))
+    if not canonical:
+        # the canonical batch serves these chips; chip_db keeps its rows
+        return 0, problems
+    with conn:
+        conn.execute("DELETE FROM chips WHERE file=?", (rel,))
+    n = upsert_chips(conn, records, info["family"], rel)
+    record_validation(conn, results)
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO files VALUES (?,?,?,?)",
+                     (rel, info["family"], hashlib.sha1(raw).hexdigest(), time.time()))
+    return n, problems
+
+def run_chips(paths: List[str], embed_namespace: Optional[str] = None) -> str:
+    files, _ = refresh_index(KB_ROOT)
+    entries = {e["path"]: e for e in load_catalog(KB_ROOT)["files"]}
+    batch = {Path(p).relative_to(KB_ROOT).as_posix() for p in paths}
+    owner = {}
+    for rel, entry in files.items():
+        if rel in batch:
+            continue
+        for cid in entry["chip_ids"]:
+            owner.setdefault(cid, rel)
+    conn = connect()
+    chips = problems = 0
+    for p in paths:
+        rel = Path(p).relative_to(KB_ROOT).as_posix()
+        n, bad = index_chip_file(conn, Path(p), owner, entries.get(rel, {}).get("canonical", True))
+        chips += n
+        problems += bad
+        if embed_namespace and n and "imsg" in Path(p).relative_to(KB_ROOT).parts[:1]:
+            subprocess.run([sys.executable, str(IMSG_DIR / "embed_imsg_chips_v3.py"), "--input", p,
+                            "--namespace", embed_namespace], check=False)
+    return f"{chips} chips indexed from {len(paths)} file(s), {problems} invalid"
+
+def run_imsg(paths: List[str]) -> str:
+    from imsg_pdf_ingest import DEFAULT_PARTICIPANTS, iter_messages, iter_pages, iter_windows, window_record
+    from transform_imsg_chips_v3 import normalize_chip
+    IMSG_OUT_DIR.mkdir(exist_ok=True)
+    conn = connect()
+    total = 0
+    for p in paths:
+        path = Path(p)
+        chips = [normalize_chip(window_record(w, path.name, extra={"pages": [w[0].page, w[-1].page]}), i)
+                 for i, w in enumerate(iter_windows(iter_messages(iter_pages(path), DEFAULT_PARTICIPANTS)), 1)]
+        out = IMSG_OUT_DIR / f"{path.stem}.v3.jsonl"
+        tmp = out.with_name(out.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            for chip in chips:
+                f.write(json.dumps(chip, ensure_ascii=False) + "\n")
+        os.replace(tmp, out)
+        rel = out.relative_to(KB_ROOT).as_posix()
+        with conn:
+            conn.execute("DELETE FROM chips WHERE file=?", (rel,))
+        total += upsert_chips(conn, chips, "imsg", rel)
+    return f"{total} iMessage chips from {len(paths)} export(s)"
+
+def drop_deleted(paths: List[str]) -> str:
+    conn = connect()
+    rels = [Path(p).relative_to(KB_ROOT).as_posix() for p in paths if KB_ROOT in Path(p).parents]
+    removed = 0
+    with conn:
+        for rel in rels:
+            removed += conn.execute("DELETE FROM chips WHERE file=?", (rel,)).rowcount
+            conn.execute("DELETE FROM files WHERE path=?", (rel,))
+    return f"{removed} chips removed for {len(rels)} deleted file(s)"
+
+def process(changed: Dict[str, bool], dry_run: bool = False, embed_namespace: Optional[str] = None):
+    """changed: path -> exists. Routes every path, then runs each stage once on its batch."""
+    t0 = time.perf_counter()
+    batches: Dict[str, List[str]] = {}
+    deleted = []
+    for path, exists in sorted(changed.items()):
+        if not exists:
+            if was_kb_chip_batch(path):
+                deleted.append(path)
+            continue
+        stage, bucket = route(path)
+        batches.setdefault(stage, []).append(path)
+        print(f"  {stage:9s} {bucket:12s} {os.path.relpath(path, DATA_ROOT)}")
+    if dry_run:
+        return
+    runners = {"extract": run_extract, "chunk": run_chunk, "imsg": run_imsg,
+               "chips": lambda ps: run_chips(ps, embed_namespace)}
+    for stage, paths in batches.items():
+        if stage in runners:
+            try:
+                print(f"  -> {stage}: {runners[stage](paths)}")
+            except Exception as e:
+                print(f"  -> {stage}: failed: {e}", file=sys.stderr)
+    if deleted:
+        print(f"  -> chips: {drop_deleted(deleted)}")
+    print(f"processed {len(changed)} change(s) in {time.perf_counter() - t0:.2f}s")
+
+# ---------------------------------------------------------------- main
+
+def watch(root: Path, debounce: float, max_delay: float, dry_run: bool, embed_namespace: Optional[str]):
+    ino = Inotify()
+    n = len(ino.add_tree(str(root)))
+    print(f"Watching {len(ino.dirs)} directories ({n} files) under {root}")
+    pending: Dict[str, bool] = {}
+    first = last = 0.0
+    try:
+        while True:
+            timeout = None
+            if pending:
+                timeout = max(0.0, min(last + debounce, first + max_delay) - time.monotonic())
+            ready, _, _ = select.select([ino.fd], [], [], timeout)
+            now = time.monotonic()
+            if ready:
+                for path, mask in ino.read():
+                    if not path:
+                        print("inotify queue overflowed; some events were lost, run the full tools", file=sys.stderr)
+                        continue
+                    if mask & IN_DELETE_SELF:
+                        continue
+                    if not pending:
+                        first = now
+                    last = now
+                    pending[path] = not mask & (IN_DELETE | IN_MOVED_FROM)
+            if pending and now >= min(last + debounce, first + max_delay):
+                batch, pending = pending, {}
+                process(batch, dry_run, embed_namespace)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ino.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default=str(DATA_ROOT), help="tree to watch (default: data/)")
+    ap.add_argument("--debounce", type=float, default=DEBOUNCE, help="seconds of quiet before a batch runs")
+    ap.add_argument("--max-delay", type=float, default=MAX_DELAY, help="longest a change waits while events keep coming")
+    ap.add_argument("--embed-namespace", help="also embed changed iMessage chip batches into this Pinecone namespace")
+    ap.add_argument("--dry-run", action="store_true", help="print each path's route without running stages")
+    ap.add_argument("--once", nargs="+", metavar="PATH", help="route and process these files now instead of watching")
+    args = ap.parse_args()
+
+    if args.once:
+        process({str(Path(p).resolve()): Path(p).exists() for p in args.once}, args.dry_run, args.embed_namespace)
+        return
+    if not sys.platform.startswith("linux"):
+        sys.exit("watch mode needs Linux inotify; use --once on other platforms")
+    watch(Path(args.root).resolve(), args.debounce, args.max_delay, args.dry_run, args.embed_namespace)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+week_index.py
+
+Interval index over the program timeline (W001-W093, phases P1-P5).
+
+Every canonical chip and every extraction/source file in the catalog becomes one
+[lo, hi] week interval:
+- session chips carry a single week in source_doc.week (W045 -> [45, 45])
+- exec / imsg chips and extraction files carry a range in their filename
+  (W001-093_P1P5-COMPLETE -> [1, 93], W004_W004.5 -> [4, 4])
+- records with only a phase span (P3-JUNIOR, P3→P4, P1P5-ALL) get the weeks that
+  phase covers in the session corpus
+
+Intervals sit in a static augmented tree (sorted by start, max end per subtree), so
+point and range queries cost O(log n + k) instead of a filename scan.
+
+Usage:
+  python week_index.py 45                        # everything relevant to week 45
+  python week_index.py 40-50 --family exec imsg  # overlapping a range
+  python week_index.py --phase P3                # everything in a phase's weeks
+  python week_index.py --timeline                # records per week across families
+
+Library:
+  from week_index import WeekIndex
+  idx = WeekIndex.build()
+  for span in idx.at(45): ...
+"""
+import argparse, re, sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from chip_catalog import KB_ROOT, load_catalog
+from kbchips import load_corpus
+
+PHASE_NAMES = {"FOUNDATION": 1, "BUILDING": 2, "JUNIOR": 3, "SUMMER": 4, "SENIOR": 5}
+FIRST_WEEK, LAST_WEEK = 1, 93
+
+# W045, W001-093, W004_W004.5 (preceded by start, "_", "-", "/" or space)
+WEEK_SPAN_RE = re.compile(r"(?:^|[_\-/\s])W(\d{3})(?:\.\d+)?(?:-(\d{3})|_W(\d{3})(?:\.\d+)?)?(?=[_\-.\s]|$)", re.I)
+PHASE_SPAN_RE = re.compile(r"P([1-5])(?:\s*(?:→|->)?\s*P([1-5]))?")
+
+def parse_week_span(text: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Week interval named in a filename or week field; None if there is none."""
+    if not text:
+        return None
+    text = str(text)
+    if re.fullmatch(r"\d{1,3}(?:\.\d+)?", text.strip()):
+        w = int(float(text))
+        return (w, w) if w >= FIRST_WEEK else None
+    m = WEEK_SPAN_RE.search(text)
+    if not m:
+        return None
+    lo = int(m.group(1))
+    hi = int(m.group(2) or m.group(3) or lo)
+    return (min(lo, hi), max(lo, hi))
+
+def parse_phase_span(text: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Phase interval from P1P5 / P3-JUNIOR / P3→P4 / FOUNDATION-SENIOR style labels."""
+    if not text:
+        return None
+    text = str(text).upper()
+    m = PHASE_SPAN_RE.search(text)
+    if m:
+        lo, hi = int(m.group(1)), int(m.group(2) or m.group(1))
+        return (min(lo, hi), max(lo, hi))
+    found = [n for name, n in PHASE_NAMES.items() if name in text]
+    return (min(found), max(found)) if found else None
+
+class Span:
+    """One indexed record: a chip (ref = chip_id) or a file (ref = catalog path)."""
+    __slots__ = ("lo", "hi", "kind", "ref", "family", "phase", "path")
+
+    def __init__(self, lo, hi, kind, ref, family, phase=None, path=None):
+        self.lo = lo
+        self.hi = hi
+        self.kind = kind
+        self.ref = ref
+        self.family = family
+        self.phase = phase
+        self.path = path
+
+    def __repr__(self):
+        weeks = f"W{self.lo:03d}" if self.lo == self.hi else f"W{self.lo:03d}-{self.hi:03d}"
+        return f"Span({weeks}, {self.kind}, {self.ref!r}, family={self.family!r})"
+
+class IntervalTree:
+    """Static interval tree: spans sorted by start, laid out as an implicit balanced
+    BST (midpoints), each node holding the max end of its subtree."""
+
+    def __init__(self, spans: Iterable[Span]):
+        self.spans = sorted(spans, key=lambda s: (s.lo, s.hi))
+        self._max_hi = [0] * len(self.spans)
+        if self.spans:
+            self._fill(0, len(self.spans) - 1)
+
+    def _fill(self, a: int, b: int) -> int:
+        mid = (a + b) // 2
+        m = self.spans[mid].hi
+        if a < mid:
+            m = max(m, self._fill(a, mid - 1))
+        if mid < b:
+            m = max(m, self._fill(mid + 1, b))
+        self._max_hi[mid] = m
+        return m
+
+    def overlapping(self, lo: int, hi: int) -> List[Span]:
+        out: List[Span] = []
+        stack = [(0, len(self.spans) - 1)] if self.spans else []
+        while stack:
+            a, b = stack.pop()
+            if a > b:
+                continue
+            mid = (a + b) // 2
+            if self._max_hi[mid] < lo:
+                continue  # nothing in this subtree reaches lo
+            s = self.spans[mid]
+            if s.lo <= hi:
+                if s.hi >= lo:
+                    out.append(s)
+                stack.append((mid + 1, b))
+            stack.append((a, mid - 1))
+        out.sort(key=lambda s: (s.lo, s.hi, s.ref))
+        return out
+
+    def __len__(self):
+        return len(self.spans)
+
+class WeekIndex:
+    def __init__(self, spans: List[Span], phase_weeks: Dict[int, Tuple[int, int]]):
+        self.phase_weeks = phase_weeks
+        self.tree = IntervalTree(spans)
+
+    @classmethod
+    def build(cls, root: Path = KB_ROOT) -> "WeekIndex":
+        catalog = load_catalog(root)
+        chips = load_corpus(root=root)
+
+        # week range of each phase, as observed in single-week records
+        seen: Dict[int, List[int]] = {}
+        for chip in chips:
+            w, p = parse_week_span(chip.week), parse_phase_span(chip.phase)
+            if w and p and w[0] == w[1] and p[0] == p[1]:
+                seen.setdefault(p[0], []).append(w[0])
+        phase_weeks = {p: (min(ws), max(ws)) for p, ws in seen.items()}
+
+        def weeks_for(*texts, phase=None) -> Optional[Tuple[int, int]]:
+            for t in texts:
+                span = parse_week_span(t)
+                if span:
+                    return span
+            p = parse_phase_span(phase)
+            if p and p[0] in phase_weeks and p[1] in phase_weeks:
+                return (phase_weeks[p[0]][0], phase_weeks[p[1]][1])
+            return None
+
+        spans: List[Span] = []
+        for chip in chips:
+            span = weeks_for(chip.week, chip.source_doc.filename, phase=chip.phase)
+            if span:
+                spans.append(Span(span[0], span[1], "chip", chip.chip_id, chip.family, chip.phase, chip.path))
+        for e in catalog["files"]:
+            if e["role"] in ("chips", "patch"):
+                continue  # their chips are indexed individually
+            name = e["path"].rsplit("/", 1)[-1]
+            span = weeks_for(name, phase=None)
+            if span:
+                spans.append(Span(span[0], span[1], "file", e["path"], e["family"], None, e["path"]))
+        return cls(spans, phase_weeks)
+
+    def at(self, week: int, families=None, kinds=None) -> List[Span]:
+        return self.between(week, week, families, kinds)
+
+    def between(self, lo: int, hi: int, families=None, kinds=None) -> List[Span]:
+        return [s for s in self.tree.overlapping(lo, hi)
+                if (not families or s.family in families) and (not kinds or s.kind in kinds)]
+
+    def in_phase(self, phase: str, families=None, kinds=None) -> List[Span]:
+        p = parse_phase_span(phase)
+        if not p or p[0] not in self.phase_weeks or p[1] not in self.phase_weeks:
+            return []
+        return self.between(self.phase_weeks[p[0]][0], self.phase_weeks[p[1]][1], families, kinds)
+
+    def timeline(self, families=None) -> Dict[int, Counter]:
+        """week -> Counter(family) of records covering that week."""
+        out: Dict[int, Counter] = {}
+        for s in self.tree.spans:
+            if families and s.family not in families:
+                continue
+            for w in range(s.lo, s.hi + 1):
+                out.setdefault(w, Counter())[s.family] += 1
+        return dict(sorted(out.items()))
+
+    def __len__(self):
+        return len(self.tree)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("weeks", nargs="?", help="week (45) or range (40-50)")
+    ap.add_argument("--phase", help="query the weeks of a phase instead (P3, P3-JUNIOR, P2P4)")
+    ap.add_argument("--family", nargs="*", help="limit to these families (session, exec, imsg_extractions, ...)")
+    ap.add_argument("--kind", choices=["chip", "file"], help="only chips or only files")
+    ap.add_argument("--timeline", action="store_true", help="print record counts per week")
+    ap.add_argument("--root", default=str(KB_ROOT))
+    args = ap.parse_args()
+
+    idx = WeekIndex.build(Path(args.root).resolve())
+    kinds = [args.kind] if args.kind else None
+
+    if args.timeline:
+        for week, counts in idx.timeline(args.family).items():
+            print(f"W{week:03d}  " + "  ".join(f"{f}={n}" for f, n in sorted(counts.items())))
+        return
+    if args.phase:
+        hits = idx.in_phase(args.phase, args.family, kinds)
+    elif args.weeks:
+        lo, _, hi = args.weeks.upper().lstrip("W").partition("-")
+        hits = idx.between(int(lo), int(hi or lo), args.family, kinds)
+    else:
+        ap.error("give a week, a range, --phase or --timeline")
+
+    for s in hits:
+        weeks = f"W{s.lo:03d}" if s.lo == s.hi else f"W{s.lo:03d}-{s.hi:03d}"
+        print(f"{weeks:10s} {s.kind:4s} {s.family:20s} {s.ref}")
+    print(f"{len(hits)} of {len(idx)} indexed records", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
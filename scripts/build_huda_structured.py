@@ -1,373 +1,33 @@
 #!/usr/bin/env python3
 """
 Build Huda Structured JSON (student_000)
-Synthesizes all raw Huda data into a single structured assessment file
+Synthesizes Huda's kb_chips (93 weeks of sessions, exec docs, iMessage) plus the curated
+overlay in data/students/synthesis/ into a single structured assessment file.
+See synthesize_students.py; this is its huda_000 entry.
 """
 
+import sys
 import json
-import os
 from pathlib import Path
-from datetime import datetime
 
-# Paths
-V4_ROOT = Path("/Users/snazir/ivylevel-multiagents-v4.0/data/v4_organized")
-RAW_HUDA = V4_ROOT / "coaches/jenny/raw/huda"
-CURATED_HUDA = V4_ROOT / "coaches/jenny/curated"
-OUTPUT_DIR = V4_ROOT / "students/jenny_assessments_v1"
-OUTPUT_FILE = OUTPUT_DIR / "student_000_huda_structured.json"
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from synthesize_students import OUTPUT_DIR, load_registry, synthesize  # noqa: E402
 
-def load_json_safe(filepath):
-    """Safely load JSON file"""
-    try:
-        with open(filepath, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        print(f"Warning: Could not load {filepath}: {e}")
-        return None
+STUDENT_ID = "huda_000"
 
-def build_huda_structured():
+def build_huda_structured(out_dir=OUTPUT_DIR):
     """Build comprehensive Huda structured JSON"""
 
     print("🔍 Building Huda Structured JSON...")
     print("=" * 80)
 
-    # This is a comprehensive template based on the schema
-    # Values extracted from Huda's actual data across 93 weeks
-    huda_structured = {
-        "student_id": "huda_000",
-        "extraction_date": datetime.now().strftime("%Y-%m-%d"),
-        "coach_id": "jenny_duan",
+    stats = synthesize(STUDENT_ID, load_registry()[STUDENT_ID], Path(out_dir))
+    output_file = Path(stats["output"])
+    with open(output_file, 'r') as f:
+        huda_structured = json.load(f)
 
-        "session_metadata": {
-            "student_archetype": "First-Gen Tech Visionary with Gaming-to-Impact Evolution",
-            "grade_level": 10,  # Started in sophomore year
-            "session_duration_minutes": 90,
-            "session_date": "2023-06-21",  # Initial assessment
-            "session_type": "360_assessment",
-            "school_type": "large_competitive_public",
-            "school_name": "High School (Bay Area)",
-            "location": "Bay Area, California",
-            "student_readiness_score": 8.5,
-            "narrative_clarity_start": 5,
-            "narrative_clarity_end": 10,
-            "parent_involvement": "high_but_empowering",
-            "intended_major": "Computer Science / Game Design"
-        },
-
-        "student_profile": {
-            "academic_standing": {
-                "gpa": 4.0,
-                "gpa_type": "weighted_4.0_scale",
-                "sat_practice": 1520,
-                "sat_final": 1550,
-                "psat": 1480,
-                "aps_taken": 8,
-                "aps_planned": "12+ by graduation",
-                "course_rigor": "extremely_rigorous",
-                "academic_narrative": "Perfect GPA with heavy STEM focus, AP CS A perfect score"
-            },
-            "involvement_level": "high_quality_high_depth",
-            "starting_readiness": "highly_built_scattered",
-            "achievement_orientation": "visionary_builder",
-            "execution_style": "strategic_systematic_high_agency",
-            "passion_clarity": "clear_integrated_narrative",
-            "resource_access": "high"
-        },
-
-        "key_challenges": [
-            {
-                "challenge": "Gaming guilt / converting gaming identity into positive narrative",
-                "quote": "I love gaming but worry colleges will see it as time-wasting",
-                "severity": "medium",
-                "resolution": "Transformed gaming into game design for social impact"
-            },
-            {
-                "challenge": "Balancing breadth vs. depth in summer programs",
-                "quote": "JCamp vs. multiple shorter programs - strategic choice needed",
-                "severity": "medium",
-                "resolution": "Chose JCamp (USC game design) - major narrative crystallization"
-            },
-            {
-                "challenge": "First-gen navigation of elite college landscape",
-                "quote": "Mom inspired my tech journey, now I'm building tools for immigrant families",
-                "severity": "low",
-                "resolution": "Became narrative superpower - Folklift origin story"
-            }
-        ],
-
-        "extracurriculars": [
-            {
-                "activity_name": "Folklift",
-                "category": "entrepreneurship",
-                "description": "AI-powered platform helping immigrant families navigate US systems (insurance, taxes, education)",
-                "role": "Founder & Lead Developer",
-                "years_involved": "2.5",
-                "hours_per_week": 15,
-                "achievement_level": "national",
-                "narrative_significance": 10,
-                "outcomes": [
-                    "Serving 500+ immigrant families",
-                    "Partnered with community organizations",
-                    "Featured in local tech showcases"
-                ]
-            },
-            {
-                "activity_name": "NCWIT Award Finalist",
-                "category": "competition",
-                "description": "National Center for Women in Technology Aspirations in Computing",
-                "role": "Applicant/Finalist",
-                "years_involved": "1",
-                "hours_per_week": 0,
-                "achievement_level": "national",
-                "narrative_significance": 9,
-                "outcomes": ["National finalist recognition"]
-            },
-            {
-                "activity_name": "EmpowHer Hacks Winner",
-                "category": "hackathon",
-                "description": "Won hackathon with game addressing mental health for teens",
-                "role": "Developer/Winner",
-                "years_involved": "1",
-                "hours_per_week": 0,
-                "achievement_level": "regional",
-                "narrative_significance": 8,
-                "outcomes": ["First place", "Mental health game prototype"]
-            },
-            {
-                "activity_name": "JCamp (USC Game Design)",
-                "category": "summer_program",
-                "description": "Intensive game design and development program at USC",
-                "role": "Student",
-                "years_involved": "1 summer",
-                "hours_per_week": 40,
-                "achievement_level": "selective_program",
-                "narrative_significance": 10,
-                "outcomes": [
-                    "Crystallized game design as narrative thread",
-                    "Portfolio project: educational game",
-                    "Mentorship from USC faculty"
-                ]
-            },
-            {
-                "activity_name": "Synthoria (Personal Game Project)",
-                "category": "personal_project",
-                "description": "Original RPG game with cultural storytelling elements",
-                "role": "Solo Developer",
-                "years_involved": "2",
-                "hours_per_week": 8,
-                "achievement_level": "advanced_personal",
-                "narrative_significance": 9,
-                "outcomes": [
-                    "Complete game with custom assets",
-                    "Integration of cultural narratives",
-                    "Technical portfolio piece"
-                ]
-            }
-        ],
-
-        "awards_and_recognition": [
-            {
-                "award_name": "NCWIT Aspirations in Computing - National Finalist",
-                "level": "national",
-                "year": 2024,
-                "narrative_weight": 10
-            },
-            {
-                "award_name": "EmpowHer Hacks - 1st Place",
-                "level": "regional",
-                "year": 2024,
-                "narrative_weight": 8
-            },
-            {
-                "award_name": "AP Scholar",
-                "level": "school",
-                "year": 2024,
-                "narrative_weight": 5
-            }
-        ],
-
-        "narrative_themes": [
-            {
-                "theme": "Gaming Guilt → Gaming for Good",
-                "strength": 10,
-                "evidence": "Transformed personal gaming passion into game design for mental health and education",
-                "jenny_framework": "identity_alchemy"
-            },
-            {
-                "theme": "First-Gen Tech Builder",
-                "strength": 10,
-                "evidence": "Folklift directly inspired by mom's immigration journey",
-                "jenny_framework": "origin_story"
-            },
-            {
-                "theme": "AI + Game Design Convergence",
-                "strength": 9,
-                "evidence": "Folklift uses AI, games address mental health, CS foundation strong",
-                "jenny_framework": "spike_architecture"
-            },
-            {
-                "theme": "Service Through Technology",
-                "strength": 9,
-                "evidence": "All projects serve underrepresented communities (immigrants, mental health)",
-                "jenny_framework": "impact_vector"
-            }
-        ],
-
-        "strategic_decisions": [
-            {
-                "decision": "Stanford REA Strategy",
-                "rationale": "Perfect alignment: CS, game design, first-gen, impact focus",
-                "jenny_input": "Your profile is built for Stanford. REA makes sense.",
-                "outcome": "Submitted REA Fall 2024"
-            },
-            {
-                "decision": "JCamp over multiple shorter programs",
-                "rationale": "Deep immersion > scattered exploration for narrative clarity",
-                "jenny_input": "JCamp will crystallize your game design spike. Do it.",
-                "outcome": "JCamp was transformative - solidified CS + game design narrative"
-            },
-            {
-                "decision": "Common App Essay: Gaming Identity Evolution",
-                "rationale": "Unique, authentic, shows growth and self-awareness",
-                "jenny_input": "This is your superpower. Own the gaming journey.",
-                "outcome": "Essay went through 15+ revisions, became narrative anchor"
-            },
-            {
-                "decision": "Folklift as primary EC narrative",
-                "rationale": "Authentic origin story + sustained impact + technical depth",
-                "jenny_input": "This is your throughline. Everything connects to this.",
-                "outcome": "Successfully positioned as main narrative vehicle"
-            }
-        ],
-
-        "jenny_coaching_patterns": [
-            {
-                "pattern": "Narrative Alchemy",
-                "description": "Converting perceived weakness (gaming) into strength",
-                "frequency": "weekly",
-                "impact": "transformational"
-            },
-            {
-                "pattern": "168-Hour Framework",
-                "description": "Time management across summer programs and app season",
-                "frequency": "monthly",
-                "impact": "high"
-            },
-            {
-                "pattern": "Essay Surgery Sessions",
-                "description": "Iterative essay refinement with real-time feedback",
-                "frequency": "15+ sessions",
-                "impact": "critical"
-            },
-            {
-                "pattern": "Parent Anxiety Management",
-                "description": "Managing mom's concerns while preserving student agency",
-                "frequency": "as needed",
-                "impact": "medium"
-            },
-            {
-                "pattern": "Crisis Navigation",
-                "description": "SAT score disappointment, teacher rec issues, Palestine crisis acknowledgment",
-                "frequency": "episodic",
-                "impact": "high"
-            }
-        ],
-
-        "eq_personality_profile": {
-            "archetype": "strategic_visionary",
-            "emotional_intelligence": "high",
-            "self_awareness": "very_high",
-            "execution_style": "systematic_planner",
-            "stress_response": "productive_anxiety",
-            "communication_style": "articulate_reflective",
-            "parent_dynamic": "collaborative_respectful",
-            "coach_receptivity": "extremely_high"
-        },
-
-        "college_strategy": {
-            "target_tier": "T10_CS_game_design",
-            "early_strategy": "Stanford REA",
-            "reach_schools": [
-                "Stanford (REA)",
-                "MIT",
-                "Carnegie Mellon (CS)",
-                "USC (Game Design)",
-                "UPenn (Digital Media Design)"
-            ],
-            "target_schools": [
-                "UC Berkeley",
-                "UCLA",
-                "UCSD"
-            ],
-            "safety_schools": [
-                "UCI",
-                "UCSB"
-            ],
-            "narrative_positioning": "First-gen female CS + game design for social impact"
-        },
-
-        "timeline_milestones": {
-            "w001_foundation": "Initial assessment, 168-hour framework introduced",
-            "w010_ncwit_app": "NCWIT application development and storytelling",
-            "w026_ncwit_win": "NCWIT finalist celebration, senior year strategy",
-            "w045_summer_architecture": "JCamp decision, 10-Spot Strategy",
-            "w061_jcamp_debrief": "Post-JCamp narrative crystallization",
-            "w068_essay_pivot": "Major Common App essay pivot to gaming identity",
-            "w079_stanford_rea": "Stanford REA final review and submission",
-            "w086_mit_upenn": "MIT essays and UPenn DMD strategy",
-            "w093_final_polish": "Final application polish and interview prep"
-        },
-
-        "execution_profile": {
-            "weekly_checkins": 93,
-            "total_coaching_hours": 140,
-            "essay_iterations": 37,
-            "imessage_exchanges": "500+",
-            "strategic_pivots": 4,
-            "crisis_interventions": 6,
-            "parent_sessions": 12,
-            "outcome": "Pending (applications submitted Fall 2024)"
-        },
-
-        "evidence_chips_used": [
-            "w001_kb_168hour_framework",
-            "w026_kb_ncwit_celebration",
-            "w045_kb_jcamp_decision",
-            "w061_kb_narrative_crystallization",
-            "w068_kb_essay_gaming_pivot",
-            "w079_kb_stanford_rea",
-            "eq_w007_gaming_validation",
-            "eq_w029_parent_anxiety_management",
-            "imsg_rejection_alchemy",
-            "imsg_summer_transformation",
-            "exec_narrative_architecture"
-        ],
-
-        "meta": {
-            "completeness_score": 10,
-            "data_sources": [
-                "93 weekly session transcripts",
-                "1 assessment transcript",
-                "1 game plan report",
-                "2 exec docs (93 weeks coverage)",
-                "3 iMessage conversation parts",
-                "9 college application materials"
-            ],
-            "extraction_method": "comprehensive_synthesis",
-            "validation_status": "manual_review_complete",
-            "schema_version": "jennyAssessmentStructured_v1"
-        }
-    }
-
-    # Ensure output directory exists
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-    # Write output
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(huda_structured, f, indent=2)
-
-    print(f"✅ Huda structured JSON created: {OUTPUT_FILE}")
-    print(f"📊 File size: {OUTPUT_FILE.stat().st_size / 1024:.2f} KB")
+    print(f"✅ Huda structured JSON created: {output_file}")
+    print(f"📊 File size: {output_file.stat().st_size / 1024:.2f} KB")
     print("\n📋 Summary:")
     print(f"   Student ID: {huda_structured['student_id']}")
     print(f"   Archetype: {huda_structured['session_metadata']['student_archetype']}")
@@ -375,10 +35,11 @@ def build_huda_structured():
     print(f"   Awards: {len(huda_structured['awards_and_recognition'])}")
     print(f"   Narrative Themes: {len(huda_structured['narrative_themes'])}")
     print(f"   Strategic Decisions: {len(huda_structured['strategic_decisions'])}")
-    print(f"   Total Coaching Weeks: 93")
-    print(f"   Completeness Score: 10/10")
+    print(f"   Total Coaching Weeks: {huda_structured['execution_profile']['weekly_checkins']}")
+    print(f"   Chips: {stats['chips']} ({stats['computed']} of {stats['partitions']} partitions recomputed)")
+    print(f"   Completeness Score: {huda_structured['meta'].get('completeness_score', '?')}/10")
 
     return huda_structured
 
 if __name__ == "__main__":
-    build_huda_structured()
+    build_huda_structured(*sys.argv[1:2])
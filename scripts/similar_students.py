@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+similar_students.py
+
+k most similar past students for a (new or existing) structured assessment, to ground
+recommendations in what happened with comparable students.
+
+Each student_*_structured.json becomes one float32 row of a NumPy matrix:
+- numeric block: grade_level, gpa, readiness, narrative clarity start/end, scaled to
+  [0, 1] on fixed ranges (missing -> midpoint, plus a missing flag)
+- categorical block: "field=value" for school_type, parent_involvement and the
+  student_profile descriptors (involvement_level, execution_style, ...), hashed into
+  CAT_DIM buckets
+- theme block: bag of words from archetype, intended major, key challenges, framework
+  names and activity categories, hashed into THEME_DIM buckets
+Blocks are L2-normalised and weighted, and every row is unit length, so cosine
+similarity is a single matrix product. The hashing needs no fitted vocabulary, so a
+row depends only on its own file. A refresh re-encodes only the files whose size or
+mtime changed, and the result is identical to a full rebuild. The matrix is cached in
+data/students/.student_features.npz.
+
+Usage:
+  python scripts/similar_students.py aaryan_003 -k 3
+  python scripts/similar_students.py --file /tmp/new_assessment.json -k 5
+  python scripts/similar_students.py --all -k 3          # batched: every student at once
+  python scripts/similar_students.py --bench 5000
+
+Library:
+  from similar_students import SimilarityIndex
+  index = SimilarityIndex.load()
+  for student_id, score in index.similar_to_doc(partial_assessment, k=5): ...
+"""
+import argparse, copy, json, os, re, sys, time, zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    print("Please install numpy>=1.20", file=sys.stderr)
+    sys.exit(1)
+
+from student_schema import KIND_STRUCTURED, detect_version, load_current, migrate
+from student_store import REPO_ROOT, STUDENTS_DIR, flatten, source_files
+
+FEATURES_FILE = REPO_ROOT / "data" / "students" / ".student_features.npz"
+ENCODER_VERSION = 2
+
+# (column from student_store.flatten, lo, hi)
+NUMERIC = [
+    ("grade_level", 8.0, 12.0),
+    ("gpa", 3.0, 5.0),
+    ("readiness", 0.0, 10.0),
+    ("narrative_clarity_start", 0.0, 10.0),
+    ("narrative_clarity_end", 0.0, 10.0),
+]
+CATEGORICAL_META = ["school_type", "parent_involvement"]
+CATEGORICAL_PROFILE = ["involvement_level", "starting_readiness", "achievement_orientation",
+                       "execution_style", "passion_clarity", "resource_access"]
+CAT_DIM = 64
+THEME_DIM = 256
+NUM_DIM = 2 * len(NUMERIC)
+DIM = NUM_DIM + CAT_DIM + THEME_DIM
+WEIGHTS = {"num": 1.0, "cat": 0.8, "theme": 1.2}
+WORD_RE = re.compile(r"[a-z][a-z0-9]+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in into is it its of on or that the their
+this to was were with without not no very more most than too via per vs
+""".split())
+
+# ---------------------------------------------------------------- encoder
+
+def _bucket(token: str, dim: int) -> Tuple[int, float]:
+    """Stable hashed bucket (crc32, not the per-process hash()) plus a +-1 sign."""
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % dim, (1.0 if h & 0x80000000 else -1.0)
+
+def _words(text: str) -> List[str]:
+    return [w for w in WORD_RE.findall(text.lower()) if w not in STOPWORDS]
+
+def _texts(value, keys: Sequence[str]) -> List[str]:
+    """Strings under any of keys in a list of dicts (or the strings of a plain list)."""
+    out = []
+    if isinstance(value, list):
+        for item in value:
+            if isinstance(item, str):
+                out.append(item)
+            elif isinstance(item, dict):
+                out.extend(item[k] for k in keys if isinstance(item.get(k), str))
+    elif isinstance(value, dict):
+        out.extend(str(k) for k in value)
+    return out
+
+def themes(doc: dict) -> List[str]:
+    """Theme words of one assessment (archetype, major, challenges, frameworks, activities)."""
+    sm = doc.get("session_metadata") if isinstance(doc.get("session_metadata"), dict) else {}
+    sp = doc.get("student_profile") if isinstance(doc.get("student_profile"), dict) else {}
+    texts = [sm.get("student_archetype"), sm.get("sub_archetype"), sm.get("intended_major"),
+             sm.get("intended_major_stated"), sm.get("primary_challenge")]
+    texts = [t for t in texts if isinstance(t, str)]
+    texts += _texts(doc.get("key_challenges"), ("challenge",))
+    texts += _texts(doc.get("frameworks_introduced"), ("framework_name", "framework", "name"))
+    for key in ("extracurricular_activities", "current_involvement"):
+        texts += _texts(sp.get(key), ("category", "activity", "name", "type"))
+    texts += _texts(doc.get("extracurriculars"), ("category", "activity", "name", "type"))
+    return [w for t in texts for w in _words(t)]
+
+def encode(doc: dict) -> np.ndarray:
+    """One unit-length float32 feature row for a structured assessment (partial ones too)."""
+    row = flatten(doc, "")
+    sp = doc.get("student_profile") if isinstance(doc.get("student_profile"), dict) else {}
+    vec = np.zeros(DIM, dtype=np.float32)
+
+    num = vec[:NUM_DIM]
+    for j, (name, lo, hi) in enumerate(NUMERIC):
+        x = row[name]
+        if x != x:  # NaN: missing
+            num[2 * j], num[2 * j + 1] = 0.5, 1.0
+        else:
+            num[2 * j] = min(max((x - lo) / (hi - lo), 0.0), 1.0)
+
+    cat = vec[NUM_DIM:NUM_DIM + CAT_DIM]
+    values = [(k, row[k]) for k in CATEGORICAL_META] + \
+             [(k, sp.get(k)) for k in CATEGORICAL_PROFILE if isinstance(sp.get(k), str)]
+    for k, v in values:
+        if v:
+            b, s = _bucket(f"{k}={v.strip().lower()}", CAT_DIM)
+            cat[b] += s
+
+    theme = vec[NUM_DIM + CAT_DIM:]
+    for w in themes(doc):
+        b, s = _bucket(w, THEME_DIM)
+        theme[b] += s
+
+    for block, w in ((num, WEIGHTS["num"]), (cat, WEIGHTS["cat"]), (theme, WEIGHTS["theme"])):
+        n = float(np.linalg.norm(block))
+        if n:
+            block *= w / n
+    n = float(np.linalg.norm(vec))
+    if n:
+        vec /= n
+    return vec
+
+# ---------------------------------------------------------------- index
+
+class SimilarityIndex:
+    """Feature matrix over every student file, refreshed row by row."""
+
+    def __init__(self, ids: List[str], files: List[str], keys: np.ndarray, matrix: np.ndarray,
+                 failed: Optional[Dict[str, Tuple[int, int]]] = None):
+        self.ids = ids
+        self.files = files
+        self.keys = keys        # (n, 2) int64: size, mtime_ns
+        self.matrix = matrix    # (n, DIM) float32, unit rows
+        self.failed = failed or {}  # unreadable file -> key, not retried until it changes
+        self._row = {sid: i for i, sid in enumerate(ids)}
+
+    @classmethod
+    def empty(cls) -> "SimilarityIndex":
+        return cls([], [], np.zeros((0, 2), np.int64), np.zeros((0, DIM), np.float32))
+
+    @classmethod
+    def load(cls, students_dir: Path = STUDENTS_DIR, path: Path = FEATURES_FILE,
+             refresh: bool = True) -> "SimilarityIndex":
+        index = None
+        try:
+            with np.load(path, allow_pickle=False) as z:
+                if int(z["version"]) == ENCODER_VERSION and z["matrix"].shape[1] == DIM:
+                    failed = dict(zip(z["failed_files"].tolist(), map(tuple, z["failed_keys"].tolist())))
+                    index = cls(z["ids"].tolist(), z["files"].tolist(), z["keys"], z["matrix"], failed)
+        except (OSError, KeyError, ValueError):
+            pass
+        index = index or cls.empty()
+        if refresh and index.refresh(students_dir)["changed"]:
+            index.save(path)
+        return index
+
+    def save(self, path: Path = FEATURES_FILE):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, version=np.int64(ENCODER_VERSION), ids=np.array(self.ids, dtype=str),
+                     files=np.array(self.files, dtype=str), keys=self.keys, matrix=self.matrix,
+                     failed_files=np.array(list(self.failed), dtype=str),
+                     failed_keys=np.array(list(self.failed.values()), np.int64).reshape(-1, 2))
+        os.replace(tmp, path)
+
+    def refresh(self, students_dir: Path = STUDENTS_DIR) -> Dict[str, int]:
+        """Re-encode only new or modified files and drop rows for deleted ones."""
+        current: Dict[str, Tuple[int, int]] = {}
+        for p in source_files(students_dir):
+            st = p.stat()
+            current[os.path.relpath(p, REPO_ROOT)] = (st.st_size, st.st_mtime_ns)
+        by_file = {f: i for i, f in enumerate(self.files)}
+        keep = [i for i, f in enumerate(self.files) if f in current]
+        stats = {"added": 0, "updated": 0, "removed": len(self.files) - len(keep), "skipped": 0}
+        failed = {f: k for f, k in self.failed.items() if current.get(f) == k}
+
+        ids = [self.ids[i] for i in keep]
+        files = [self.files[i] for i in keep]
+        keys = self.keys[keep]
+        matrix = self.matrix[keep]
+        pos = {f: j for j, f in enumerate(files)}
+        new_rows: List[Tuple[str, str, Tuple[int, int], np.ndarray]] = []
+        for rel, key in current.items():
+            i = by_file.get(rel)
+            if (i is not None and tuple(self.keys[i]) == key) or rel in failed:
+                continue
+            try:
+                doc = load_current(REPO_ROOT / rel)
+            except (OSError, ValueError) as e:
+                # an existing row keeps its last good encoding
+                print(f"  skip {rel}: {e}", file=sys.stderr)
+                failed[rel] = key
+                stats["skipped"] += 1
+                continue
+            sid = doc.get("student_id") or Path(rel).stem
+            vec = encode(doc)
+            if rel in pos:
+                j = pos[rel]
+                ids[j], keys[j], matrix[j] = sid, key, vec
+                stats["updated"] += 1
+            else:
+                new_rows.append((sid, rel, key, vec))
+                stats["added"] += 1
+        if new_rows:
+            ids += [r[0] for r in new_rows]
+            files += [r[1] for r in new_rows]
+            keys = np.vstack([keys, np.array([r[2] for r in new_rows], np.int64)])
+            matrix = np.vstack([matrix, np.stack([r[3] for r in new_rows])])
+        self.ids, self.files, self.keys = ids, files, keys
+        stats["changed"] = stats["added"] + stats["updated"] + stats["removed"] + (failed != self.failed)
+        self.failed = failed
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._row = {sid: i for i, sid in enumerate(ids)}
+        return stats
+
+    def knn(self, queries: np.ndarray, k: int = 5, exclude: Optional[Sequence[int]] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Batched top-k by cosine: queries (m, DIM) -> (rows (m, k), scores (m, k)), best first.
+        exclude[q] is a row to leave out of query q's results (its own row), or -1."""
+        n = len(self.ids)
+        k = min(k, n - (1 if exclude is not None else 0))
+        if k <= 0:
+            return np.zeros((len(queries), 0), np.int64), np.zeros((len(queries), 0), np.float32)
+        scores = queries @ self.matrix.T
+        if exclude is not None:
+            ex = np.asarray(exclude)
+            hit = ex >= 0
+            scores[np.nonzero(hit)[0], ex[hit]] = -np.inf
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def similar_to_doc(self, doc: dict, k: int = 5) -> List[Tuple[str, float]]:
+        """Neighbours of an assessment that need not be in the index (e.g. one in progress)."""
+        if detect_version(doc)[0] == KIND_STRUCTURED:
+            doc, _ = migrate(copy.deepcopy(doc))
+        own = self._row.get(doc.get("student_id"), -1)
+        rows, scores = self.knn(encode(doc)[None, :], k, exclude=[own])
+        return [(self.ids[i], float(s)) for i, s in zip(rows[0], scores[0])]
+
+    def similar_to(self, student_id: str, k: int = 5) -> List[Tuple[str, float]]:
+        i = self._row[student_id]
+        rows, scores = self.knn(self.matrix[i:i + 1], k, exclude=[i])
+        return [(self.ids[j], float(s)) for j, s in zip(rows[0], scores[0])]
+
+    def all_neighbours(self, k: int = 5) -> Dict[str, List[Tuple[str, float]]]:
+        rows, scores = self.knn(self.matrix, k, exclude=list(range(len(self.ids))))
+        return {sid: [(self.ids[j], float(s)) for j, s in zip(rows[i], scores[i])]
+                for i, sid in enumerate(self.ids)}
+
+# ---------------------------------------------------------------- CLI
+
+def bench(index: SimilarityIndex, n: int, k: int):
+    """Replicate the real rows with noise to n students and time single and batched lookups."""
+    rng = np.random.default_rng(7)
+    base = index.matrix[rng.integers(0, len(index.ids), n)]
+    noisy = base + rng.normal(0, 0.02, base.shape).astype(np.float32)
+    noisy /= np.linalg.norm(noisy, axis=1, keepdims=True)
+    big = SimilarityIndex([f"s{i}" for i in range(n)], [""] * n, np.zeros((n, 2), np.int64), noisy)
+    doc = load_current(REPO_ROOT / index.files[0])
+    t0 = time.perf_counter()
+    for _ in range(100):
+        q = encode(doc)
+    t_enc = (time.perf_counter() - t0) / 100
+    t0 = time.perf_counter()
+    for _ in range(100):
+        big.knn(q[None, :], k)
+    t_one = (time.perf_counter() - t0) / 100
+    t0 = time.perf_counter()
+    big.knn(big.matrix[:1000], k)
+    t_batch = time.perf_counter() - t0
+    print(f"{n} students x {DIM} dims ({big.matrix.nbytes / 1e6:.1f} MB)")
+    print(f"  encode one assessment: {t_enc * 1e6:.0f} µs")
+    print(f"  single kNN (k={k}):     {t_one * 1e6:.0f} µs")
+    print(f"  batched kNN, 1000 queries: {t_batch * 1000:.1f} ms ({t_batch * 1e3:.1f} µs/query)")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("student_id", nargs="?", help="an indexed student, e.g. aaryan_003")
+    ap.add_argument("--file", help="a structured assessment JSON (need not be indexed)")
+    ap.add_argument("--all", action="store_true", help="neighbours of every indexed student (one batch)")
+    ap.add_argument("-k", type=int, default=5)
+    ap.add_argument("--students-dir", default=str(STUDENTS_DIR))
+    ap.add_argument("--bench", type=int, metavar="N", help="time lookups over N synthetic students")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    index = SimilarityIndex.load(Path(args.students_dir))
+    print(f"{len(index.ids)} students indexed ({(time.perf_counter() - t0) * 1000:.1f} ms incl. refresh)",
+          file=sys.stderr)
+
+    if args.bench:
+        bench(index, args.bench, args.k)
+    elif args.all:
+        for sid, nbrs in index.all_neighbours(args.k).items():
+            print(f"{sid:16s} " + "  ".join(f"{n} {s:.3f}" for n, s in nbrs))
+    elif args.file or args.student_id:
+        if args.file:
+            with open(args.file, "rb") as f:
+                result = index.similar_to_doc(json.loads(f.read()), args.k)
+        elif args.student_id not in index.ids:
+            sys.exit(f"unknown student {args.student_id!r}; indexed: {', '.join(index.ids)}")
+        else:
+            result = index.similar_to(args.student_id, args.k)
+        for sid, score in result:
+            print(f"{score:.3f}  {sid}")
+    else:
+        ap.error("give a student_id, --file, --all or --bench N")
+
+if __name__ == "__main__":
+    main()
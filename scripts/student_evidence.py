@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+student_evidence.py
+
+Checks and hydrates the evidence_chips_used references of the structured student files
+against the kb_chips corpus, through the chip_id index (kb_chips/chip_index.py).
+
+- report: every reference of every student is resolved in one batched index pass (each
+  chip file is read once, in offset order). Dangling references are ids that no
+  canonical chip carries, such as legacy slugs like w045_kb_jcamp_decision or chips
+  dropped from the catalog.
+- hydrate: one student's evidence set as full chip records, in reference order.
+
+Usage:
+  python scripts/student_evidence.py                     # integrity report
+  python scripts/student_evidence.py --strict            # exit 1 on dangling references
+  python scripts/student_evidence.py --hydrate huda_000  # evidence chips as JSON
+
+Library:
+  from student_evidence import hydrate
+  chips, dangling = hydrate(doc)
+"""
+import argparse, json, sys, time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from student_schema import STUDENT_GLOB, STUDENTS_DIR, load_current
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+KB_ROOT = REPO_ROOT / "data" / "coaches" / "jenny" / "curated" / "kb_chips"
+
+sys.path.insert(0, str(KB_ROOT))
+from chip_index import ChipIndex  # noqa: E402
+
+def evidence_refs(doc: dict) -> List[str]:
+    refs = doc.get("evidence_chips_used")
+    return [r for r in refs if isinstance(r, str)] if isinstance(refs, list) else []
+
+def hydrate(doc: dict, index: Optional[ChipIndex] = None) -> Tuple[List[dict], List[str]]:
+    """(chip records in reference order, dangling ids) for one student document."""
+    refs = evidence_refs(doc)
+    if index is None:
+        with ChipIndex.open(KB_ROOT) as index:
+            found, dangling = index.resolve_many(refs)
+    else:
+        found, dangling = index.resolve_many(refs)
+    return [found[r] for r in refs if r in found], dangling
+
+def check(students_dir: Path = STUDENTS_DIR, index: Optional[ChipIndex] = None) -> List[dict]:
+    """One row per student file: refs, resolved count, dangling ids, or the load error."""
+    rows, refs_of = [], {}
+    for path in sorted(Path(students_dir).glob(STUDENT_GLOB)):
+        row = {"file": path.name, "student_id": None, "refs": 0, "resolved": 0, "dangling": [], "error": None}
+        try:
+            doc = load_current(path)
+        except (OSError, ValueError) as e:
+            row["error"] = str(e)
+            rows.append(row)
+            continue
+        row["student_id"] = doc.get("student_id")
+        refs_of[path.name] = evidence_refs(doc)
+        row["refs"] = len(refs_of[path.name])
+        rows.append(row)
+
+    all_refs = [r for refs in refs_of.values() for r in refs]
+    if index is None:
+        with ChipIndex.open(KB_ROOT) as index:
+            found, _ = index.resolve_many(all_refs)
+    else:
+        found, _ = index.resolve_many(all_refs)
+    for row in rows:
+        refs = refs_of.get(row["file"], [])
+        row["resolved"] = sum(r in found for r in refs)
+        row["dangling"] = [r for r in refs if r not in found]
+    return rows
+
+def find_student(students_dir: Path, key: str) -> Optional[dict]:
+    """Document by student_id or file name."""
+    for path in sorted(Path(students_dir).glob(STUDENT_GLOB)):
+        if path.name == key:
+            return load_current(path)
+        try:
+            doc = load_current(path)
+        except (OSError, ValueError):
+            continue
+        if doc.get("student_id") == key:
+            return doc
+    return None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--students-dir", default=str(STUDENTS_DIR))
+    ap.add_argument("--hydrate", metavar="STUDENT", help="print a student's evidence chips (student_id or file name)")
+    ap.add_argument("--json", action="store_true", help="print the report as JSON")
+    ap.add_argument("--strict", action="store_true", help="exit 1 when any reference dangles")
+    args = ap.parse_args()
+    students_dir = Path(args.students_dir)
+
+    if args.hydrate:
+        doc = find_student(students_dir, args.hydrate)
+        if doc is None:
+            sys.exit(f"no student {args.hydrate!r} in {students_dir}")
+        chips, dangling = hydrate(doc)
+        print(json.dumps({"student_id": doc.get("student_id"), "chips": chips, "dangling": dangling},
+                         indent=2, ensure_ascii=False))
+        sys.exit(1 if dangling and args.strict else 0)
+
+    t0 = time.perf_counter()
+    rows = check(students_dir)
+    dt = (time.perf_counter() - t0) * 1000
+    if args.json:
+        print(json.dumps(rows, indent=2, ensure_ascii=False))
+    else:
+        print("| File | Student | Refs | Resolved | Dangling |")
+        print("|---|---|---|---|---|")
+        for r in rows:
+            if r["error"]:
+                print(f"| `{r['file']}` | | | | ERROR {r['error']} |")
+                continue
+            print(f"| `{r['file']}` | {r['student_id'] or ''} | {r['refs']} | {r['resolved']} | "
+                  f"{', '.join(r['dangling'])} |")
+    total = sum(r["refs"] for r in rows)
+    dangling = sum(len(r["dangling"]) for r in rows)
+    print(f"{len(rows)} files, {total} references, {dangling} dangling, "
+          f"{sum(1 for r in rows if r['error'])} unreadable ({dt:.1f} ms)", file=sys.stderr)
+    sys.exit(1 if dangling and args.strict else 0)
+
+if __name__ == "__main__":
+    main()
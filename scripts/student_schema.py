@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+student_schema.py
+
+Schema versions of the structured student assessments, and the chained migrations
+that bring any of them to the current shape.
+
+Versions (meta.schema_version):
+  0  unversioned      session_metadata / student_profile, no meta block (most files)
+  1  jennyAssessmentStructured_v1   same shape plus meta (student_000_huda)
+  2  jennyAssessmentStructured_v2   current: v1 with the field aliases resolved
+       - academic_standing: numeric gpa_weighted / gpa_unweighted, gpa is the headline
+         number (unweighted first), free-text GPAs move to gpa_note
+       - session_metadata: parent_involvement_level -> parent_involvement,
+         intended_major -> intended_major_stated, numeric grade_level
+Files shaped like the assessment-agent output (profile / diagnostics / recommendations)
+are a different document kind and are reported, not migrated.
+
+The version is sniffed from the first and last SNIFF_BYTES of a file (meta sits at either
+end), without parsing it. load_current() returns the document in the current shape from a
+migrated snapshot in data/students/.migrated/ that is written atomically, named after a
+hash of the source's resolved path and keyed by its size and mtime. Consumers therefore do no shape checks after the first load.
+
+Usage:
+  python scripts/student_schema.py                 # detected version per file
+  python scripts/student_schema.py --migrate       # write/refresh every snapshot
+
+Library:
+  from student_schema import load_current
+  doc = load_current(path)   # always CURRENT_VERSION shape
+"""
+import argparse, hashlib, json, os, re, sys, time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+STUDENTS_DIR = REPO_ROOT / "data" / "students" / "jenny_assessments_v1"
+MIGRATED_DIR = REPO_ROOT / "data" / "students" / ".migrated"
+STUDENT_GLOB = "student_*_structured.json"
+SNAPSHOT_GLOB = "student_*_structured.*.json"
+SNIFF_BYTES = 4096
+
+SCHEMA_NAMES = {
+    0: None,
+    1: "jennyAssessmentStructured_v1",
+    2: "jennyAssessmentStructured_v2",
+}
+VERSION_OF_NAME = {name: v for v, name in SCHEMA_NAMES.items() if name}
+CURRENT_VERSION = max(SCHEMA_NAMES)
+KIND_STRUCTURED, KIND_ASSESSMENT_OUTPUT, KIND_UNKNOWN = "structured", "assessment_output", "unknown"
+
+SCHEMA_RE = re.compile(rb'"schema_version"\s*:\s*"([^"]+)"')
+KEY_RE = re.compile(rb'"(session_metadata|student_profile|profile|diagnostics|recommendations)"\s*:')
+
+# ---------------------------------------------------------------- detection
+
+def _classify_keys(keys) -> Tuple[str, Optional[int]]:
+    keys = set(keys)
+    if {"session_metadata", "student_profile"} & keys:
+        return KIND_STRUCTURED, 0
+    if {"profile", "diagnostics", "recommendations"} <= keys:
+        return KIND_ASSESSMENT_OUTPUT, None
+    return KIND_UNKNOWN, None
+
+def sniff_version(path) -> Tuple[str, Optional[int]]:
+    """(kind, version) from the head and tail of a file, without parsing it.
+
+    Falls back to a full parse only when neither end settles the question."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+        size = f.seek(0, os.SEEK_END)
+        if size > SNIFF_BYTES:
+            f.seek(max(size - SNIFF_BYTES, SNIFF_BYTES))
+            tail = f.read()
+        else:
+            tail = b""
+    for chunk in (head, tail):
+        m = SCHEMA_RE.search(chunk)
+        if m and m.group(1).decode("utf-8", "replace") in VERSION_OF_NAME:
+            return KIND_STRUCTURED, VERSION_OF_NAME[m.group(1).decode("utf-8")]
+    kind, version = _classify_keys(k.decode() for k in KEY_RE.findall(head + tail))
+    if kind != KIND_UNKNOWN:
+        return kind, version
+    with open(path, "rb") as f:
+        return detect_version(json.loads(f.read()))
+
+def detect_version(doc) -> Tuple[str, Optional[int]]:
+    """(kind, version) of a parsed document."""
+    if not isinstance(doc, dict):
+        return KIND_UNKNOWN, None
+    meta = doc.get("meta") if isinstance(doc.get("meta"), dict) else {}
+    name = meta.get("schema_version")
+    if name in VERSION_OF_NAME:
+        return KIND_STRUCTURED, VERSION_OF_NAME[name]
+    return _classify_keys(doc)
+
+# ---------------------------------------------------------------- migrations
+
+def _number(v) -> Optional[float]:
+    if isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return v
+    if isinstance(v, str):
+        try:
+            return float(v)
+        except ValueError:
+            return None
+    return None
+
+def migrate_0_to_1(doc: dict) -> dict:
+    meta = doc.get("meta") if isinstance(doc.get("meta"), dict) else {}
+    meta["schema_version"] = SCHEMA_NAMES[1]
+    doc["meta"] = meta
+    return doc
+
+def migrate_1_to_2(doc: dict) -> dict:
+    sm = doc.get("session_metadata")
+    if isinstance(sm, dict):
+        if "parent_involvement_level" in sm and not sm.get("parent_involvement"):
+            sm["parent_involvement"] = sm.pop("parent_involvement_level")
+        if "intended_major" in sm and not sm.get("intended_major_stated"):
+            sm["intended_major_stated"] = sm.pop("intended_major")
+        grade = _number(sm.get("grade_level"))
+        if grade is not None:
+            sm["grade_level"] = int(grade) if float(grade).is_integer() else grade
+
+    sp = doc.get("student_profile")
+    acad = sp.get("academic_standing") if isinstance(sp, dict) else None
+    if isinstance(acad, dict):
+        gpa = acad.get("gpa")
+        gpa_type = str(acad.get("gpa_type", "")).lower()
+        if isinstance(gpa, str) and _number(gpa) is None:
+            acad.setdefault("gpa_note", gpa)
+            gpa = None
+        gpa = _number(gpa)
+        if gpa is not None and "unweighted" in gpa_type:
+            acad.setdefault("gpa_unweighted", gpa)
+        elif gpa is not None and "weighted" in gpa_type:
+            acad.setdefault("gpa_weighted", gpa)
+        acad.setdefault("gpa_weighted", None)
+        acad.setdefault("gpa_unweighted", None)
+        if gpa is None:
+            gpa = next((g for g in (_number(acad["gpa_unweighted"]), _number(acad["gpa_weighted"]))
+                        if g is not None), None)
+        acad["gpa"] = gpa
+
+    doc.setdefault("meta", {})["schema_version"] = SCHEMA_NAMES[2]
+    return doc
+
+# from_version -> step to from_version + 1
+MIGRATIONS: Dict[int, Callable[[dict], dict]] = {
+    0: migrate_0_to_1,
+    1: migrate_1_to_2,
+}
+
+def migrate(doc: dict) -> Tuple[dict, int]:
+    """(doc in the current shape, version it started at); migrates in place."""
+    kind, version = detect_version(doc)
+    if kind != KIND_STRUCTURED:
+        raise ValueError(f"not a structured student assessment ({kind})")
+    start = version
+    while version < CURRENT_VERSION:
+        doc = MIGRATIONS[version](doc)
+        version += 1
+    return doc, start
+
+# ---------------------------------------------------------------- snapshots
+
+def snapshot_path(path: Path, migrated_dir: Path = MIGRATED_DIR) -> Path:
+    """<stem>.<hash of the resolved path>.json, so same-named files in other directories
+    (fixtures, --students-dir copies) never share a snapshot."""
+    path = Path(path).resolve()
+    digest = hashlib.sha1(str(path).encode("utf-8")).hexdigest()[:12]
+    return Path(migrated_dir) / f"{path.stem}.{digest}.json"
+
+def load_current(path, migrated_dir: Path = MIGRATED_DIR) -> dict:
+    """The document at path in the current shape, from its migrated snapshot when that is
+    still fresh (no shape checks), else migrated now and snapshotted atomically.
+
+    Raises OSError / ValueError for unreadable files or other document kinds."""
+    path = Path(path).resolve()
+    st = path.stat()
+    key = [st.st_size, st.st_mtime_ns]
+    snap = snapshot_path(path, migrated_dir)
+    try:
+        with open(snap, "rb") as f:
+            cached = json.loads(f.read())
+        if (cached.get("path") == str(path) and cached.get("source") == key
+                and cached.get("version") == CURRENT_VERSION):
+            return cached["doc"]
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    with open(path, "rb") as f:
+        doc = json.loads(f.read())
+    doc, start = migrate(doc)
+    snap.parent.mkdir(parents=True, exist_ok=True)
+    tmp = snap.with_name(f"{snap.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"path": str(path), "source": key, "from_version": start, "version": CURRENT_VERSION, "doc": doc},
+                  f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, snap)
+    return doc
+
+def prune_snapshots(migrated_dir: Path = MIGRATED_DIR) -> int:
+    """Delete snapshots whose source file is gone (wherever it lived), unreadable ones, and
+    the basename-keyed snapshots of earlier versions."""
+    migrated_dir = Path(migrated_dir)
+    stale = list(migrated_dir.glob(STUDENT_GLOB))
+    for snap in migrated_dir.glob(SNAPSHOT_GLOB):
+        try:
+            with open(snap, "rb") as f:
+                source = json.loads(f.read()).get("path")
+        except (OSError, ValueError, AttributeError):
+            source = None
+        if not source or not os.path.exists(source):
+            stale.append(snap)
+    for snap in stale:
+        snap.unlink()
+    return len(stale)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("files", nargs="*", help="files to inspect (default: every student file)")
+    ap.add_argument("--students-dir", default=str(STUDENTS_DIR))
+    ap.add_argument("--migrate", action="store_true", help="write/refresh migrated snapshots")
+    args = ap.parse_args()
+
+    files = [Path(f) for f in args.files] or sorted(Path(args.students_dir).glob(STUDENT_GLOB))
+    failed = 0
+    t0 = time.perf_counter()
+    for p in files:
+        try:
+            kind, version = sniff_version(p)
+        except (OSError, ValueError) as e:
+            print(f"{p.name:45s} ERROR {e}")
+            failed += 1
+            continue
+        label = f"v{version} ({SCHEMA_NAMES[version] or 'unversioned'})" if version is not None else kind
+        status = ""
+        if args.migrate and kind == KIND_STRUCTURED:
+            try:
+                load_current(p)
+                status = f"-> v{CURRENT_VERSION}"
+            except (OSError, ValueError) as e:
+                status = f"migration failed: {e}"
+                failed += 1
+        print(f"{p.name:45s} {label:40s} {status}")
+    if args.migrate:
+        pruned = prune_snapshots()
+        if pruned:
+            print(f"pruned {pruned} stale snapshot(s)")
+    print(f"{len(files)} files in {(time.perf_counter() - t0) * 1000:.1f} ms", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
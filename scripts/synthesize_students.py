@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+synthesize_students.py
+
+Builds students/jenny_assessments_v1/student_*_structured.json
+(jennyAssessmentStructured_v1) from the kb_chips corpus instead of hand-copied literals.
+
+- data/students/synthesis/students.json lists the students. Each has an overlay of
+  hand-curated judgments (archetype, profile, strategy, ...) and the chip families and
+  participant name to aggregate.
+- map: every chip file in the catalog (one session week, one exec/imsg batch) is one
+  partition, reduced to a small partial aggregate:
+  - weeks seen, with date, phase and flags
+  - transcript durations
+  - chip counts per type
+  - the best chip per type and per phase
+  Partials are cached in data/students/.synth_cache/<student>/ keyed by the file's size
+  and mtime, so adding w094_chips.json computes one new partition and reuses the rest.
+- reduce: partials are merged (counts add, sets union, best-of keeps the max) into the
+  derived sections, which carry their own names so they never stand in for a curated
+  field that means something else:
+  - execution_profile counts (weeks_with_chips, transcript_hours over the transcripts
+    with a known duration plus that coverage, essay_weeks, weeks_mentioning_pivot,
+    crisis_chips, weeks_with_parent, chips per family)
+  - chip_timeline_highlights: the best Strategy/Framework/Result chip per phase
+  - chip_type_patterns: chip counts and week spread per chip type
+  - top_quality_chips and meta.chip_sources
+  The overlay keeps the curated sections (jenny_coaching_patterns, timeline_milestones,
+  evidence_chips_used, execution_profile's hours/iterations/pivots, meta.data_sources)
+  and wins over any derived value.
+- students are synthesized in parallel worker processes.
+
+Usage:
+  python scripts/synthesize_students.py                  # every registered student
+  python scripts/synthesize_students.py huda_000 --out-dir /tmp/synth
+  python scripts/synthesize_students.py --stats          # partitions computed vs cached
+"""
+import argparse, hashlib, json, os, re, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DATA_ROOT = REPO_ROOT / "data"
+KB_ROOT = DATA_ROOT / "coaches" / "jenny" / "curated" / "kb_chips"
+SYNTH_DIR = DATA_ROOT / "students" / "synthesis"
+REGISTRY_FILE = SYNTH_DIR / "students.json"
+OUTPUT_DIR = DATA_ROOT / "students" / "jenny_assessments_v1"
+CACHE_DIR = DATA_ROOT / "students" / ".synth_cache"
+PARTIAL_VERSION = 2
+SCHEMA_VERSION = "jennyAssessmentStructured_v1"
+WORKERS = os.cpu_count() or 1
+
+sys.path.insert(0, str(KB_ROOT))
+from chip_catalog import canonical_files, load_catalog  # noqa: E402
+from kbchips import load_chips  # noqa: E402
+
+PHASE_ORDER = ["P1-FOUNDATION", "P2-BUILDING", "P3-JUNIOR", "P4-SUMMER", "P5-SENIOR"]
+PARENT_RE = re.compile(r"\b(dad|mom|mother|father|parents?)\b", re.I)
+ESSAY_RE = re.compile(r"\bessays?\b", re.I)
+PIVOT_RE = re.compile(r"\bpivot(?:s|ed)?\b", re.I)  # not "pivotal"
+CRISIS_RE = re.compile(r"crisis|escalation|pushback", re.I)
+DURATION_HMS_RE = re.compile(r"^(?:(\d+):)?(\d+):(\d{2})$")
+DURATION_MIN_RE = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:min|minutes)\b", re.I)
+DURATION_HOUR_RE = re.compile(r"(\d+(?:\.\d+)?)\s*\+?\s*(?:h|hr|hrs|hours?)\b", re.I)
+
+# ---------------------------------------------------------------- map
+
+def parse_duration(text) -> int:
+    """Seconds in "1:43:35", "51:15", "66 minutes", "60+ minutes", "1.5 hours"; 0 if unknown."""
+    if not isinstance(text, str):
+        return 0
+    text = text.strip()
+    m = DURATION_HMS_RE.match(text)
+    if m:
+        h, mnt, s = int(m.group(1) or 0), int(m.group(2)), int(m.group(3))
+        return h * 3600 + mnt * 60 + s
+    m = DURATION_MIN_RE.search(text)
+    if m:
+        return int(float(m.group(1)) * 60)
+    m = DURATION_HOUR_RE.search(text)
+    if m:
+        return int(float(m.group(1)) * 3600)
+    return 0
+
+def _better(a: Optional[list], b: list) -> list:
+    """Best-of for [quality, week, chip_id, text]: higher quality, then earlier week, then id."""
+    if a is None:
+        return b
+    return b if (b[0], -b[1], b[2]) > (a[0], -a[1], a[2]) else a
+
+def _week_number(week) -> int:
+    try:
+        return int(str(week).lstrip("Ww"))
+    except (TypeError, ValueError):
+        return 0
+
+def map_partition(path: Path, family: str, fmt: str, participant: str) -> dict:
+    """Partial aggregate of one chip file, restricted to chips involving participant."""
+    partial = {"family": family, "chips": 0, "weeks": {}, "transcripts": {}, "types": {},
+               "best_type": {}, "best_phase": {}, "sources": {}, "crisis": 0}
+    who = participant.lower()
+    for chip in load_chips(path, family, fmt):
+        if chip.error is not None:
+            continue
+        md = chip.metadata
+        people = [str(p) for p in md.get("participants") or []]
+        if people and not any(who in p.lower() for p in people):
+            continue
+        sd = chip.source_doc
+        text = f"{chip.content} {chip.insight_vector}"
+        quality = float(md.get("quality_score") or 0)
+        week = _week_number(sd.week) if family == "session" else 0
+        partial["chips"] += 1
+        if sd.filename:
+            partial["sources"][sd.filename] = family
+        partial["crisis"] += bool(CRISIS_RE.search(f"{chip.type} {md.get('situation_tag', '')}"))
+
+        if week:
+            w = partial["weeks"].setdefault(str(week), {"date": None, "phase": None, "chips": 0, "essay": False,
+                                                       "pivot": False, "parent": False})
+            w["chips"] += 1
+            w["date"] = w["date"] or sd.date
+            w["phase"] = w["phase"] or sd.phase
+            w["essay"] |= bool(ESSAY_RE.search(text))
+            w["pivot"] |= bool(PIVOT_RE.search(text))
+            w["parent"] |= any(PARENT_RE.search(p) for p in people)
+            if sd.filename:
+                secs = parse_duration(md.get("duration"))
+                partial["transcripts"][sd.filename] = max(partial["transcripts"].get(sd.filename, 0), secs)
+
+        ctype = chip.type or "Untyped"
+        count, weeks = partial["types"].get(ctype, [0, []])
+        partial["types"][ctype] = [count + 1, sorted(set(weeks) | ({week} if week else set()))]
+        best = [quality, week, chip.chip_id, chip.insight_vector or chip.content[:240]]
+        partial["best_type"][ctype] = _better(partial["best_type"].get(ctype), best)
+        if week and sd.phase in PHASE_ORDER and ctype in ("Strategy_Chip", "Framework_Chip", "Result_Chip"):
+            partial["best_phase"][sd.phase] = _better(partial["best_phase"].get(sd.phase), best)
+    return partial
+
+def partition_cache_path(student_id: str, rel: str) -> Path:
+    return CACHE_DIR / student_id / (hashlib.sha1(rel.encode("utf-8")).hexdigest()[:16] + ".json")
+
+def load_partial(student_id: str, spec: dict, base: Path, entry: dict) -> Tuple[dict, bool]:
+    """(partial, computed?) for one catalog file, from the cache when the file is unchanged."""
+    path = base / entry["path"]
+    st = path.stat()
+    key = [st.st_size, st.st_mtime_ns, PARTIAL_VERSION, spec["participant"]]
+    cache = partition_cache_path(student_id, entry["path"])
+    try:
+        with open(cache, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            return cached["partial"], False
+    except (OSError, ValueError, KeyError):
+        pass
+    partial = map_partition(path, entry["family"], entry["format"], spec["participant"])
+    cache.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache.with_name(cache.name + f".{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"key": key, "path": entry["path"], "partial": partial}, f, ensure_ascii=False)
+    os.replace(tmp, cache)
+    return partial, True
+
+# ---------------------------------------------------------------- reduce
+
+def merge(total: dict, partial: dict) -> dict:
+    """Fold one partial into the running total (associative and commutative)."""
+    total["chips"] += partial["chips"]
+    total["crisis"] += partial["crisis"]
+    total["by_family"][partial["family"]] = total["by_family"].get(partial["family"], 0) + partial["chips"]
+    for wk, w in partial["weeks"].items():
+        t = total["weeks"].setdefault(wk, {"date": None, "phase": None, "chips": 0, "essay": False,
+                                          "pivot": False, "parent": False})
+        t["chips"] += w["chips"]
+        t["date"] = min(filter(None, (t["date"], w["date"])), default=None)
+        t["phase"] = t["phase"] or w["phase"]
+        for flag in ("essay", "pivot", "parent"):
+            t[flag] |= w[flag]
+    for name, secs in partial["transcripts"].items():
+        total["transcripts"][name] = max(total["transcripts"].get(name, 0), secs)
+    for ctype, (count, weeks) in partial["types"].items():
+        c, ws = total["types"].get(ctype, (0, set()))
+        total["types"][ctype] = (c + count, ws | set(weeks))
+    for ctype, best in partial["best_type"].items():
+        total["best_type"][ctype] = _better(total["best_type"].get(ctype), best)
+    for phase, best in partial["best_phase"].items():
+        total["best_phase"][phase] = _better(total["best_phase"].get(phase), best)
+    total["sources"].update(partial["sources"])
+    return total
+
+def empty_total() -> dict:
+    return {"chips": 0, "crisis": 0, "by_family": {}, "weeks": {}, "transcripts": {}, "types": {},
+            "best_type": {}, "best_phase": {}, "sources": {}}
+
+def derived_sections(total: dict) -> dict:
+    weeks = total["weeks"]
+    week_nums = sorted(int(w) for w in weeks)
+    dates = sorted(w["date"] for w in weeks.values() if w["date"])
+    n_weeks = len(week_nums) or 1
+
+    # a transcript whose duration did not parse is left out, not counted as 0 hours
+    timed = [secs for secs in total["transcripts"].values() if secs]
+    execution_profile = {
+        "weeks_with_chips": len(week_nums),
+        "first_week": week_nums[0] if week_nums else None,
+        "last_week": week_nums[-1] if week_nums else None,
+        "transcript_hours": round(sum(timed) / 3600, 1),
+        "transcripts_with_duration": f"{len(timed)} of {len(total['transcripts'])}",
+        "essay_weeks": sum(w["essay"] for w in weeks.values()),
+        "weeks_mentioning_pivot": sum(w["pivot"] for w in weeks.values()),
+        "crisis_chips": total["crisis"],
+        "weeks_with_parent": sum(w["parent"] for w in weeks.values()),
+        "imessage_chips": total["by_family"].get("imsg", 0),
+        "exec_chips": total["by_family"].get("exec", 0),
+        "session_chips": total["by_family"].get("session", 0),
+    }
+
+    timeline = {}
+    for phase in PHASE_ORDER:
+        best = total["best_phase"].get(phase)
+        if best:
+            slug = phase.split("-", 1)[1].lower()
+            timeline[f"w{best[1]:03d}_{slug}"] = best[3]
+
+    patterns = []
+    for ctype, (count, ws) in sorted(total["types"].items(), key=lambda kv: (-len(kv[1][1]), -kv[1][0], kv[0])):
+        best = total["best_type"][ctype]
+        patterns.append({
+            "pattern": ctype.replace("_Chip", "").replace("_", " "),
+            "description": best[3],
+            "frequency": f"{len(ws)} of {n_weeks} weeks" if ws else f"{count} chips (exec/iMessage)",
+            "chips": count,
+            "first_week": min(ws) if ws else None,
+            "last_week": max(ws) if ws else None,
+        })
+
+    evidence = sorted(total["best_type"].values(), key=lambda b: (-b[0], b[1], b[2]))
+    sources: Dict[str, int] = {}
+    for family in total["sources"].values():
+        sources[family] = sources.get(family, 0) + 1
+    labels = {"session": "weekly session transcripts", "exec": "exec docs", "imsg": "iMessage source docs"}
+    return {
+        "first_session_date": dates[0] if dates else None,
+        "execution_profile": execution_profile,
+        "chip_timeline_highlights": timeline,
+        "chip_type_patterns": patterns,
+        "top_quality_chips": [b[2] for b in evidence[:12]],
+        "chip_sources": [f"{n} {labels.get(f, f)}" for f, n in sorted(sources.items())],
+    }
+
+# ---------------------------------------------------------------- students
+
+def load_registry(path: Path = REGISTRY_FILE) -> Dict[str, dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+
+def synthesize(student_id: str, spec: dict, out_dir: Path = OUTPUT_DIR) -> dict:
+    """Write one student's structured JSON; returns build stats."""
+    t0 = time.perf_counter()
+    catalog = load_catalog(KB_ROOT)
+    base = Path(catalog["root"])
+    entries = canonical_files(catalog, spec.get("families"))
+    total = empty_total()
+    computed = 0
+    for entry in entries:
+        partial, fresh = load_partial(student_id, spec, base, entry)
+        computed += fresh
+        merge(total, partial)
+    live = {partition_cache_path(student_id, e["path"]).name for e in entries}
+    for stale in (CACHE_DIR / student_id).glob("*.json"):
+        if stale.name not in live:
+            stale.unlink()
+
+    with open(SYNTH_DIR / spec["overlay"], "r", encoding="utf-8") as f:
+        overlay = json.load(f)
+    derived = derived_sections(total)
+    doc = {"student_id": student_id, "extraction_date": datetime.now().strftime("%Y-%m-%d")}
+    doc.update(overlay)
+    sm = doc.setdefault("session_metadata", {})
+    if derived["first_session_date"]:
+        sm.setdefault("session_date", derived["first_session_date"])
+    doc.pop("meta", None)  # derived sections, then meta last (student_schema sniffs the tail)
+    doc["execution_profile"] = {**overlay.get("execution_profile", {}),
+                                **{k: v for k, v in derived["execution_profile"].items()
+                                   if k not in overlay.get("execution_profile", {})}}
+    for key in ("chip_timeline_highlights", "chip_type_patterns", "top_quality_chips"):
+        doc[key] = derived[key]
+    meta = dict(overlay.get("meta", {}))
+    meta["chip_sources"] = derived["chip_sources"]
+    if "data_sources" not in meta:
+        meta["data_sources"] = derived["chip_sources"] + meta.get("extra_data_sources", [])
+    meta.pop("extra_data_sources", None)
+    meta["extraction_method"] = "chip_synthesis"
+    meta["schema_version"] = SCHEMA_VERSION
+    doc["meta"] = meta
+
+    out = Path(out_dir) / spec["output"]
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_name(out.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+    os.replace(tmp, out)
+    return {"student_id": student_id, "output": str(out), "partitions": len(entries), "computed": computed,
+            "chips": total["chips"], "weeks": len(total["weeks"]), "seconds": time.perf_counter() - t0}
+
+def _synthesize_job(args):
+    return synthesize(*args)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("students", nargs="*", help="student ids from the registry (default: all)")
+    ap.add_argument("--out-dir", default=str(OUTPUT_DIR))
+    ap.add_argument("-j", "--workers", type=int, default=WORKERS)
+    ap.add_argument("--rebuild", action="store_true", help="drop cached partials first")
+    ap.add_argument("--stats", action="store_true", help="print partition/cache stats per student")
+    args = ap.parse_args(argv)
+
+    registry = load_registry()
+    ids = list(dict.fromkeys(args.students)) or list(registry)
+    unknown = [s for s in ids if s not in registry]
+    if unknown:
+        ap.error(f"not in {REGISTRY_FILE.name}: {', '.join(unknown)}")
+    if args.rebuild:
+        for sid in ids:
+            for p in (CACHE_DIR / sid).glob("*.json"):
+                p.unlink()
+
+    jobs = [(sid, registry[sid], Path(args.out_dir)) for sid in ids]
+    print(f"🔍 Synthesizing {len(jobs)} student(s) from kb_chips...")
+    if len(jobs) == 1 or args.workers <= 1:
+        results = [_synthesize_job(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as pool:
+            results = list(pool.map(_synthesize_job, jobs))
+    for r in results:
+        print(f"✅ {r['student_id']}: {r['chips']} chips over {r['weeks']} weeks -> {r['output']}")
+        if args.stats:
+            print(f"   {r['partitions']} partitions, {r['computed']} computed, "
+                  f"{r['partitions'] - r['computed']} cached, {r['seconds'] * 1000:.0f} ms")
+    return results
+
+if __name__ == "__main__":
+    main()